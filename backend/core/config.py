@@ -26,15 +26,74 @@ class Settings(BaseSettings):
     )
 
     OPENAI_API_KEY: str = ""
+    OPENAI_MODEL: str = "gpt-4o-mini"
+    OPENAI_TIMEOUT: float = 30.0  # in seconds
+    OPENAI_MAX_RETRIES: int = 2
+    MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024  # in bytes
+    UPLOAD_CHUNK_SIZE: int = 64 * 1024
+    STT_BACKEND: str = "whisper"  # whisper or faster-whisper (CTranslate2)
+    STT_MODEL: str = "base"  # tiny, base, small, medium...
+    STT_THREADS: int = 0  # CPU threads of the in-process engine (0: default)
+    STT_COMPUTE_TYPE: str = ""  # e.g. int8 (empty: backend default)
+    STT_VAD: str = "energy"  # energy, silero or none
+    STT_VAD_THRESHOLD_DB: float = -45.0  # energy VAD, in dBFS
+    STT_VAD_MIN_SILENCE_MS: int = 700  # longer pauses are cut
+    STT_VAD_PADDING_MS: int = 200  # kept around speech
+    STT_LONG_AUDIO_SECONDS: float = 120.0  # split longer audios (0: never)
+    STT_BATCHING: bool = False  # micro-batch concurrent transcriptions
+    STT_MAX_BATCH_SIZE: int = 8
+    STT_MAX_WAIT_MS: float = 20.0
+    STT_WORKERS: int = 0  # transcribe in N worker processes (0: in-process)
+    STT_WORKER_THREADS: int = 1  # torch threads of each worker
+    STT_MAX_QUEUE: int = 8  # transcriptions waiting for a worker
+    STT_CACHE_SIZE: int = 256  # transcriptions cached in memory (0: no cache)
+    STT_CACHE_TTL: float = 3600.0  # in seconds
+    STT_CACHE_DIR: str = ""  # directory of the on-disk tier (empty: none)
+    STT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # per worker process
+    CONVERSATION_PIPELINE: bool = False  # stream LLM sentences to TTS
+    PIPELINE_MIN_SENTENCE_LENGTH: int = 20  # in characters
+    PIPELINE_TTS_CONCURRENCY: int = 2
+    TTS_CACHE_SIZE: int = 128  # replies cached in memory (0: no cache)
+    TTS_CACHE_TTL: float = 3600.0  # in seconds
+    TTS_CACHE_DIR: str = ""  # directory of the on-disk tier (empty: none)
+    TTS_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # per worker process
+    TTS_CACHE_MEMORY_MAX_BYTES: int = 32 * 1024 * 1024  # per worker process
+    TTS_PREWARM_FILE: str = ""  # phrases synthesized at startup, one per line
     MONGO_HOST: str = "localhost:27017"
     MONGO_DB: str = "sana_test"
     MONGO_USER: str = ""
     MONGO_PWD: str = ""
+    MONGO_MAX_POOL_SIZE: int = 50
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 300_000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5_000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5_000
+    MONGO_SOCKET_TIMEOUT_MS: int = 20_000
+    CACHE_BACKEND: str = "memory"  # memory, redis or local (stand-in)
+    CACHE_MAX_SIZE: int = 10_000
+    CACHE_TTL: float = 300.0
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    HTTP2: bool = True  # requires httpx[http2]
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0  # in seconds
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 30.0
     ELEVENLABS_API_KEY: str = ""
     VOICE_ID: str = ""
     MODEL_ID: str = ""
     TTS_URL: str = "https://api.elevenlabs.io/v1/text-to-speech/B4wUDSZmHFnxqY60nxXm"
-    SALT: str = ""
+    SALT: str = ""  # salt of the legacy blake2b password hashes
+    PASSWORD_HASH_ALGORITHM: str = "scrypt"  # scrypt or argon2 (argon2-cffi)
+    PASSWORD_HASH_WORKERS: int = 2
+    SCRYPT_N: int = 2**14
+    SCRYPT_R: int = 8
+    SCRYPT_P: int = 1
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # in KiB
+    ARGON2_PARALLELISM: int = 1
+    TOKEN_SECRET: str = ""  # HMAC key of the session tokens
+    TOKEN_TTL: int = 86_400  # in seconds
 
 
 settings = Settings()  # type: ignore
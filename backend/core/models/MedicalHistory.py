@@ -51,20 +51,31 @@ class MedicalHistory(Document):
 
     def to_dict(self):
         """Convertit le document en dictionnaire"""
+        return MedicalHistory.serialize(self.to_mongo())
+
+    @staticmethod
+    def serialize(data) -> dict:
+        """Convertit un document brut (tel que stocké en base) en dictionnaire.
+
+        Args:
+            data: Raw document, with the user reference stored as an ObjectId.
+
+        Returns:
+            dict: Medical history as returned by the API.
+        """
+        last_updated = data.get("last_updated")
         return {
-            "id": str(self.id),
-            "user_id": str(self.user.id),
-            "height": self.height,
-            "weight": self.weight,
-            "blood_type": self.blood_type,
-            "medical_conditions": self.medical_conditions or [],
-            "allergies": self.allergies or [],
-            "medications": self.medications or [],
-            "smoking_status": self.smoking_status,
-            "alcohol_consumption": self.alcohol_consumption,
-            "exercise_frequency": self.exercise_frequency,
-            "family_history": self.family_history or [],
-            "last_updated": self.last_updated.isoformat()
-            if self.last_updated
-            else None,
+            "id": str(data["_id"]) if data.get("_id") else None,
+            "user_id": str(data["user"]) if data.get("user") else None,
+            "height": data.get("height"),
+            "weight": data.get("weight"),
+            "blood_type": data.get("blood_type"),
+            "medical_conditions": data.get("medical_conditions") or [],
+            "allergies": data.get("allergies") or [],
+            "medications": data.get("medications") or [],
+            "smoking_status": data.get("smoking_status"),
+            "alcohol_consumption": data.get("alcohol_consumption"),
+            "exercise_frequency": data.get("exercise_frequency"),
+            "family_history": data.get("family_history") or [],
+            "last_updated": last_updated.isoformat() if last_updated else None,
         }
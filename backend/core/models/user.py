@@ -4,7 +4,9 @@ from typing import List
 from typing import Optional
 
 from core.models.base import BaseDocument
+from core.utils.user import Role
 from core.utils.user import Sex
+from mongoengine import BooleanField
 from mongoengine import DateField
 from mongoengine import EmailField
 from mongoengine import EnumField
@@ -30,10 +32,24 @@ class User(BaseDocument):
     phone_number = StringField(required=False, max_length=20)
     bio = StringField(required=False, max_length=500)
     profile_image = StringField(required=False, max_length=1000)
+    # Set by an administrator in the database, never from the API
+    role = EnumField(enum=Role, default=Role.PATIENT)
+    # Copy of "the medical history lists allergies", kept in sync by the
+    # repositories so that the dashboard filter is served by an index
+    has_allergies = BooleanField(default=False)
 
     meta = {  # type: ignore
         "collection": "User",
-        "indexes": ["username"],
+        "indexes": [
+            "username",
+            "email",
+            # Keyset pagination of the dashboard listing, newest first,
+            # optionally filtered on sex, allergies and a date_of_birth range
+            ("-created_at", "-id", "date_of_birth"),
+            ("sex", "-created_at", "-id", "date_of_birth"),
+            ("has_allergies", "-created_at", "-id", "date_of_birth"),
+            ("sex", "has_allergies", "-created_at", "-id", "date_of_birth"),
+        ],
     }
 
 
@@ -137,3 +153,11 @@ class HealthInfoResponse(BaseModel):
     success: bool
     message: str
     health_data: Optional[dict] = None
+
+
+class UserListResponse(BaseModel):
+    """Page of the user listing of the clinician dashboard"""
+
+    success: bool
+    users: List[dict]
+    next_cursor: Optional[str] = None
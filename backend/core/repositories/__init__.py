@@ -0,0 +1,36 @@
+from typing import Optional
+
+from bson import ObjectId
+from core.repositories.medical_history import MedicalHistoryRepository
+from core.repositories.user import UserRepository
+from core.utils.cache import cache
+
+__all__ = [
+    "MedicalHistoryRepository",
+    "UserRepository",
+    "ensure_indexes",
+    "invalidate_cache",
+]
+
+
+async def ensure_indexes() -> None:
+    """Create the indexes of every collection and backfill the denormalized
+    fields they rely on, called at startup."""
+    await UserRepository.ensure_indexes()
+    await MedicalHistoryRepository.ensure_indexes()
+    await UserRepository.backfill_has_allergies()
+
+
+async def invalidate_cache(*usernames: str, user_id: Optional[ObjectId] = None) -> None:
+    """Drop the cached profiles of users after a write, and the cached
+    medical history of a user.
+
+    Args:
+        usernames (str): Usernames whose profiles are stale.
+        user_id (Optional[ObjectId], optional): Id of the user whose medical
+        history is stale.
+    """
+    keys = [UserRepository.cache_key(username) for username in usernames]
+    if user_id is not None:
+        keys.append(MedicalHistoryRepository.cache_key(user_id))
+    await cache.delete(*keys)
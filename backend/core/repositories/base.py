@@ -0,0 +1,108 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from typing import Type
+
+from bson import ObjectId
+from mongoengine import Document
+from mongoengine import ValidationError
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import DuplicateKeyError
+
+
+def validated_fields(document_cls: Type[Document], fields: dict) -> dict:
+    """Validate a subset of fields with the rules declared on a document and
+    convert them to their stored representation.
+
+    Only the errors related to the given fields are raised, so this can be
+    used for partial updates as well as for full documents.
+
+    Args:
+        document_cls (Type[Document]): Mongoengine document declaring the rules.
+        fields (dict): Field values to validate.
+
+    Raises:
+        ValidationError: One of the given fields is invalid.
+
+    Returns:
+        dict: Fields as they must be written to the database.
+    """
+    document = document_cls(**fields)
+    try:
+        document.validate()
+    except ValidationError as e:
+        errors = {
+            name: error for name, error in (e.errors or {}).items() if name in fields
+        }
+        if errors:
+            raise ValidationError(f"Invalid fields: {', '.join(errors)}", errors=errors)
+
+    son = document.to_mongo().to_dict()
+    return {name: son[name] for name in fields if name in son}
+
+
+async def ensure_indexes(
+    collection: AsyncIOMotorCollection, document_cls: Type[Document]
+) -> None:
+    """Create the indexes declared on a document (``meta["indexes"]`` and
+    ``unique`` fields). Creating an index that already exists is a no-op.
+
+    Args:
+        collection (AsyncIOMotorCollection): Collection storing the documents.
+        document_cls (Type[Document]): Mongoengine document declaring indexes.
+    """
+    for spec in document_cls._meta["index_specs"]:
+        options = {key: value for key, value in spec.items() if key != "fields"}
+        await collection.create_index(spec["fields"], **options)
+
+
+def duplicate_key_field(error: DuplicateKeyError) -> Optional[str]:
+    """Get the field whose unique index rejected a write.
+
+    Args:
+        error (DuplicateKeyError): Error raised by the write.
+
+    Returns:
+        Optional[str]: Name of the field, None if it cannot be determined.
+    """
+    key_pattern = (error.details or {}).get("keyPattern")
+    if key_pattern:
+        return next(iter(key_pattern))
+
+    # Older servers only report the index name in the message: "index: email_1"
+    message = str(error)
+    if "index: " in message:
+        index_name = message.split("index: ", 1)[1].split(" ", 1)[0]
+        return index_name.rsplit("_", 1)[0]
+    return None
+
+
+def encode_cursor(created_at: datetime, id: ObjectId) -> str:
+    """Encode the position of the last item of a page as an opaque cursor.
+
+    Args:
+        created_at (datetime): Creation date of the last item.
+        id (ObjectId): Id of the last item.
+
+    Returns:
+        str: Cursor to request the next page.
+    """
+    data = json.dumps([created_at.isoformat(), str(id)]).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, ObjectId]:
+    """Decode a cursor built by ``encode_cursor``.
+
+    Raises:
+        ValueError: The cursor is malformed.
+
+    Returns:
+        tuple[datetime, ObjectId]: Creation date and id of the last item.
+    """
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), ObjectId(id)
+    except Exception:
+        raise ValueError("Invalid cursor")
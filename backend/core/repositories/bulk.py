@@ -0,0 +1,230 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from core.config import logger
+from core.models.MedicalHistory import MedicalHistory
+from core.models.user import CreateUser
+from core.models.user import HealthInfoRequest
+from core.models.user import User
+from core.repositories.base import validated_fields
+from core.repositories.medical_history import MedicalHistoryRepository
+from core.repositories.user import UserRepository
+from core.utils.password import password_hasher
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+# Longer NDJSON rows are rejected without being buffered whole
+MAX_LINE_LENGTH = 64 * 1024  # in bytes
+
+EXPORTED_USER_FIELDS = [
+    "username",
+    "email",
+    "sex",
+    "date_of_birth",
+    "phone_number",
+    "bio",
+    "profile_image",
+]
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_length: int = MAX_LINE_LENGTH
+) -> AsyncIterator[bytes]:
+    """Split a stream of bytes in lines, without buffering more than a line.
+
+    Lines longer than ``max_length`` are truncated to ``max_length + 1``
+    bytes, so that they are still rejected by ``_parse_row`` while the rest
+    of the line is dropped as it is received.
+
+    Args:
+        chunks (AsyncIterator[bytes]): Raw stream, e.g. a request body.
+        max_length (int, optional): Maximum length of a line, in bytes.
+
+    Yields:
+        bytes: Raw lines, without the line break, decoded with each row.
+    """
+    pending = b""
+    async for chunk in chunks:
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            yield line[: max_length + 1]
+        pending = pending[: max_length + 1]
+    if pending:
+        yield pending
+
+
+def _parse_row(line: bytes) -> tuple[dict, Optional[dict]]:
+    """Validate one NDJSON row and build the documents to insert.
+
+    A row holds the fields of ``CreateUser`` and an optional ``health_info``
+    object with the fields of ``HealthInfoRequest``. The password is hashed
+    later, for the whole batch at once.
+
+    Raises:
+        ValueError: The row is too long, not UTF-8 or not valid JSON.
+        ValidationError: A field is invalid.
+
+    Returns:
+        tuple[dict, Optional[dict]]: User document, medical history fields.
+    """
+    if len(line) > MAX_LINE_LENGTH:
+        raise ValueError(f"Line longer than {MAX_LINE_LENGTH} bytes")
+    data = json.loads(line.decode("utf-8"))
+    health_info = data.pop("health_info", None)
+
+    input = CreateUser(**data)
+    user = User(
+        id=ObjectId(),
+        created_at=datetime.now(),
+        username=input.username,
+        password=input.password,
+        email=input.email,
+        sex=input.sex,
+        date_of_birth=input.date_of_birth,
+    )
+
+    health_fields = None
+    if health_info:
+        fields = HealthInfoRequest(**health_info).model_dump(exclude_none=True)
+        fields["last_updated"] = datetime.utcnow()
+        health_fields = validated_fields(MedicalHistory, fields)
+        user.has_allergies = bool(health_fields.get("allergies"))
+    user.validate()
+
+    return user.to_mongo().to_dict(), health_fields
+
+
+async def _write_batch(batch: list[tuple[int, dict, Optional[dict]]]) -> dict:
+    """Insert a batch of users and their medical histories.
+
+    Returns:
+        dict: Error message of the rejected rows, by line number.
+    """
+    hashes = await asyncio.gather(
+        *(password_hasher.hash(user["password"], bulk=True) for _, user, _ in batch)
+    )
+    for (_, user, _), hashed in zip(batch, hashes):
+        user["password"] = hashed
+
+    errors = {}
+    try:
+        await UserRepository.collection().insert_many(
+            [user for _, user, _ in batch], ordered=False
+        )
+    except BulkWriteError as e:
+        for error in e.details["writeErrors"]:
+            errors[batch[error["index"]][0]] = error["errmsg"]
+
+    requests = [
+        UpdateOne({"user": user["_id"]}, {"$set": health_fields}, upsert=True)
+        for line_number, user, health_fields in batch
+        if health_fields and line_number not in errors
+    ]
+    if requests:
+        await MedicalHistoryRepository.collection().bulk_write(requests, ordered=False)
+
+    return errors
+
+
+async def import_users(
+    lines: AsyncIterator[bytes], batch_size: int = 1000
+) -> AsyncIterator[dict]:
+    """Import users and their medical histories from NDJSON rows, written in
+    batches of ``batch_size`` rows.
+
+    Args:
+        lines (AsyncIterator[bytes]): Raw NDJSON rows (see ``iter_lines``).
+        batch_size (int, optional): Rows per write. Defaults to 1000.
+
+    Yields:
+        dict: ``{"line": n, "error": "..."}`` for each rejected row, then a
+        final ``{"imported": n, "failed": n}`` summary.
+    """
+    batch: list[tuple[int, dict, Optional[dict]]] = []
+    imported = 0
+    failed = 0
+    line_number = 0
+
+    async def flush():
+        nonlocal imported, failed
+        errors = await _write_batch(batch)
+        imported += len(batch) - len(errors)
+        failed += len(errors)
+        batch.clear()
+        return errors
+
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+
+        try:
+            user, health_fields = _parse_row(line)
+        except Exception as e:
+            failed += 1
+            yield {"line": line_number, "error": str(e)}
+            continue
+
+        batch.append((line_number, user, health_fields))
+        if len(batch) >= batch_size:
+            for error_line, error in (await flush()).items():
+                yield {"line": error_line, "error": error}
+
+    if batch:
+        for error_line, error in (await flush()).items():
+            yield {"line": error_line, "error": error}
+
+    logger.info(f"Bulk import done: {imported} imported, {failed} failed")
+    yield {"imported": imported, "failed": failed}
+
+
+def _export_row(document: dict) -> dict:
+    row = {}
+    for field in EXPORTED_USER_FIELDS:
+        value = document.get(field)
+        if isinstance(value, datetime):
+            value = value.date().isoformat()
+        if value is not None:
+            row[field] = value
+
+    if document.get("medical_history"):
+        health_info = MedicalHistory.serialize(document["medical_history"][0])
+        row["health_info"] = {
+            field: value
+            for field, value in health_info.items()
+            if field in HealthInfoRequest.model_fields and value not in (None, [])
+        }
+    return row
+
+
+async def export_users(batch_size: int = 1000) -> AsyncIterator[str]:
+    """Export users and their medical histories as NDJSON rows, streamed from
+    a cursor so the collection is never held in memory. Password hashes are
+    not exported.
+
+    Args:
+        batch_size (int, optional): Documents per cursor batch.
+        Defaults to 1000.
+
+    Yields:
+        str: NDJSON rows, with their line break.
+    """
+    pipeline = [
+        {"$sort": {"_id": 1}},
+        {
+            "$lookup": {
+                "from": MedicalHistory._get_collection_name(),
+                "localField": "_id",
+                "foreignField": "user",
+                "as": "medical_history",
+            }
+        },
+        {"$project": {"password": 0}},
+    ]
+    cursor = UserRepository.collection().aggregate(pipeline, batchSize=batch_size)
+    async for document in cursor:
+        yield json.dumps(_export_row(document), ensure_ascii=False) + "\n"
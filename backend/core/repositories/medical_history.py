@@ -0,0 +1,135 @@
+from typing import Optional
+
+from bson import ObjectId
+from core.models.MedicalHistory import MedicalHistory
+from core.repositories.base import ensure_indexes
+from core.repositories.base import validated_fields
+from core.repositories.user import UserRepository
+from core.utils.cache import cache
+from core.utils.connection import get_database
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+class MedicalHistoryRepository:
+    """Non-blocking data access for the medical_history collection.
+
+    Documents are returned already serialized with
+    ``MedicalHistory.serialize``, so the user reference is never dereferenced.
+    """
+
+    @staticmethod
+    def collection() -> AsyncIOMotorCollection:
+        return get_database()[MedicalHistory._get_collection_name()]
+
+    @staticmethod
+    def cache_key(user_id: ObjectId) -> str:
+        return f"health:{user_id}"
+
+    @staticmethod
+    async def ensure_indexes() -> None:
+        """Create the unique index on the user reference."""
+        await ensure_indexes(MedicalHistoryRepository.collection(), MedicalHistory)
+
+    @staticmethod
+    async def find_by_username(
+        username: str, user_id: Optional[ObjectId] = None
+    ) -> Optional[dict]:
+        """Get the medical history of a user, read through the cache, which
+        is keyed by user id.
+
+        The id comes from the session token when there is one, otherwise
+        from the cached user. With it, the history is a single lookup on the
+        indexed user reference. Without it, the user is matched on their
+        indexed username and joined with their history in one aggregation,
+        and both are cached.
+
+        Args:
+            username (str): Username of the user.
+            user_id (Optional[ObjectId], optional): Id of the user, e.g. from
+            a session token, which identifies the user even if they have
+            been renamed since.
+
+        Returns:
+            Optional[dict]: Serialized medical history, an empty dict if the
+            user has none, None if the user does not exist.
+        """
+        if user_id is None:
+            user = await cache.get(UserRepository.cache_key(username))
+            if user is None:
+                return await MedicalHistoryRepository._find_with_user(username)
+            user_id = user["_id"]
+
+        key = MedicalHistoryRepository.cache_key(user_id)
+        result = await cache.get(key)
+        if result is None:
+            document = await MedicalHistoryRepository.collection().find_one(
+                {"user": user_id}
+            )
+            result = MedicalHistory.serialize(document) if document else {}
+            await cache.set(key, result)
+        return result
+
+    @staticmethod
+    async def _find_with_user(username: str) -> Optional[dict]:
+        pipeline = [
+            {"$match": {"username": username}},
+            {"$limit": 1},
+            {
+                "$lookup": {
+                    "from": MedicalHistory._get_collection_name(),
+                    "localField": "_id",
+                    "foreignField": "user",
+                    "as": "medical_history",
+                }
+            },
+            {"$project": {"password": 0}},
+        ]
+
+        cursor = UserRepository.collection().aggregate(pipeline)
+        documents = await cursor.to_list(length=1)
+        if not documents:
+            return None
+
+        user = documents[0]
+        medical_history = user.pop("medical_history")
+        result = MedicalHistory.serialize(medical_history[0]) if medical_history else {}
+        await cache.set(UserRepository.cache_key(username), user)
+        await cache.set(MedicalHistoryRepository.cache_key(user["_id"]), result)
+        return result
+
+    @staticmethod
+    async def upsert(user_id: ObjectId, fields: dict) -> dict:
+        """Create or update the medical history of a user in a single
+        atomic round trip. Only the given fields are written, so concurrent
+        partial updates do not overwrite each other. The allergies flag of
+        the user is updated along with the allergies.
+
+        Args:
+            user_id (ObjectId): Id of the user.
+            fields (dict): Fields to set.
+
+        Returns:
+            dict: Serialized medical history after the update.
+        """
+        query = {"user": user_id}
+        update = {"$set": validated_fields(MedicalHistory, fields)}
+        collection = MedicalHistoryRepository.collection()
+
+        try:
+            document = await collection.find_one_and_update(
+                query, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Two concurrent upserts both tried to insert: the loser retries
+            # and now matches the document created by the winner.
+            document = await collection.find_one_and_update(
+                query, update, return_document=ReturnDocument.AFTER
+            )
+
+        if "allergies" in fields:
+            await UserRepository.set_has_allergies(
+                user_id, bool(document.get("allergies"))
+            )
+        return MedicalHistory.serialize(document)
@@ -0,0 +1,293 @@
+from datetime import date
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from core.models.MedicalHistory import MedicalHistory
+from core.models.user import User
+from core.repositories.base import ensure_indexes
+from core.repositories.base import validated_fields
+from core.utils.cache import cache
+from core.utils.connection import get_database
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+
+def _years_before(day: date, years: int) -> datetime:
+    """Same day ``years`` years earlier, Feb 29 falling back to Feb 28."""
+    try:
+        day = day.replace(year=day.year - years)
+    except ValueError:
+        day = day.replace(year=day.year - years, day=28)
+    return datetime(day.year, day.month, day.day)
+
+
+class UserRepository:
+    """Non-blocking data access for the User collection.
+
+    The validation rules stay declared on the mongoengine ``User`` document,
+    reads and writes go through the pooled Motor client.
+    """
+
+    @staticmethod
+    def collection() -> AsyncIOMotorCollection:
+        return get_database()[User._get_collection_name()]
+
+    @staticmethod
+    def cache_key(username: str) -> str:
+        return f"user:{username}"
+
+    @staticmethod
+    async def ensure_indexes() -> None:
+        """Create the unique username and email indexes."""
+        await ensure_indexes(UserRepository.collection(), User)
+
+    @staticmethod
+    async def create(fields: dict) -> User:
+        """Validate and insert a new user.
+
+        Args:
+            fields (dict): User fields.
+
+        Returns:
+            User: Created user, with its id.
+        """
+        user = User(created_at=datetime.now(), **fields)
+        user.validate()
+
+        result = await UserRepository.collection().insert_one(user.to_mongo().to_dict())
+        user.id = result.inserted_id
+        return user
+
+    @staticmethod
+    async def find_one(**query) -> Optional[User]:
+        """Find a user matching the query, with their password hash: used to
+        authenticate, never cached.
+
+        Returns:
+            Optional[User]: User found, None otherwise.
+        """
+        document = await UserRepository.collection().find_one(query)
+        if not document:
+            return None
+        return User._from_son(document)
+
+    @staticmethod
+    async def find_by_username(username: str) -> Optional[User]:
+        """Find a user from their username, read through the cache. The
+        password hash is neither loaded nor cached (see ``find_one``).
+
+        Args:
+            username (str): Username of the user.
+
+        Returns:
+            Optional[User]: User found, None otherwise.
+        """
+        key = UserRepository.cache_key(username)
+        document = await cache.get(key)
+        if document is None:
+            document = await UserRepository.collection().find_one(
+                {"username": username}, {"password": 0}
+            )
+            if not document:
+                return None
+            await cache.set(key, document)
+        return User._from_son(document)
+
+    @staticmethod
+    async def find_id_by_username(username: str) -> Optional[ObjectId]:
+        """Resolve a username to the user id, reading only the index.
+
+        Returns:
+            Optional[ObjectId]: Id of the user, None if it does not exist.
+        """
+        document = await cache.get(UserRepository.cache_key(username))
+        if document is None:
+            document = await UserRepository.collection().find_one(
+                {"username": username}, {"_id": 1}
+            )
+        return document["_id"] if document else None
+
+    @staticmethod
+    async def update_by_username(username: str, fields: dict) -> bool:
+        """Validate and write the given fields of a user in a single
+        conditional write. Uniqueness of the username and the email is
+        enforced by their unique indexes.
+
+        Args:
+            username (str): Username of the user to update.
+            fields (dict): Fields to update.
+
+        Raises:
+            DuplicateKeyError: The new username or email is already taken.
+
+        Returns:
+            bool: False if the user does not exist.
+        """
+        result = await UserRepository.collection().update_one(
+            {"username": username}, {"$set": validated_fields(User, fields)}
+        )
+        return result.matched_count > 0
+
+    @staticmethod
+    async def update(
+        user_id: ObjectId, fields: dict, username: Optional[str] = None
+    ) -> bool:
+        """Validate and write the given fields of a user.
+
+        Args:
+            user_id (ObjectId): Id of the user to update.
+            fields (dict): Fields to update.
+            username (Optional[str], optional): Only update the user if they
+            still have this username, e.g. for the id of a session token.
+
+        Raises:
+            DuplicateKeyError: The new username or email is already taken.
+
+        Returns:
+            bool: False if the user does not exist.
+        """
+        query: dict = {"_id": user_id}
+        if username is not None:
+            query["username"] = username
+        result = await UserRepository.collection().update_one(
+            query, {"$set": validated_fields(User, fields)}
+        )
+        return result.matched_count > 0
+
+    @staticmethod
+    async def list_page(
+        limit: int,
+        after: Optional[tuple[datetime, ObjectId]] = None,
+        sex: Optional[str] = None,
+        min_age: Optional[int] = None,
+        max_age: Optional[int] = None,
+        has_allergies: Optional[bool] = None,
+    ) -> list[dict]:
+        """List users, newest first, joined with a summary of their medical
+        history.
+
+        Pages are walked with a keyset on ``(created_at, _id)`` rather than
+        skip/limit, so that every page costs the same: the compound indexes
+        declared on ``User`` serve the sort, the sex and allergies filters
+        (on the denormalized ``has_allergies`` flag) and the date_of_birth
+        range. Only the users of the page are joined with their medical
+        history, on its unique ``user`` index.
+
+        Args:
+            limit (int): Maximum number of users.
+            after (Optional[tuple[datetime, ObjectId]], optional): created_at
+            and _id of the last user of the previous page.
+            sex (Optional[str], optional): Only users of this sex.
+            min_age (Optional[int], optional): Only users at least this old.
+            max_age (Optional[int], optional): Only users at most this old.
+            has_allergies (Optional[bool], optional): Only users with (or
+            without) known allergies.
+
+        Returns:
+            list[dict]: Raw users, with a ``medical_history`` summary.
+        """
+        query: dict = {}
+        if after:
+            created_at, id = after
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": id}},
+            ]
+        if sex is not None:
+            query["sex"] = sex
+        if has_allergies is not None:
+            query["has_allergies"] = has_allergies
+
+        today = date.today()
+        date_of_birth = {}
+        if min_age is not None:
+            date_of_birth["$lte"] = _years_before(today, min_age)
+        if max_age is not None:
+            date_of_birth["$gt"] = _years_before(today, max_age + 1)
+        if date_of_birth:
+            query["date_of_birth"] = date_of_birth
+
+        pipeline: list[dict] = [
+            {"$match": query},
+            {"$sort": {"created_at": -1, "_id": -1}},
+            {"$limit": limit},
+            {
+                "$lookup": {
+                    "from": MedicalHistory._get_collection_name(),
+                    "localField": "_id",
+                    "foreignField": "user",
+                    "as": "medical_history",
+                }
+            },
+            {
+                "$project": {
+                    "username": 1,
+                    "email": 1,
+                    "sex": 1,
+                    "date_of_birth": 1,
+                    "created_at": 1,
+                    "medical_history.blood_type": 1,
+                    "medical_history.allergies": 1,
+                    "medical_history.medical_conditions": 1,
+                    "medical_history.last_updated": 1,
+                }
+            },
+        ]
+
+        cursor = UserRepository.collection().aggregate(pipeline)
+        return await cursor.to_list(length=limit)
+
+    @staticmethod
+    async def set_has_allergies(user_id: ObjectId, has_allergies: bool) -> None:
+        """Update the denormalized allergies flag of a user, after a write
+        of their medical history."""
+        await UserRepository.collection().update_one(
+            {"_id": user_id}, {"$set": {"has_allergies": has_allergies}}
+        )
+
+    @staticmethod
+    async def backfill_has_allergies() -> None:
+        """Set the allergies flag of the users created before it existed."""
+        collection = UserRepository.collection()
+        if not await collection.find_one({"has_allergies": {"$exists": False}}):
+            return
+
+        histories = get_database()[MedicalHistory._get_collection_name()].find(
+            {"allergies.0": {"$exists": True}}, {"user": 1}
+        )
+        user_ids = [history["user"] async for history in histories]
+        await collection.update_many(
+            {"_id": {"$in": user_ids}, "has_allergies": {"$exists": False}},
+            {"$set": {"has_allergies": True}},
+        )
+        await collection.update_many(
+            {"has_allergies": {"$exists": False}}, {"$set": {"has_allergies": False}}
+        )
+
+    @staticmethod
+    def serialize_summary(document: dict) -> dict:
+        """Convert a user of ``list_page`` to its API representation.
+
+        Args:
+            document (dict): Raw user with its ``medical_history`` summary.
+
+        Returns:
+            dict: User summary.
+        """
+        medical_history = (document.get("medical_history") or [{}])[0]
+        date_of_birth = document.get("date_of_birth")
+        last_updated = medical_history.get("last_updated")
+        return {
+            "id": str(document["_id"]),
+            "username": document.get("username"),
+            "email": document.get("email"),
+            "sex": document.get("sex"),
+            "date_of_birth": date_of_birth.date().isoformat()
+            if date_of_birth
+            else None,
+            "created_at": document["created_at"].isoformat(),
+            "blood_type": medical_history.get("blood_type"),
+            "allergies": medical_history.get("allergies") or [],
+            "medical_conditions": medical_history.get("medical_conditions") or [],
+            "health_last_updated": last_updated.isoformat() if last_updated else None,
+        }
@@ -0,0 +1,369 @@
+import asyncio
+import io
+import math
+import subprocess
+import wave
+from collections.abc import AsyncIterator
+from typing import BinaryIO
+from typing import Optional
+from typing import Union
+
+import numpy as np
+from core.config import logger
+from numpy.lib.stride_tricks import sliding_window_view
+
+SAMPLE_RATE = 16_000  # Whisper input sample rate
+WAV_BLOCK_FRAMES = 64 * 1024
+
+_PCM_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+# fmt: off
+FFMPEG_COMMAND = [
+    "ffmpeg",
+    "-nostdin",
+    "-loglevel", "error",
+    "-threads", "0",
+    "-i", "pipe:0",
+    "-f", "s16le",
+    "-ac", "1",
+    "-acodec", "pcm_s16le",
+    "-ar", str(SAMPLE_RATE),
+    "pipe:1",
+]
+# fmt: on
+
+
+class AudioDecodeError(ValueError):
+    pass
+
+
+def _to_mono(samples: np.ndarray, channels: int) -> np.ndarray:
+    """Down-mix interleaved float samples to mono."""
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+class Resampler:
+    """Windowed-sinc polyphase resampler to 16 kHz, fed by blocks.
+
+    The anti-aliasing low-pass filter (Kaiser window) removes the content
+    above 8 kHz of higher rate audio before it is decimated, so that it is
+    not folded back into the band heard by Whisper. Only the last samples of
+    the previous block are kept between calls.
+
+    Args:
+        rate (int): Sample rate of the input, in Hz.
+        zero_crossings (int, optional): Half length of the filter, in zero
+        crossings of the sinc. Longer is sharper and slower.
+    """
+
+    ROLLOFF = 0.9  # cutoff, as a fraction of the lower Nyquist frequency
+    KAISER_BETA = 8.0
+
+    def __init__(self, rate: int, zero_crossings: int = 16):
+        divisor = math.gcd(rate, SAMPLE_RATE)
+        self.up = SAMPLE_RATE // divisor
+        self.down = rate // divisor
+        self.inputs = 0
+        self.outputs = 0
+        if self.up == self.down:
+            return
+
+        # Filter at the upsampled rate, split in ``up`` phases of ``taps``
+        scale = max(self.up, self.down)
+        self.delay = zero_crossings * scale
+        n = np.arange(2 * self.delay + 1) - self.delay
+        h = self.ROLLOFF * self.up / scale * np.sinc(self.ROLLOFF * n / scale)
+        h *= np.kaiser(len(n), self.KAISER_BETA)
+        self.taps = -(-len(h) // self.up)
+        h = np.pad(h, (0, self.taps * self.up - len(h)))
+        # Phase p weighs the inputs of a window, oldest first, by
+        # h[p + (taps - 1) * up], ..., h[p + up], h[p]
+        bank = h.reshape(self.taps, self.up).T[:, ::-1]
+        self.bank = np.ascontiguousarray(bank, dtype=np.float32)
+        # Input samples from index ``start`` on, zeros before the first one
+        self.start = -self.taps
+        self.buffer = np.zeros(self.taps, np.float32)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample the next block of mono float samples.
+
+        Returns:
+            np.ndarray: The 16 kHz float32 samples that can be computed so
+            far, the filter needs a few samples after each output.
+        """
+        samples = samples.astype(np.float32, copy=False)
+        self.inputs += len(samples)
+        if self.up == self.down:
+            self.outputs += len(samples)
+            return samples
+        self.buffer = np.concatenate((self.buffer, samples))
+        return self._resample(self.start + len(self.buffer))
+
+    def flush(self) -> np.ndarray:
+        """Resample the end of the input, padded with silence.
+
+        Returns:
+            np.ndarray: Last 16 kHz float32 samples.
+        """
+        if self.up == self.down:
+            return np.zeros(0, np.float32)
+        padding = np.zeros(self.delay // self.up + 1, np.float32)
+        self.buffer = np.concatenate((self.buffer, padding))
+        total = self.inputs * self.up // self.down
+        return self._resample(self.start + len(self.buffer), total)
+
+    def _resample(self, available: int, total: Optional[int] = None) -> np.ndarray:
+        # Output k is centered on upsampled index k * down + delay, its
+        # newest input is (k * down + delay) // up
+        end = (available * self.up - 1 - self.delay) // self.down + 1
+        if total is not None:
+            end = min(end, total)
+        if end <= self.outputs:
+            return np.zeros(0, np.float32)
+
+        # Outputs ``up`` apart share a phase of the filter, and their inputs
+        # are ``down`` apart: one strided matrix product by phase
+        count = end - self.outputs
+        output = np.empty(count, np.float32)
+        windows = sliding_window_view(self.buffer, self.taps)
+        for i in range(min(self.up, count)):
+            newest, phase = divmod((self.outputs + i) * self.down + self.delay, self.up)
+            first = newest - self.start - self.taps + 1
+            n = len(range(i, count, self.up))
+            output[i :: self.up] = (
+                windows[first : first + n * self.down : self.down] @ self.bank[phase]
+            )
+
+        self.outputs = end
+        next_oldest = (end * self.down + self.delay) // self.up - self.taps + 1
+        drop = max(0, next_oldest - self.start)
+        self.buffer = self.buffer[drop:]
+        self.start += drop
+        return output
+
+
+def _to_16k(samples: np.ndarray, rate: int) -> np.ndarray:
+    """Resample mono float samples to 16 kHz (see ``Resampler``)."""
+    resampler = Resampler(rate)
+    return np.concatenate((resampler.process(samples), resampler.flush()))
+
+
+def _as_file(source: Union[bytes, BinaryIO]) -> BinaryIO:
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def _remaining_bytes(file: BinaryIO) -> int:
+    position = file.tell()
+    size = file.seek(0, io.SEEK_END)
+    file.seek(position)
+    return size - position
+
+
+def decode_wav(source: Union[bytes, BinaryIO]) -> np.ndarray:
+    """Decode a PCM WAV file in process, without ffmpeg.
+
+    Frames are read, down-mixed and resampled by blocks into the 16 kHz
+    output, so that only the output grows with the length of the file. The
+    output is sized from the frame count of the header, which the uploader
+    controls: a count of 0 or larger than the file (e.g. the 0xFFFFFFFF of
+    streamed WAV) is rejected, for ffmpeg to decode the file instead.
+
+    Args:
+        source (Union[bytes, BinaryIO]): WAV file content, or a file object.
+
+    Raises:
+        AudioDecodeError: Not a PCM WAV file, or unreliable frame count.
+
+    Returns:
+        np.ndarray: 16 kHz mono float32 samples in [-1, 1].
+    """
+    file = _as_file(source)
+    size = _remaining_bytes(file)
+    try:
+        with wave.open(file, "rb") as wav:
+            width = wav.getsampwidth()
+            channels = wav.getnchannels()
+            rate = wav.getframerate()
+            if width not in _PCM_DTYPES:
+                raise AudioDecodeError(f"Unsupported WAV sample width: {width} bytes")
+            if not 0 < wav.getnframes() <= size // (width * channels):
+                raise AudioDecodeError(
+                    f"WAV header announces {wav.getnframes()} frames "
+                    f"in {size} bytes"
+                )
+
+            resampler = Resampler(rate)
+            output = np.empty(
+                wav.getnframes() * resampler.up // resampler.down, np.float32
+            )
+            written = 0
+
+            def write(samples: np.ndarray) -> None:
+                nonlocal written
+                samples = samples[: len(output) - written]
+                output[written : written + len(samples)] = samples
+                written += len(samples)
+
+            while frames := wav.readframes(WAV_BLOCK_FRAMES):
+                samples = np.frombuffer(frames, _PCM_DTYPES[width]).astype(np.float32)
+                if width == 1:
+                    samples = (samples - 128) / 128
+                else:
+                    samples /= 2 ** (8 * width - 1)
+                write(resampler.process(_to_mono(samples, channels)))
+            write(resampler.flush())
+    except (wave.Error, EOFError) as e:
+        raise AudioDecodeError(f"Invalid WAV file: {str(e)}")
+
+    return output[:written]
+
+
+def decode_soundfile(source: Union[bytes, BinaryIO]) -> np.ndarray:
+    """Decode a FLAC/OGG/WAV file in process with libsndfile (soundfile).
+
+    Args:
+        source (Union[bytes, BinaryIO]): Audio file content, or a file object.
+
+    Raises:
+        AudioDecodeError: Unsupported or invalid file.
+
+    Returns:
+        np.ndarray: 16 kHz mono float32 samples in [-1, 1].
+    """
+    import soundfile
+
+    try:
+        samples, rate = soundfile.read(_as_file(source), dtype="float32")
+    except (RuntimeError, soundfile.LibsndfileError) as e:
+        raise AudioDecodeError(f"Invalid audio file: {str(e)}")
+
+    channels = samples.shape[1] if samples.ndim > 1 else 1
+    return _to_16k(_to_mono(samples.reshape(-1), channels), rate)
+
+
+def decode_ffmpeg(data: bytes) -> np.ndarray:
+    """Decode any format supported by ffmpeg, piping the file through its
+    stdin and reading raw PCM from its stdout: nothing touches the disk.
+
+    Containers that need a seekable input (e.g. MP4/M4A with the index at
+    the end) cannot be read from a pipe.
+
+    Args:
+        data (bytes): Audio file content.
+
+    Raises:
+        AudioDecodeError: ffmpeg could not decode the file.
+        RuntimeError: ffmpeg is not installed.
+
+    Returns:
+        np.ndarray: 16 kHz mono float32 samples in [-1, 1].
+    """
+    try:
+        process = subprocess.run(
+            FFMPEG_COMMAND, input=data, capture_output=True, check=True
+        )
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg is required to decode this audio format")
+    except subprocess.CalledProcessError as e:
+        raise _ffmpeg_error(e.stderr, e.returncode)
+
+    return np.frombuffer(process.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def _ffmpeg_error(stderr: bytes, returncode: int) -> AudioDecodeError:
+    lines = stderr.decode(errors="replace").strip().splitlines()
+    return AudioDecodeError(
+        f"Failed to decode audio: {lines[-1] if lines else returncode}"
+    )
+
+
+async def decode_ffmpeg_stream(chunks: AsyncIterator[bytes]) -> np.ndarray:
+    """Decode a stream of audio bytes through an ffmpeg pipe, writing each
+    chunk to ffmpeg as it is read: the encoded file is never held in memory.
+
+    Args:
+        chunks (AsyncIterator[bytes]): Audio file content, by chunks.
+
+    Raises:
+        AudioDecodeError: ffmpeg could not decode the file.
+        RuntimeError: ffmpeg is not installed.
+
+    Returns:
+        np.ndarray: 16 kHz mono float32 samples in [-1, 1].
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *FFMPEG_COMMAND,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg is required to decode this audio format")
+
+    async def feed():
+        try:
+            async for chunk in chunks:
+                process.stdin.write(chunk)  # type: ignore[union-attr]
+                await process.stdin.drain()  # type: ignore[union-attr]
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # ffmpeg gave up, its error is reported below
+        finally:
+            process.stdin.close()  # type: ignore[union-attr]
+
+    try:
+        output, errors, _ = await asyncio.gather(
+            process.stdout.read(),  # type: ignore[union-attr]
+            process.stderr.read(),  # type: ignore[union-attr]
+            feed(),
+        )
+        await process.wait()
+    except BaseException:
+        # e.g. the upload exceeded its size limit: stop ffmpeg right away
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    if process.returncode:
+        raise _ffmpeg_error(errors, process.returncode)
+    return np.frombuffer(output, np.int16).astype(np.float32) / 32768.0
+
+
+def decode_audio(data: bytes) -> np.ndarray:
+    """Decode an uploaded audio file in memory to the input of Whisper.
+
+    PCM WAV is decoded natively, FLAC and OGG with soundfile when it is
+    installed, everything else through an ffmpeg pipe. CPU bound, meant to
+    run in a thread.
+
+    Args:
+        data (bytes): Audio file content.
+
+    Raises:
+        AudioDecodeError: The file is empty or could not be decoded.
+
+    Returns:
+        np.ndarray: 16 kHz mono float32 samples in [-1, 1].
+    """
+    if not data:
+        raise AudioDecodeError("Empty audio file")
+
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            return decode_wav(data)
+        except AudioDecodeError as e:
+            # e.g. compressed WAV, ffmpeg may still decode it
+            logger.info(f"Native WAV decoding failed, using ffmpeg: {str(e)}")
+
+    elif data[:4] in (b"fLaC", b"OggS"):
+        try:
+            return decode_soundfile(data)
+        except ImportError:
+            pass
+        except AudioDecodeError as e:
+            logger.info(f"soundfile decoding failed, using ffmpeg: {str(e)}")
+
+    return decode_ffmpeg(data)
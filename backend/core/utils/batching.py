@@ -0,0 +1,144 @@
+import asyncio
+import time
+from collections.abc import Callable
+from typing import Any
+from typing import Generic
+from typing import Optional
+from typing import TypeVar
+
+from core.config import logger
+
+Item = TypeVar("Item")
+Result = TypeVar("Result")
+
+
+class BatchStats:
+    """Counters used to tune the batch size and wait of a scheduler."""
+
+    def __init__(self):
+        self.requests = 0
+        self.batches = 0
+        self.queue_time = 0.0
+        self.run_time = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "avg_queue_ms": 1000 * self.queue_time / self.requests
+            if self.requests
+            else 0.0,
+            "avg_batch_ms": 1000 * self.run_time / self.batches
+            if self.batches
+            else 0.0,
+        }
+
+
+class MicroBatcher(Generic[Item, Result]):
+    """Inference scheduler grouping the requests that arrive within a short
+    window into a single batched call.
+
+    A batch is run as soon as it holds ``max_batch_size`` items, or
+    ``max_wait`` seconds after its first item arrived. Batches run one at a
+    time in a worker thread, so they never compete for the model and the
+    CPU cores.
+
+    Args:
+        run_batch (Callable[[list[Item]], list[Result]]): Blocking batched
+        call, returning one result per item, in order.
+        max_batch_size (int): Maximum number of items of a batch.
+        max_wait (float): Maximum time to wait for a batch to fill, in
+        seconds.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list[Item]], list[Result]],
+        max_batch_size: int,
+        max_wait: float,
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.stats = BatchStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the scheduler on the running event loop."""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the scheduler, failing the requests still queued."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            while not self._queue.empty():  # type: ignore[union-attr]
+                _, future, _ = self._queue.get_nowait()  # type: ignore[union-attr]
+                future.cancel()
+            self._worker = None
+            self._queue = None
+
+    async def submit(self, item: Item) -> Result:
+        """Queue an item for the next batch and wait for its result.
+
+        Args:
+            item (Item): Input of the batched call.
+
+        Returns:
+            Result: Result of the item.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))  # type: ignore
+        return await future
+
+    async def _collect(self) -> list[tuple[Item, asyncio.Future, float]]:
+        queue: asyncio.Queue = self._queue  # type: ignore[assignment]
+        batch = [await queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            # Requests cancelled while waiting (e.g. client gone) are skipped
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            try:
+                results: list[Any] = await asyncio.to_thread(self.run_batch, items)
+            except Exception as e:
+                logger.error(f"Batch of {len(items)} failed: {str(e)}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.stats.batches += 1
+                self.stats.requests += len(batch)
+                self.stats.run_time += time.perf_counter() - started
+                self.stats.queue_time += sum(
+                    started - queued_at for _, _, queued_at in batch
+                )
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
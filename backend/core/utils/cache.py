@@ -0,0 +1,409 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+from typing import BinaryIO
+from typing import Optional
+
+from bson import json_util
+from core.config import logger
+from core.config import settings
+
+
+class CacheStats:
+    """Counters used to size a cache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class Cache:
+    """Interface of the cache backends.
+
+    Values are shared with the callers and must not be mutated.
+    """
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def as_dict(self) -> dict:
+        return self.stats.as_dict()
+
+
+class LRUCache(Cache):
+    """In-process cache, evicting the least recently used entry when full and
+    expiring entries after ``ttl`` seconds.
+
+    Args:
+        max_size (int): Maximum number of entries.
+        ttl (float): Time to live of an entry in seconds.
+        max_bytes (int, optional): Maximum total size of the values, for
+        bytes values. Defaults to 0, no limit.
+    """
+
+    def __init__(self, max_size: int, ttl: float, max_bytes: int = 0):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._pop(key)
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self._pop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        if self.max_bytes:
+            self.size += len(value)
+        while len(self._entries) > self.max_size or (
+            self.max_bytes and self.size > self.max_bytes
+        ):
+            self._pop(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            if self._pop(key) is not None:
+                self.stats.invalidations += 1
+
+    def _pop(self, key: str) -> Optional[tuple[float, Any]]:
+        entry = self._entries.pop(key, None)
+        if entry is not None and self.max_bytes:
+            self.size -= len(entry[1])
+        return entry
+
+
+class SharedCache(Cache):
+    """Cache shared between workers, stored in a Redis compatible server.
+
+    Values are serialized with ``bson.json_util`` so that documents with
+    ObjectId and datetime values round-trip. Evictions are done by the server
+    and are not counted.
+
+    Args:
+        client: Async Redis compatible client (``get``, ``set``, ``delete``).
+        ttl (float): Time to live of an entry in seconds.
+        prefix (str): Prefix of the keys, to share a server between apps.
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = "sana:"):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return json_util.loads(raw)
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.client.set(
+            self.prefix + key, json_util.dumps(value), ex=max(1, int(self.ttl))
+        )
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+            self.stats.invalidations += len(keys)
+
+
+class DiskCache(Cache):
+    """On-disk cache of bytes values, one file per entry, evicting the least
+    recently used entries once the files exceed ``max_bytes``.
+
+    Keys are used as file names and must be safe ones (e.g. hex digests).
+    The files already in the directory are reused, their modification time
+    giving their last use.
+
+    The size of the files is tracked per process: N worker processes sharing
+    a directory each evict their own entries, and may together use up to
+    N x ``max_bytes``.
+
+    Args:
+        directory (str): Directory of the files, created if needed.
+        max_bytes (int): Maximum total size of the files.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        super().__init__()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, int] = OrderedDict()
+
+        files = [
+            (file.stat(), file.name)
+            for file in self.directory.iterdir()
+            if file.is_file() and not file.name.startswith(".")
+        ]
+        for stat, name in sorted(files, key=lambda entry: entry[0].st_mtime):
+            self._entries[name] = stat.st_size
+            self.size += stat.st_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def path(self, key: str) -> Optional[Path]:
+        """Path of the file of an entry, marked as recently used, e.g. to
+        send it without reading it in memory.
+
+        Args:
+            key (str): Key of the entry.
+
+        Returns:
+            Optional[Path]: Path of the file, None if the key is not cached.
+        """
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        path = self.directory / key
+        try:
+            os.utime(path)
+        except FileNotFoundError:  # removed by another process
+            self._forget(key)
+            return None
+        return path
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """Open the file of an entry, marked as recently used. The open file
+        stays readable even if the entry is evicted meanwhile, by this
+        process or another one sharing the directory.
+
+        Args:
+            key (str): Key of the entry.
+
+        Returns:
+            Optional[BinaryIO]: File opened for reading, None if the key is
+            not cached.
+        """
+        path = self.path(key)
+        if path is None:
+            return None
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:  # evicted since
+            self._forget(key)
+            return None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        path = self.path(key)
+        if path is not None:
+            try:
+                value = await asyncio.to_thread(path.read_bytes)
+                self.stats.hits += 1
+                return value
+            except FileNotFoundError:
+                self._forget(key)
+        self.stats.misses += 1
+        return None
+
+    async def set(self, key: str, value: bytes) -> None:
+        await asyncio.to_thread(self._write, key, value)
+        self.size += len(value) - self._entries.pop(key, 0)
+        self._entries[key] = len(value)
+        while self.size > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._forget(oldest)
+            (self.directory / oldest).unlink(missing_ok=True)
+            self.stats.evictions += 1
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            if key in self._entries:
+                self._forget(key)
+                (self.directory / key).unlink(missing_ok=True)
+                self.stats.invalidations += 1
+
+    def _forget(self, key: str) -> None:
+        self.size -= self._entries.pop(key, 0)
+
+    def _write(self, key: str, value: bytes) -> None:
+        # Written aside then renamed, so that readers never see a partial file
+        temp = self.directory / f".{key}.{uuid.uuid4().hex}.tmp"
+        temp.write_bytes(value)
+        os.replace(temp, self.directory / key)
+
+
+class TieredCache(Cache):
+    """Memory tier in front of an optional disk tier: entries are written to
+    both, and promoted to memory when found on disk only.
+
+    The stats count the lookups of the whole cache, the tiers keep their own.
+
+    Args:
+        memory (Cache): Hot entries, e.g. an ``LRUCache``.
+        disk (Optional[DiskCache], optional): Larger, persistent tier.
+    """
+
+    def __init__(self, memory: Cache, disk: Optional[DiskCache] = None):
+        super().__init__()
+        self.memory = memory
+        self.disk = disk
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = await self.disk.get(key)
+            if value is not None:
+                await self.memory.set(key, value)
+
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.memory.set(key, value)
+        if self.disk is not None:
+            await self.disk.set(key, value)
+
+    async def delete(self, *keys: str) -> None:
+        await self.memory.delete(*keys)
+        if self.disk is not None:
+            await self.disk.delete(*keys)
+        self.stats.invalidations += len(keys)
+
+    def as_dict(self) -> dict:
+        stats = self.stats.as_dict()
+        stats["memory"] = self.memory.stats.as_dict()
+        if self.disk is not None:
+            stats["disk"] = {
+                **self.disk.stats.as_dict(),
+                "entries": len(self.disk),
+                "bytes": self.disk.size,
+            }
+        return stats
+
+
+def build_tiered_cache(
+    max_size: int,
+    ttl: float,
+    directory: str = "",
+    max_bytes: int = 0,
+    memory_max_bytes: int = 0,
+) -> TieredCache:
+    """Build a cache of bytes values with a memory tier and, when a directory
+    is given, a disk tier.
+
+    Args:
+        max_size (int): Maximum number of entries in memory.
+        ttl (float): Time to live of an entry in memory, in seconds.
+        directory (str, optional): Directory of the disk tier. Defaults to
+        no disk tier.
+        max_bytes (int, optional): Maximum size of the disk tier.
+        memory_max_bytes (int, optional): Maximum size of the memory tier.
+        Defaults to 0, bounded by ``max_size`` only.
+
+    Returns:
+        TieredCache: Cache.
+    """
+    disk = DiskCache(directory, max_bytes) if directory else None
+    memory = LRUCache(max_size=max_size, ttl=ttl, max_bytes=memory_max_bytes)
+    return TieredCache(memory, disk)
+
+
+class LocalSharedStore:
+    """Local stand-in for the Redis client of ``SharedCache``, for tests and
+    single-process development."""
+
+    def __init__(self):
+        self._data: dict[str, tuple[Optional[float], str]] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None) -> None:
+        expires_at = time.monotonic() + ex if ex else None
+        self._data[key] = (expires_at, value)
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self._data.pop(key, None) is not None for key in keys)
+
+
+def build_cache() -> Cache:
+    """Build the cache backend selected in the settings.
+
+    Returns:
+        Cache: Cache backend.
+    """
+    if settings.CACHE_BACKEND == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the redis package")
+        logger.info("Using shared Redis cache")
+        return SharedCache(
+            redis.Redis.from_url(settings.CACHE_REDIS_URL), ttl=settings.CACHE_TTL
+        )
+
+    if settings.CACHE_BACKEND == "local":
+        logger.info("Using local shared cache stand-in")
+        return SharedCache(LocalSharedStore(), ttl=settings.CACHE_TTL)
+
+    logger.info(f"Using in-process LRU cache ({settings.CACHE_MAX_SIZE} entries)")
+    return LRUCache(max_size=settings.CACHE_MAX_SIZE, ttl=settings.CACHE_TTL)
+
+
+cache = build_cache()
@@ -1,14 +1,53 @@
+from collections.abc import AsyncIterator
 from typing import Dict
 from typing import List
+from typing import Optional
+from typing import TYPE_CHECKING
 
 from core.config import logger
-from openai import OpenAI
+from core.config import settings
+
+# openai takes most of the startup time to import: it is imported when the
+# client is created
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 MAX_MESSAGES = 6
 sessions: Dict[str, List[Dict[str, str]]] = {}
 
+_client: Optional["AsyncOpenAI"] = None
+
+
+def get_openai_client() -> "AsyncOpenAI":
+    """Get the shared OpenAI client, created on first use.
+
+    Returns:
+        AsyncOpenAI: Client, reusing its connections between calls.
+    """
+    global _client
+
+    if _client is None:
+        from openai import AsyncOpenAI
+
+        _client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            timeout=settings.OPENAI_TIMEOUT,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+        )
+    return _client
+
+
+async def close_openai_client():
+    """Close the shared OpenAI client at application shutdown."""
+    global _client
 
-def chat(client: OpenAI, session_id: str, user_message: str):
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _start_turn(session_id: str, user_message: str) -> List[Dict[str, str]]:
+    """Add the patient message to the session and build the messages to send."""
     if session_id not in sessions:
         sessions[session_id] = []
 
@@ -34,20 +73,85 @@ def chat(client: OpenAI, session_id: str, user_message: str):
             }
         )
 
-    messages_to_send = system_messages + session
+    return system_messages + session
+
+
+def _end_turn(session_id: str, reply: str) -> None:
+    """Add the doctor reply to the session, ended after MAX_MESSAGES turns."""
+    session = sessions.get(session_id)
+    if session is None:
+        return
+
+    session.append({"role": "assistant", "content": reply})
+
+    if len(session) >= 2 * MAX_MESSAGES:
+        del sessions[session_id]
+
+
+async def chat(
+    session_id: str, user_message: str, client: Optional["AsyncOpenAI"] = None
+) -> Optional[str]:
+    """Send the patient message in its session and get the doctor reply.
+
+    Args:
+        session_id (str): Conversation session.
+        user_message (str): Patient message.
+        client (Optional[AsyncOpenAI], optional): OpenAI client. Defaults to
+        the shared client.
+
+    Returns:
+        Optional[str]: Reply, None if the completion failed.
+    """
+    messages_to_send = _start_turn(session_id, user_message)
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini", messages=messages_to_send
+        response = await (client or get_openai_client()).chat.completions.create(
+            model=settings.OPENAI_MODEL, messages=messages_to_send
         )
 
         reply = response.choices[0].message.content
-        session.append({"role": "assistant", "content": reply})
-
-        if len(session) >= 2 * MAX_MESSAGES:
-            del sessions[session_id]
+        _end_turn(session_id, reply)
 
         return reply
 
     except Exception as e:
         logger.error(e)
+        return None
+
+
+async def chat_stream(
+    session_id: str, user_message: str, client: Optional["AsyncOpenAI"] = None
+) -> AsyncIterator[str]:
+    """Send the patient message in its session and stream the doctor reply
+    as it is generated. The session is updated once the reply is complete.
+
+    Args:
+        session_id (str): Conversation session.
+        user_message (str): Patient message.
+        client (Optional[AsyncOpenAI], optional): OpenAI client. Defaults to
+        the shared client.
+
+    Raises:
+        openai.OpenAIError: The completion failed.
+
+    Yields:
+        str: Tokens of the reply.
+    """
+    messages_to_send = _start_turn(session_id, user_message)
+
+    try:
+        stream = await (client or get_openai_client()).chat.completions.create(
+            model=settings.OPENAI_MODEL, messages=messages_to_send, stream=True
+        )
+
+        parts = []
+        async for event in stream:
+            if event.choices and event.choices[0].delta.content:
+                parts.append(event.choices[0].delta.content)
+                yield event.choices[0].delta.content
+
+        _end_turn(session_id, "".join(parts))
+
+    except Exception as e:
+        logger.error(e)
+        raise
@@ -1,49 +1,124 @@
+from typing import Optional
+
 from core.config import logger
 from core.config import settings
-from mongoengine import connect
+from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+_client: Optional[AsyncIOMotorClient] = None
+
+
+def _pool_options() -> dict:
+    """Connection pool and timeout options shared by every client."""
+    return {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+    }
+
+
+def client_arguments() -> dict:
+    """Build the MongoClient arguments from the settings.
+
+    Shared by the async (Motor) client of the API and by synchronous
+    pymongo clients used in scripts.
+
+    Returns:
+        dict: Keyword arguments for MongoClient / AsyncIOMotorClient.
+    """
+    options = _pool_options()
+
+    # Si pas d'utilisateur/mot de passe, connexion locale
+    if not settings.MONGO_USER and not settings.MONGO_PWD:
+        logger.info("Using local MongoDB connection")
+        return {"host": settings.MONGO_HOST, **options}
+
+    # Connexion avec authentification
+    logger.info("Using authenticated MongoDB connection")
+    # Vérifier si c'est une connexion locale ou distante
+    if "localhost" in settings.MONGO_HOST or "127.0.0.1" in settings.MONGO_HOST:
+        # Connexion locale avec authentification
+        return {
+            "host": settings.MONGO_HOST,
+            "username": settings.MONGO_USER,
+            "password": settings.MONGO_PWD,
+            **options,
+        }
+
+    # Connexion MongoDB Atlas ou distante
+    return {
+        "host": (
+            "mongodb+srv://"
+            + settings.MONGO_USER
+            + ":"
+            + settings.MONGO_PWD
+            + "@"
+            + settings.MONGO_HOST
+        ),
+        **options,
+    }
 
 
 def database_connection():
-    """Connect to database."""
+    """Open the pooled database connection.
+
+    Meant to be called once at application startup: the underlying
+    client keeps a pool of sockets that is reused by every request.
+    """
+    global _client
+
     logger.info("Connecting to database...")
     logger.info(f"MongoDB Host: {settings.MONGO_HOST}")
     logger.info(f"MongoDB Database: {settings.MONGO_DB}")
     logger.info(f"MongoDB User: {settings.MONGO_USER}")
     logger.info(f"MongoDB Password: {'***' if settings.MONGO_PWD else 'None'}")
+    logger.info(
+        f"MongoDB pool: max={settings.MONGO_MAX_POOL_SIZE}, "
+        f"min={settings.MONGO_MIN_POOL_SIZE}"
+    )
 
     try:
-        # Si pas d'utilisateur/mot de passe, connexion locale
-        if not settings.MONGO_USER and not settings.MONGO_PWD:
-            logger.info("Using local MongoDB connection")
-            connect(db=settings.MONGO_DB, host=settings.MONGO_HOST)
-        else:
-            # Connexion avec authentification
-            logger.info("Using authenticated MongoDB connection")
-            # Vérifier si c'est une connexion locale ou distante
-            if "localhost" in settings.MONGO_HOST or "127.0.0.1" in settings.MONGO_HOST:
-                # Connexion locale avec authentification
-                connect(
-                    db=settings.MONGO_DB,
-                    host=settings.MONGO_HOST,
-                    username=settings.MONGO_USER,
-                    password=settings.MONGO_PWD,
-                )
-            else:
-                # Connexion MongoDB Atlas ou distante
-                connect(
-                    db=settings.MONGO_DB,
-                    host=(
-                        "mongodb+srv://"
-                        + settings.MONGO_USER
-                        + ":"
-                        + settings.MONGO_PWD
-                        + "@"
-                        + settings.MONGO_HOST
-                    ),
-                )
-
+        _client = AsyncIOMotorClient(**client_arguments())
         logger.info("Successfully connected to database.")
 
     except Exception as e:
         logger.error(f"Failed to connect to database: {str(e)}")
         raise Exception(f"Database connection failed: {str(e)}")
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    """Get the application database on the pooled client.
+
+    Returns:
+        AsyncIOMotorDatabase: Database handle.
+    """
+    if _client is None:
+        raise RuntimeError("Database connection is not open")
+    return _client[settings.MONGO_DB]
+
+
+def close_database_connection():
+    """Close the pooled database connection at application shutdown."""
+    global _client
+
+    logger.info("Closing database connection...")
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+async def ping_database() -> bool:
+    """Check that the database answers on the pooled connection.
+
+    Returns:
+        bool: True if the server replied to a ping.
+    """
+    try:
+        await get_database().command("ping")
+        return True
+    except Exception as e:
+        logger.error(f"Database ping failed: {str(e)}")
+        return False
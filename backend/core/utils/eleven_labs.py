@@ -1,22 +1,70 @@
+from collections.abc import AsyncIterator
+from typing import Optional
+
 import httpx
 from core.config import logger
 from core.config import settings
+from core.utils.http_client import get_http_client
+from core.utils.http_client import HTTPClientStats
+from core.utils.http_client import RequestTrace
 
+CHUNK_SIZE = 4096
+TTS_MODEL_ID = "eleven_multilingual_v2"
+OUTPUT_FORMAT = "mp3_44100_128"
 
-async def text_to_speech(text: str) -> bytes:
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                url=settings.TTS_URL,
-                headers={
-                    "xi-api-key": settings.ELEVENLABS_API_KEY,
-                },
-                json={"text": text, "model_id": "eleven_multilingual_v2"},
-            )
+tts_stats = HTTPClientStats()
+
+
+async def stream_text_to_speech(
+    text: str,
+    client: Optional[httpx.AsyncClient] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """Synthesize speech with the streaming TTS endpoint, yielding the MP3
+    audio as it arrives. At most ``chunk_size`` bytes are held at once.
+
+    Args:
+        text (str): Text to synthesize.
+        client (Optional[httpx.AsyncClient], optional): HTTP client to use.
+        Defaults to the shared client.
+        chunk_size (int, optional): Size of the yielded chunks.
 
+    Raises:
+        httpx.HTTPError: The TTS service failed or is unreachable.
+
+    Yields:
+        bytes: Chunks of MP3 audio.
+    """
+    trace = RequestTrace()
+    async with (client or get_http_client()).stream(
+        "POST",
+        url=f"{settings.TTS_URL}/stream",
+        params={"output_format": OUTPUT_FORMAT},
+        headers={
+            "xi-api-key": settings.ELEVENLABS_API_KEY,
+        },
+        json={"text": text, "model_id": TTS_MODEL_ID},
+        extensions={"trace": trace},
+    ) as response:
+        tts_stats.record(trace, response)
+        if response.is_error:
+            await response.aread()
+            logger.error(
+                f"TTS request failed ({response.status_code}): {response.text}"
+            )
             response.raise_for_status()
 
-        except Exception as e:
-            logger.error(e)
+        async for chunk in response.aiter_bytes(chunk_size):
+            yield chunk
+
+
+async def text_to_speech(text: str) -> bytes:
+    """Synthesize speech and buffer the whole MP3 audio.
+
+    Args:
+        text (str): Text to synthesize.
 
-        return response.content
+    Returns:
+        bytes: MP3 audio.
+    """
+    return b"".join([chunk async for chunk in stream_text_to_speech(text)])
@@ -0,0 +1,152 @@
+import importlib.util
+import time
+from collections import Counter
+from typing import Optional
+
+import httpx
+from core.config import logger
+from core.config import settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+class RequestTrace:
+    """Timings of one request, filled by the httpx "trace" extension.
+
+    Pass it as ``extensions={"trace": trace}``. Events are stored without
+    their protocol prefix, so HTTP/1.1 and HTTP/2 requests read the same.
+    """
+
+    def __init__(self):
+        self.events: dict[str, float] = {}
+
+    async def __call__(self, event_name: str, info: dict) -> None:
+        protocol, _, event = event_name.partition(".")
+        if protocol in ("http11", "http2"):
+            event_name = event
+        self.events[event_name] = time.perf_counter()
+
+    def _duration(self, start: str, end: str) -> Optional[float]:
+        if start in self.events and end in self.events:
+            return self.events[end] - self.events[start]
+        return None
+
+    @property
+    def reused_connection(self) -> bool:
+        return "connection.connect_tcp.started" not in self.events
+
+    @property
+    def connect_time(self) -> Optional[float]:
+        return self._duration(
+            "connection.connect_tcp.started", "connection.connect_tcp.complete"
+        )
+
+    @property
+    def tls_time(self) -> Optional[float]:
+        return self._duration(
+            "connection.start_tls.started", "connection.start_tls.complete"
+        )
+
+    @property
+    def time_to_first_byte(self) -> Optional[float]:
+        """From sending the request to receiving the response headers."""
+        return self._duration(
+            "send_request_headers.started", "receive_response_headers.complete"
+        )
+
+
+class HTTPClientStats:
+    """Counters of the requests made on the shared client, to tune its pool."""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.connect_time = 0.0
+        self.tls_time = 0.0
+        self.time_to_first_byte = 0.0
+        self.http_versions: Counter[str] = Counter()
+
+    def record(self, trace: RequestTrace, response: httpx.Response) -> None:
+        self.requests += 1
+        self.new_connections += not trace.reused_connection
+        self.connect_time += trace.connect_time or 0.0
+        self.tls_time += trace.tls_time or 0.0
+        self.time_to_first_byte += trace.time_to_first_byte or 0.0
+        self.http_versions[response.http_version] += 1
+
+    def as_dict(self) -> dict:
+        def average_ms(total: float, count: int) -> float:
+            return 1000 * total / count if count else 0.0
+
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "connection_reuse_ratio": (
+                1 - self.new_connections / self.requests if self.requests else 0.0
+            ),
+            "avg_connect_ms": average_ms(self.connect_time, self.new_connections),
+            "avg_tls_ms": average_ms(self.tls_time, self.new_connections),
+            "avg_ttfb_ms": average_ms(self.time_to_first_byte, self.requests),
+            "http_versions": dict(self.http_versions),
+        }
+
+
+def client_arguments() -> dict:
+    """Build the pool, timeout and protocol options of the shared client.
+
+    Returns:
+        dict: Keyword arguments for httpx.AsyncClient.
+    """
+    http2 = settings.HTTP2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP2 requires the h2 package (httpx[http2]), using HTTP/1.1")
+        http2 = False
+
+    return {
+        "http2": http2,
+        "limits": httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(
+            settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT
+        ),
+    }
+
+
+def open_http_client():
+    """Open the shared HTTP client.
+
+    Meant to be called once at application startup: its keep-alive
+    connections are reused by every call to the external APIs.
+    """
+    global _client
+
+    arguments = client_arguments()
+    logger.info(
+        f"Opening HTTP client: http2={arguments['http2']}, "
+        f"max_connections={settings.HTTP_MAX_CONNECTIONS}"
+    )
+    _client = httpx.AsyncClient(**arguments)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client.
+
+    Returns:
+        httpx.AsyncClient: Shared client.
+    """
+    if _client is None:
+        raise RuntimeError("HTTP client is not open")
+    return _client
+
+
+async def close_http_client():
+    """Close the shared HTTP client at application shutdown."""
+    global _client
+
+    logger.info("Closing HTTP client...")
+    if _client is not None:
+        await _client.aclose()
+        _client = None
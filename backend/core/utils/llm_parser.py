@@ -1,9 +1,19 @@
 import json
+from typing import Optional
 
 import openai
 from core.config import settings
 
-client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+_client: Optional[openai.OpenAI] = None
+
+
+def get_client() -> openai.OpenAI:
+    """Get the OpenAI client, created on first use rather than at import."""
+    global _client
+
+    if _client is None:
+        _client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+    return _client
 
 
 def parse_medical_text(text: str) -> dict:
@@ -13,7 +23,7 @@ def parse_medical_text(text: str) -> dict:
         "symptoms, duration, intensity, other. "
         f'Text: "{text}" Respond only with the JSON.'
     )
-    response = client.chat.completions.create(
+    response = get_client().chat.completions.create(
         model="gpt-3.5-turbo",
         messages=[
             {
@@ -0,0 +1,276 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from core.config import logger
+from core.config import settings
+
+SCRYPT_PREFIX = "$scrypt$"
+ARGON2_PREFIX = "$argon2"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def legacy_hash(password: str, salt: str) -> str:
+    """Hash used before the password hashing service: salted blake2b."""
+    return hashlib.blake2b(
+        password.encode("utf-8"),
+        digest_size=15,
+        salt=salt.encode("utf-8"),
+    ).hexdigest()
+
+
+def is_legacy_hash(hashed: str) -> bool:
+    return not hashed.startswith("$")
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode("utf-8"),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=256 * n * r * p,
+        dklen=32,
+    )
+
+
+def hash_password(password: str, algorithm: str, params: dict) -> str:
+    """Hash a password with a memory-hard KDF. CPU bound, meant to run in the
+    process pool of ``PasswordHasher``.
+
+    Args:
+        password (str): Password to hash.
+        algorithm (str): "scrypt" or "argon2".
+        params (dict): Cost parameters of the algorithm.
+
+    Returns:
+        str: Self-describing hash (algorithm, parameters, salt and digest).
+    """
+    if algorithm == "argon2":
+        from argon2 import PasswordHasher as Argon2Hasher
+
+        return Argon2Hasher(**params).hash(password)
+
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, params["n"], params["r"], params["p"])
+    return (
+        f"{SCRYPT_PREFIX}n={params['n']},r={params['r']},p={params['p']}"
+        f"${_b64encode(salt)}${_b64encode(digest)}"
+    )
+
+
+def verify_password(password: str, hashed: str, legacy_salt: str = "") -> bool:
+    """Check a password against a hash produced by ``hash_password`` or by
+    ``legacy_hash``. CPU bound, meant to run in the process pool of
+    ``PasswordHasher``.
+
+    Args:
+        password (str): Password to check.
+        hashed (str): Stored hash.
+        legacy_salt (str, optional): Salt of legacy blake2b hashes.
+
+    Returns:
+        bool: True if the password matches.
+    """
+    if is_legacy_hash(hashed):
+        return hmac.compare_digest(legacy_hash(password, legacy_salt), hashed)
+
+    if hashed.startswith(ARGON2_PREFIX):
+        from argon2 import PasswordHasher as Argon2Hasher
+        from argon2.exceptions import InvalidHashError
+        from argon2.exceptions import VerificationError
+
+        try:
+            return Argon2Hasher().verify(hashed, password)
+        except (InvalidHashError, VerificationError):
+            return False
+
+    if hashed.startswith(SCRYPT_PREFIX):
+        params, salt, digest = hashed[len(SCRYPT_PREFIX) :].split("$")
+        cost = dict(item.split("=") for item in params.split(","))
+        expected = _scrypt(
+            password, _b64decode(salt), int(cost["n"]), int(cost["r"]), int(cost["p"])
+        )
+        return hmac.compare_digest(expected, _b64decode(digest))
+
+    return False
+
+
+def needs_rehash(hashed: str, algorithm: str, params: dict) -> bool:
+    """Tell if a hash was produced with another algorithm or other costs than
+    the configured ones, e.g. a legacy blake2b hash.
+
+    Args:
+        hashed (str): Stored hash.
+        algorithm (str): Configured algorithm.
+        params (dict): Configured cost parameters.
+
+    Returns:
+        bool: True if the password should be hashed again.
+    """
+    if is_legacy_hash(hashed):
+        return True
+
+    if algorithm == "argon2":
+        if not hashed.startswith(ARGON2_PREFIX):
+            return True
+        from argon2 import PasswordHasher as Argon2Hasher
+
+        return Argon2Hasher(**params).check_needs_rehash(hashed)
+
+    expected = f"{SCRYPT_PREFIX}n={params['n']},r={params['r']},p={params['p']}$"
+    return not hashed.startswith(expected)
+
+
+class PasswordHasher:
+    """Password hashing service.
+
+    Hashes are computed in a bounded pool of processes so that a login storm
+    never blocks the event loop, and at most ``max_pending`` hashes are queued
+    at once. Bulk hashes (imports) go through a lower-priority lane of
+    ``bulk_pending`` hashes at once, so that logins never queue behind a
+    whole import batch.
+
+    Args:
+        algorithm (str): "scrypt" or "argon2".
+        params (dict): Cost parameters of the algorithm.
+        workers (int): Number of hashing processes.
+        max_pending (Optional[int], optional): Hashes submitted to the pool at
+        once. Defaults to 4 per worker.
+        bulk_pending (Optional[int], optional): Bulk hashes submitted to the
+        pool at once. Defaults to all workers but one.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        params: dict,
+        workers: int,
+        max_pending: Optional[int] = None,
+        bulk_pending: Optional[int] = None,
+    ):
+        self.algorithm = algorithm
+        self.params = params
+        self.workers = workers
+        self.max_pending = max_pending or 4 * workers
+        self.bulk_pending = bulk_pending or max(1, workers - 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bulk_semaphore: Optional[asyncio.Semaphore] = None
+        # Hash of a random password, checked for unknown usernames
+        self._dummy_hash: Optional[str] = None
+
+    def start(self) -> None:
+        """Start the process pool."""
+        if self._executor is None:
+            logger.info(
+                f"Starting password hashing pool: {self.algorithm}, "
+                f"{self.workers} workers"
+            )
+            # "spawn": the pool starts on the first login, in a process
+            # that already runs the database and model loading threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+            self._bulk_semaphore = asyncio.Semaphore(self.bulk_pending)
+
+    def shutdown(self) -> None:
+        """Stop the process pool."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            self._semaphore = None
+            self._bulk_semaphore = None
+
+    async def _run(self, function, *args):
+        if self._executor is None:
+            self.start()
+        async with self._semaphore:  # type: ignore[union-attr]
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, function, *args
+            )
+
+    async def hash(self, password: str, bulk: bool = False) -> str:
+        """Hash a password with the configured algorithm.
+
+        Args:
+            password (str): Password to hash.
+            bulk (bool, optional): Hash in the lower-priority lane, e.g. for
+            an import. Defaults to False.
+
+        Returns:
+            str: Hash to store.
+        """
+        if not bulk:
+            return await self._run(hash_password, password, self.algorithm, self.params)
+
+        if self._executor is None:
+            self.start()
+        async with self._bulk_semaphore:  # type: ignore[union-attr]
+            return await self._run(hash_password, password, self.algorithm, self.params)
+
+    async def verify(self, password: str, hashed: str) -> tuple[bool, bool]:
+        """Check a password against a stored hash.
+
+        Args:
+            password (str): Password to check.
+            hashed (str): Stored hash.
+
+        Returns:
+            tuple[bool, bool]: Whether the password matches, and whether the
+            stored hash should be replaced by a hash with the configured
+            algorithm and costs.
+        """
+        if is_legacy_hash(hashed):
+            # blake2b is cheap, no need to go through the pool
+            valid = verify_password(password, hashed, settings.SALT)
+        else:
+            valid = await self._run(verify_password, password, hashed)
+
+        return valid, valid and needs_rehash(hashed, self.algorithm, self.params)
+
+    async def verify_unknown(self, password: str) -> tuple[bool, bool]:
+        """Check a password for a username that does not exist, against a
+        dummy hash, so that the response time does not reveal which
+        usernames exist.
+
+        Returns:
+            tuple[bool, bool]: Always (False, False), as ``verify``.
+        """
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash(secrets.token_urlsafe(16))
+        await self.verify(password, self._dummy_hash)
+        return False, False
+
+
+def _configured_params() -> dict:
+    if settings.PASSWORD_HASH_ALGORITHM == "argon2":
+        return {
+            "time_cost": settings.ARGON2_TIME_COST,
+            "memory_cost": settings.ARGON2_MEMORY_COST,
+            "parallelism": settings.ARGON2_PARALLELISM,
+        }
+    return {"n": settings.SCRYPT_N, "r": settings.SCRYPT_R, "p": settings.SCRYPT_P}
+
+
+password_hasher = PasswordHasher(
+    algorithm=settings.PASSWORD_HASH_ALGORITHM,
+    params=_configured_params(),
+    workers=settings.PASSWORD_HASH_WORKERS,
+)
@@ -0,0 +1,197 @@
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from typing import NamedTuple
+from typing import Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from core.config import logger
+from core.config import settings
+from core.utils.user import Role
+from fastapi import Depends
+from fastapi import HTTPException
+from fastapi import status
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.security import HTTPBearer
+
+if not settings.TOKEN_SECRET:
+    logger.warning(
+        "TOKEN_SECRET is not set: using a random secret, session tokens will "
+        "not survive a restart nor be shared between workers"
+    )
+_secret = (settings.TOKEN_SECRET or secrets.token_hex(32)).encode("utf-8")
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class SessionUser(NamedTuple):
+    """User identified by a session token."""
+
+    user_id: ObjectId
+    username: str
+    role: Role = Role.PATIENT
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(message: bytes) -> str:
+    return _b64encode(hmac.new(_secret, message, hashlib.sha256).digest())
+
+
+def create_token(
+    user_id: ObjectId, username: str, role: Optional[Role] = Role.PATIENT
+) -> str:
+    """Create a signed and expiring session token (JWT, HS256).
+
+    Args:
+        user_id (ObjectId): Id of the authenticated user.
+        username (str): Username of the authenticated user.
+        role (Optional[Role], optional): Role of the authenticated user.
+        Defaults to Role.PATIENT.
+
+    Returns:
+        str: Session token.
+    """
+    header = {"alg": "HS256", "typ": "JWT"}
+    now = int(time.time())
+    payload = {
+        "sub": str(user_id),
+        "username": username,
+        "role": (role or Role.PATIENT).value,
+        "iat": now,
+        "exp": now + settings.TOKEN_TTL,
+    }
+    message = (
+        _b64encode(json.dumps(header, separators=(",", ":")).encode("utf-8"))
+        + "."
+        + _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    )
+    return message + "." + _sign(message.encode("ascii"))
+
+
+def verify_token(token: str) -> SessionUser:
+    """Verify the signature and the expiry of a session token, in process.
+
+    Args:
+        token (str): Session token.
+
+    Raises:
+        InvalidToken: The token is malformed, forged or expired.
+
+    Returns:
+        SessionUser: User identified by the token.
+    """
+    try:
+        token.encode("ascii")
+        header, payload, signature = token.split(".")
+    except (UnicodeEncodeError, ValueError):
+        raise InvalidToken("Malformed token")
+
+    expected = _sign(f"{header}.{payload}".encode("ascii"))
+    if not hmac.compare_digest(expected, signature):
+        raise InvalidToken("Invalid token signature")
+
+    try:
+        claims = json.loads(_b64decode(payload))
+        if claims["exp"] < time.time():
+            raise InvalidToken("Token expired")
+        return SessionUser(
+            ObjectId(claims["sub"]),
+            claims["username"],
+            Role(claims.get("role", Role.PATIENT.value)),
+        )
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise InvalidToken("Malformed token")
+
+
+async def optional_session(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+) -> Optional[SessionUser]:
+    """FastAPI dependency: the user of the bearer token, if one is sent.
+
+    Raises:
+        HTTPException: A token is sent but is invalid.
+    """
+    if credentials is None:
+        return None
+    try:
+        return verify_token(credentials.credentials)
+    except InvalidToken as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def require_role(*roles: Role):
+    """Build a FastAPI dependency requiring a session token of one of the
+    given roles.
+
+    Args:
+        roles (Role): Roles allowed to call the route.
+
+    Returns:
+        Callable: Dependency returning the user of the token.
+    """
+
+    async def dependency(
+        session: Optional[SessionUser] = Depends(optional_session),
+    ) -> SessionUser:
+        if session is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if session.role not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient role",
+            )
+        return session
+
+    return dependency
+
+
+require_admin = require_role(Role.ADMIN)
+require_clinician = require_role(Role.CLINICIAN, Role.ADMIN)
+
+
+def session_user_id(
+    username: str, session: Optional[SessionUser]
+) -> Optional[ObjectId]:
+    """Get the id of the user targeted by a route from its session token.
+
+    Args:
+        username (str): Username of the route.
+        session (Optional[SessionUser]): User of the token, if one was sent.
+
+    Raises:
+        HTTPException: The token belongs to another user.
+
+    Returns:
+        Optional[ObjectId]: Id of the user, None without token.
+    """
+    if session is None:
+        return None
+    if session.username != username:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token does not belong to this user",
+        )
+    return session.user_id
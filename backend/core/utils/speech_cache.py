@@ -0,0 +1,187 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import unicodedata
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from collections.abc import Iterable
+from pathlib import Path
+from typing import BinaryIO
+from typing import Optional
+
+from core.config import logger
+from core.config import settings
+from core.utils.cache import build_tiered_cache
+from core.utils.cache import CacheStats
+from core.utils.cache import TieredCache
+from core.utils.eleven_labs import OUTPUT_FORMAT
+from core.utils.eleven_labs import stream_text_to_speech
+from core.utils.eleven_labs import TTS_MODEL_ID
+
+WHITESPACE = re.compile(r"\s+")
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def normalize_text(text: str) -> str:
+    """Normalize the text of a reply so that the same sentence, however it
+    is spaced or encoded, is synthesized once."""
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class SpeechCache:
+    """Cache of synthesized speech, keyed by the normalized text and
+    everything else that changes the audio: TTS endpoint (voice), voice id,
+    model and output format.
+
+    Hot entries are kept in memory and all of them on disk (see
+    ``TieredCache``), from where they can be sent without being read.
+
+    Args:
+        cache (TieredCache): Storage of the MP3 audio.
+        synthesize (Callable[[str], AsyncIterator[bytes]], optional): TTS
+        call on a cache miss. Defaults to ``stream_text_to_speech``.
+    """
+
+    def __init__(
+        self,
+        cache: TieredCache,
+        synthesize: Callable[[str], AsyncIterator[bytes]] = stream_text_to_speech,
+    ):
+        self.cache = cache
+        self.synthesize = synthesize
+        # Replies served from the cache, from a file or through ``stream``
+        self.stats = CacheStats()
+
+    @staticmethod
+    def key(text: str) -> str:
+        """Key of the speech of a text."""
+        parts = [
+            normalize_text(text),
+            settings.TTS_URL,
+            settings.VOICE_ID,
+            TTS_MODEL_ID,
+            OUTPUT_FORMAT,
+        ]
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    def open(self, text: str) -> Optional[BinaryIO]:
+        """Open the file of the cached speech of a text, to send it without
+        reading it in memory (see ``iter_file``). Once open, it can still be
+        read if the entry is evicted: the file is removed, not its content.
+
+        Returns:
+            Optional[BinaryIO]: MP3 file opened for reading, None if not on
+            disk.
+        """
+        if self.cache.disk is None:
+            return None
+        file = self.cache.disk.open(self.key(text))
+        if file is not None:
+            self.stats.hits += 1
+        return file
+
+    async def stream(self, text: str) -> AsyncIterator[bytes]:
+        """Stream the speech of a text from the cache, or from the TTS
+        service while storing it. Interrupted syntheses are not cached.
+
+        Args:
+            text (str): Text to synthesize.
+
+        Yields:
+            bytes: Chunks of MP3 audio.
+        """
+        key = self.key(text)
+        audio = await self.cache.get(key)
+        if audio is not None:
+            self.stats.hits += 1
+            yield audio
+            return
+
+        self.stats.misses += 1
+        chunks = []
+        async for chunk in self.synthesize(text):
+            chunks.append(chunk)
+            yield chunk
+        await self.cache.set(key, b"".join(chunks))
+
+    def as_dict(self) -> dict:
+        return {**self.cache.as_dict(), **self.stats.as_dict()}
+
+    async def prewarm(self, phrases: Iterable[str]) -> int:
+        """Synthesize the phrases that are not cached yet, one at a time.
+
+        Args:
+            phrases (Iterable[str]): Frequent replies, e.g. greetings.
+
+        Returns:
+            int: Number of phrases synthesized.
+        """
+        synthesized = 0
+        for phrase in phrases:
+            disk = self.cache.disk
+            if not phrase.strip() or (disk and self.key(phrase) in disk):
+                continue
+            try:
+                async for _ in self.stream(phrase):
+                    pass
+                synthesized += 1
+            except Exception as e:
+                logger.error(f"Failed to pre-warm TTS cache: {str(e)}")
+        logger.info(f"TTS cache pre-warmed with {synthesized} phrases")
+        return synthesized
+
+
+async def iter_file(
+    file: BinaryIO, chunk_size: int = FILE_CHUNK_SIZE
+) -> AsyncIterator[memoryview]:
+    """Send an open file zero-copy: it is memory-mapped and its pages are
+    handed to the socket as memoryview slices, without being read nor
+    copied in Python. The file is closed at once, the mapping stays valid
+    even if the file is removed meanwhile.
+
+    Yields:
+        memoryview: Chunks of the file.
+    """
+    with file:
+        if not os.fstat(file.fileno()).st_size:
+            return
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    try:
+        for start in range(0, len(view), chunk_size):
+            yield view[start : start + chunk_size]
+    finally:
+        del view
+        try:
+            mapped.close()
+        except BufferError:
+            pass  # a chunk is still queued by the transport: closed once sent
+
+
+def read_phrases(path: str) -> list[str]:
+    """Read a phrase list, one phrase per line."""
+    return [line.strip() for line in Path(path).read_text().splitlines()]
+
+
+def build_speech_cache() -> Optional[SpeechCache]:
+    """Build the speech cache configured in the settings.
+
+    Returns:
+        Optional[SpeechCache]: Cache, None if disabled (TTS_CACHE_SIZE=0).
+    """
+    if not settings.TTS_CACHE_SIZE:
+        return None
+    return SpeechCache(
+        build_tiered_cache(
+            max_size=settings.TTS_CACHE_SIZE,
+            ttl=settings.TTS_CACHE_TTL,
+            directory=settings.TTS_CACHE_DIR,
+            max_bytes=settings.TTS_CACHE_MAX_BYTES,
+            memory_max_bytes=settings.TTS_CACHE_MEMORY_MAX_BYTES,
+        )
+    )
+
+
+speech_cache = build_speech_cache()
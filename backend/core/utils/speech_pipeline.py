@@ -0,0 +1,108 @@
+import asyncio
+import re
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from typing import Optional
+
+from core.config import settings
+from core.utils.eleven_labs import stream_text_to_speech
+
+# End of a sentence: punctuation, optional closing quotes/brackets, a space
+SENTENCE_END = re.compile(r"[.!?…]+[\"'»)\]]*\s+")
+
+
+async def sentence_chunks(
+    tokens: AsyncIterator[str], min_length: Optional[int] = None
+) -> AsyncIterator[str]:
+    """Group a stream of LLM tokens into sentences, as soon as each one is
+    complete. Sentences shorter than ``min_length`` are merged with the next
+    one, so that TTS is not called for a lone "Dr." or "Ok.".
+
+    Args:
+        tokens (AsyncIterator[str]): LLM tokens.
+        min_length (Optional[int], optional): Minimum length of a chunk in
+        characters. Defaults to PIPELINE_MIN_SENTENCE_LENGTH.
+
+    Yields:
+        str: Sentence-sized chunks of text.
+    """
+    if min_length is None:
+        min_length = settings.PIPELINE_MIN_SENTENCE_LENGTH
+
+    buffer = ""
+    async for token in tokens:
+        buffer += token
+        start = 0
+        for match in SENTENCE_END.finditer(buffer):
+            if match.end() - start >= min_length:
+                yield buffer[start : match.end()].strip()
+                start = match.end()
+        buffer = buffer[start:]
+
+    if buffer.strip():
+        yield buffer.strip()
+
+
+async def pipelined_speech(
+    sentences: AsyncIterator[str],
+    synthesize: Callable[[str], AsyncIterator[bytes]] = stream_text_to_speech,
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Synthesize sentences while they are still being generated.
+
+    Up to ``concurrency`` sentences are synthesized at once. Their audio is
+    yielded in the order of the sentences, each one streamed as it arrives,
+    so playback starts with the first sentence.
+
+    Args:
+        sentences (AsyncIterator[str]): Sentences to synthesize.
+        synthesize (Callable[[str], AsyncIterator[bytes]], optional): TTS
+        stream of a text. Defaults to stream_text_to_speech.
+        concurrency (Optional[int], optional): Sentences synthesized at once.
+        Defaults to PIPELINE_TTS_CONCURRENCY.
+
+    Raises:
+        Exception: The sentences stream or a synthesis failed.
+
+    Yields:
+        bytes: Chunks of audio, the segments of each sentence concatenated.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.PIPELINE_TTS_CONCURRENCY)
+    # One queue of audio chunks per sentence, in order, None when done
+    segments: asyncio.Queue = asyncio.Queue()
+    tasks: list[asyncio.Task] = []
+
+    async def synthesize_segment(text: str, chunks: asyncio.Queue) -> None:
+        try:
+            async for chunk in synthesize(text):
+                await chunks.put(chunk)
+            await chunks.put(None)
+        except Exception as e:
+            await chunks.put(e)
+        finally:
+            semaphore.release()
+
+    async def produce() -> None:
+        try:
+            async for sentence in sentences:
+                await semaphore.acquire()
+                chunks: asyncio.Queue = asyncio.Queue()
+                await segments.put(chunks)
+                tasks.append(asyncio.create_task(synthesize_segment(sentence, chunks)))
+            await segments.put(None)
+        except Exception as e:
+            await segments.put(e)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (chunks := await segments.get()) is not None:
+            if isinstance(chunks, Exception):
+                raise chunks
+            while (chunk := await chunks.get()) is not None:
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+    finally:
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
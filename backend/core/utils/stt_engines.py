@@ -0,0 +1,236 @@
+from typing import Optional
+from typing import TYPE_CHECKING
+from typing import Union
+
+import numpy as np
+from core.utils.audio import SAMPLE_RATE
+
+# torch, whisper and faster_whisper take seconds to import: they are imported
+# when an engine is created
+if TYPE_CHECKING:
+    import whisper
+
+N_SAMPLES = 30 * SAMPLE_RATE  # Whisper input window
+
+
+def transcribe_batch(
+    model: "whisper.Whisper",
+    audios: list[np.ndarray],
+    options: Optional["whisper.DecodingOptions"] = None,
+) -> list[str]:
+    """Transcribe several audios in a single batched encoder/decoder pass.
+
+    Each audio is cut in 30-second segments, padded to the Whisper input
+    size, and all the segments are decoded together.
+
+    Args:
+        model (whisper.Whisper): Whisper model.
+        audios (list[np.ndarray]): 16 kHz mono float32 samples.
+        options (Optional[whisper.DecodingOptions], optional): Decoding
+        options. Defaults to greedy decoding without timestamps.
+
+    Returns:
+        list[str]: Transcription of each audio.
+    """
+    import torch
+    import whisper
+
+    segments = []
+    owners = []
+    for index, audio in enumerate(audios):
+        for start in range(0, max(len(audio), 1), whisper.audio.N_SAMPLES):
+            segments.append(audio[start : start + whisper.audio.N_SAMPLES])
+            owners.append(index)
+
+    mel = torch.stack(
+        [
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(segment), n_mels=model.dims.n_mels
+            )
+            for segment in segments
+        ]
+    ).to(model.device)
+    options = options or whisper.DecodingOptions(
+        fp16=model.device.type == "cuda", without_timestamps=True
+    )
+    results = whisper.decode(model, mel, options)
+
+    texts: list[list[str]] = [[] for _ in audios]
+    for owner, result in zip(owners, results):
+        texts[owner].append(result.text.strip())
+    return [" ".join(text) for text in texts]
+
+
+def detect_languages(
+    model: "whisper.Whisper", audio: np.ndarray, top_k: int = 3
+) -> list[tuple[str, float]]:
+    """Detect the spoken language with the language-detection head of
+    Whisper, on the first 30 seconds of the audio only: a single encoder pass
+    and decoder step instead of a full transcription.
+
+    Args:
+        model (whisper.Whisper): Whisper model.
+        audio (np.ndarray): 16 kHz mono float32 samples.
+        top_k (int, optional): Number of languages returned. Defaults to 3.
+
+    Returns:
+        list[tuple[str, float]]: Most probable language codes with their
+        probability, most probable first.
+    """
+    import whisper
+
+    if not model.is_multilingual:
+        return [("en", 1.0)]
+
+    mel = whisper.log_mel_spectrogram(
+        whisper.pad_or_trim(audio[: whisper.audio.N_SAMPLES]),
+        n_mels=model.dims.n_mels,
+    ).to(model.device)
+    _, probs = model.detect_language(mel)
+    ranked = sorted(probs.items(), key=lambda item: item[1], reverse=True)
+    return [(language, float(prob)) for language, prob in ranked[:top_k]]
+
+
+class STTEngine:
+    """Interface of the speech to text backends.
+
+    An engine holds a loaded model and is used from one thread at a time.
+
+    Args:
+        model_name (str): Model size, e.g. "base" or "small".
+        threads (int): CPU threads of the inference, 0 for the backend
+        default.
+        compute_type (str): Precision of the weights, "" for the backend
+        default.
+    """
+
+    name = ""
+    default_compute_type = ""
+
+    def __init__(self, model_name: str, threads: int = 0, compute_type: str = ""):
+        self.model_name = model_name
+        self.threads = threads
+        self.compute_type = compute_type or self.default_compute_type
+
+    def describe(self) -> str:
+        """Backend, model and precision, e.g. to key cached transcriptions."""
+        return f"{self.name}:{self.model_name}:{self.compute_type}"
+
+    def transcribe(self, audio: Union[str, np.ndarray]) -> dict:
+        """Transcribe an audio.
+
+        Returns:
+            dict: "text" and "language" of the audio.
+        """
+        raise NotImplementedError
+
+    def transcribe_batch(self, audios: list[np.ndarray]) -> list[str]:
+        """Transcribe several audios, one at a time unless the backend can
+        batch them."""
+        return [self.transcribe(audio)["text"] for audio in audios]
+
+    def detect_languages(
+        self, audio: np.ndarray, top_k: int = 3
+    ) -> list[tuple[str, float]]:
+        """Most probable languages of an audio, most probable first."""
+        raise NotImplementedError
+
+
+class WhisperEngine(STTEngine):
+    """Reference openai-whisper (PyTorch) backend.
+
+    Compute types: "float32", or "float16" on GPU.
+    """
+
+    name = "whisper"
+    default_compute_type = "float32"
+
+    def __init__(self, model_name: str, threads: int = 0, compute_type: str = ""):
+        import torch
+        import whisper
+
+        super().__init__(model_name, threads, compute_type)
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = whisper.load_model(model_name)
+        self.fp16 = self.compute_type == "float16"
+
+    def transcribe(self, audio: Union[str, np.ndarray]) -> dict:
+        result = self.model.transcribe(audio, fp16=self.fp16)
+        return {"text": result["text"], "language": result["language"]}
+
+    def transcribe_batch(self, audios: list[np.ndarray]) -> list[str]:
+        return transcribe_batch(self.model, audios)
+
+    def detect_languages(
+        self, audio: np.ndarray, top_k: int = 3
+    ) -> list[tuple[str, float]]:
+        return detect_languages(self.model, audio, top_k)
+
+
+class FasterWhisperEngine(STTEngine):
+    """CTranslate2 backend (faster-whisper), quantized to int8 by default:
+    several times faster than PyTorch on CPU, for a small loss of accuracy.
+
+    Compute types: see CTranslate2, e.g. "int8", "int8_float32", "float32".
+    """
+
+    name = "faster-whisper"
+    default_compute_type = "int8"
+
+    def __init__(self, model_name: str, threads: int = 0, compute_type: str = ""):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError("STT_BACKEND=faster-whisper requires faster-whisper")
+
+        super().__init__(model_name, threads, compute_type)
+        self.model = WhisperModel(
+            model_name,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=threads,
+        )
+
+    def transcribe(self, audio: Union[str, np.ndarray]) -> dict:
+        segments, info = self.model.transcribe(audio)
+        text = "".join(segment.text for segment in segments)
+        return {"text": text, "language": info.language}
+
+    def detect_languages(
+        self, audio: np.ndarray, top_k: int = 3
+    ) -> list[tuple[str, float]]:
+        # The language is detected eagerly, segments are only decoded when
+        # iterated: they are dropped without decoding
+        _, info = self.model.transcribe(audio[:N_SAMPLES])
+        probs = info.all_language_probs or [(info.language, info.language_probability)]
+        return [(language, float(prob)) for language, prob in probs[:top_k]]
+
+
+ENGINES: dict[str, type[STTEngine]] = {
+    engine.name: engine for engine in (WhisperEngine, FasterWhisperEngine)
+}
+
+
+def create_engine(
+    backend: str, model_name: str, threads: int = 0, compute_type: str = ""
+) -> STTEngine:
+    """Create the engine of a backend, loading its model.
+
+    Args:
+        backend (str): "whisper" or "faster-whisper".
+        model_name (str): Model size, e.g. "base".
+        threads (int, optional): CPU threads, 0 for the backend default.
+        compute_type (str, optional): Precision, "" for the backend default.
+
+    Raises:
+        ValueError: Unknown backend.
+
+    Returns:
+        STTEngine: Engine.
+    """
+    if backend not in ENGINES:
+        raise ValueError(
+            f"Unknown STT backend {backend}, expected one of {', '.join(ENGINES)}"
+        )
+    return ENGINES[backend](model_name, threads, compute_type)
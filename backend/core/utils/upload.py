@@ -0,0 +1,150 @@
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Optional
+
+import numpy as np
+from core.config import settings
+from core.utils.audio import AudioDecodeError
+from core.utils.audio import decode_ffmpeg_stream
+from core.utils.audio import decode_soundfile
+from core.utils.audio import decode_wav
+from fastapi import HTTPException
+from fastapi import status
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+
+def too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"Fichier trop volumineux (max {limit // (1024 * 1024)}MB)",
+    )
+
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies larger than the limit of their route with a
+    413, as soon as the limit is crossed.
+
+    A too large Content-Length is rejected before reading the body, other
+    bodies (e.g. chunked transfer encoding) are counted as they arrive and
+    the request is aborted when the count exceeds the limit.
+
+    Args:
+        app (ASGIApp): Application.
+        limits (dict[str, int]): Maximum body size in bytes, by path.
+    """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit:
+            error = too_large(limit)
+            response = JSONResponse(
+                {"detail": error.detail}, status_code=error.status_code
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Re-raised as is by FastAPI while parsing the body
+                    raise too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def iter_upload(
+    file: UploadFile, limit: Optional[int] = None, chunk_size: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """Read an uploaded file by fixed-size chunks, enforcing its size limit
+    on the bytes actually read.
+
+    Args:
+        file (UploadFile): Uploaded file.
+        limit (Optional[int], optional): Maximum size in bytes. Defaults to
+        MAX_UPLOAD_SIZE.
+        chunk_size (Optional[int], optional): Size of the chunks. Defaults
+        to UPLOAD_CHUNK_SIZE.
+
+    Raises:
+        HTTPException: 413, the file exceeds the limit.
+
+    Yields:
+        bytes: Chunks of the file.
+    """
+    limit = limit or settings.MAX_UPLOAD_SIZE
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    await file.seek(0)
+    read = 0
+    while chunk := await file.read(chunk_size):
+        read += len(chunk)
+        if read > limit:
+            raise too_large(limit)
+        yield chunk
+
+
+async def decode_upload(file: UploadFile, limit: Optional[int] = None) -> np.ndarray:
+    """Decode an uploaded audio file to the input of Whisper, reading it by
+    chunks: PCM WAV, FLAC and OGG (with soundfile) are decoded natively from
+    the spooled upload, other formats are streamed through ffmpeg.
+
+    The upload itself is spooled by Starlette, which writes parts larger
+    than 1 MB to a temporary file while parsing the request: decoding reads
+    that file by blocks rather than a copy of it in memory.
+
+    Args:
+        file (UploadFile): Uploaded audio file.
+        limit (Optional[int], optional): Maximum size in bytes. Defaults to
+        MAX_UPLOAD_SIZE.
+
+    Raises:
+        HTTPException: 413, the file exceeds the limit.
+        AudioDecodeError: The file is empty or could not be decoded.
+
+    Returns:
+        np.ndarray: 16 kHz mono float32 samples in [-1, 1].
+    """
+    limit = limit or settings.MAX_UPLOAD_SIZE
+    if file.size is not None and file.size > limit:
+        raise too_large(limit)
+
+    await file.seek(0)
+    header = await file.read(12)
+    await file.seek(0)
+    if not header:
+        raise AudioDecodeError("Empty audio file")
+
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        try:
+            return await asyncio.to_thread(decode_wav, file.file)
+        except AudioDecodeError:
+            pass  # e.g. compressed WAV, ffmpeg may still decode it
+    elif header[:4] in (b"fLaC", b"OggS"):
+        try:
+            return await asyncio.to_thread(decode_soundfile, file.file)
+        except (ImportError, AudioDecodeError):
+            pass
+
+    return await decode_ffmpeg_stream(iter_upload(file, limit))
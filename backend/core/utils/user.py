@@ -4,3 +4,9 @@ from enum import Enum
 class Sex(Enum):
     MALE = "MALE"
     FEMALE = "FEMALE"
+
+
+class Role(Enum):
+    PATIENT = "PATIENT"
+    CLINICIAN = "CLINICIAN"
+    ADMIN = "ADMIN"
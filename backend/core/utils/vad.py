@@ -0,0 +1,274 @@
+import importlib.util
+import threading
+from typing import NamedTuple
+from typing import Optional
+
+import numpy as np
+from core.config import logger
+from core.utils.audio import SAMPLE_RATE
+
+# Whisper input window: speech is packed in chunks of at most 30 seconds
+MAX_CHUNK_SAMPLES = 30 * SAMPLE_RATE
+# Longer speech regions are cut at their quietest frame of the last seconds
+# before the limit, rather than in the middle of a word
+CUT_WINDOW = 5 * SAMPLE_RATE
+FRAME = 30 * SAMPLE_RATE // 1000
+
+
+class Segment(NamedTuple):
+    """Chunk of speech and its span in the original audio, in samples."""
+
+    start: int
+    end: int
+    audio: np.ndarray
+
+
+def frame_energy(audio: np.ndarray) -> np.ndarray:
+    """Energy (RMS) of the 30 ms frames of an audio, in dBFS."""
+    frames = len(audio) // FRAME
+    energy = np.sqrt(
+        np.mean(np.square(audio[: frames * FRAME].reshape(frames, FRAME)), axis=1)
+    )
+    return 20 * np.log10(energy + 1e-10)
+
+
+class VADStats:
+    """Counters of the silence removed before transcription."""
+
+    def __init__(self):
+        self.requests = 0
+        self.audio_seconds = 0.0
+        self.removed_seconds = 0.0
+        self.silent_requests = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "silent_requests": self.silent_requests,
+            "audio_seconds": self.audio_seconds,
+            "removed_seconds": self.removed_seconds,
+            "avg_removed_seconds": self.removed_seconds / self.requests
+            if self.requests
+            else 0.0,
+            "removed_ratio": self.removed_seconds / self.audio_seconds
+            if self.audio_seconds
+            else 0.0,
+        }
+
+
+class VAD:
+    """Interface of the voice activity detectors.
+
+    Args:
+        min_silence_ms (int): Shorter pauses are kept inside speech regions.
+        padding_ms (int): Margin kept around each speech region, so that the
+        onsets and endings of words are not cut.
+    """
+
+    def __init__(self, min_silence_ms: int = 700, padding_ms: int = 200):
+        self.min_silence = min_silence_ms * SAMPLE_RATE // 1000
+        self.padding = padding_ms * SAMPLE_RATE // 1000
+        self.stats = VADStats()
+
+    def regions(self, audio: np.ndarray) -> list[tuple[int, int]]:
+        """Speech regions of an audio.
+
+        Args:
+            audio (np.ndarray): 16 kHz mono float32 samples.
+
+        Returns:
+            list[tuple[int, int]]: Start and end sample of each region, in
+            order, padded and not overlapping.
+        """
+        raise NotImplementedError
+
+    def segments(self, audio: np.ndarray) -> list[Segment]:
+        """Remove the silence of an audio and pack its speech regions in
+        segments of at most 30 seconds, split at the pauses.
+
+        Args:
+            audio (np.ndarray): 16 kHz mono float32 samples.
+
+        Returns:
+            list[Segment]: Segments to transcribe, in order, empty without
+            speech.
+        """
+        segments: list[Segment] = []
+        current: list[tuple[int, int]] = []
+        size = 0
+
+        def pack() -> None:
+            chunk = np.concatenate([audio[start:end] for start, end in current])
+            segments.append(Segment(current[0][0], current[-1][1], chunk))
+
+        for start, end in self._cut_long_regions(audio, self.regions(audio)):
+            if current and size + end - start > MAX_CHUNK_SAMPLES:
+                pack()
+                current, size = [], 0
+            current.append((start, end))
+            size += end - start
+        if current:
+            pack()
+
+        removed = len(audio) - sum(len(segment.audio) for segment in segments)
+        self.stats.requests += 1
+        self.stats.silent_requests += not segments
+        self.stats.audio_seconds += len(audio) / SAMPLE_RATE
+        self.stats.removed_seconds += removed / SAMPLE_RATE
+        return segments
+
+    def split(self, audio: np.ndarray) -> list[np.ndarray]:
+        """Chunks of speech of an audio (see ``segments``)."""
+        return [segment.audio for segment in self.segments(audio)]
+
+    @staticmethod
+    def _cut_long_regions(audio: np.ndarray, regions: list) -> list:
+        cut: list[tuple[int, int]] = []
+        for start, end in regions:
+            while end - start > MAX_CHUNK_SAMPLES:
+                window = start + MAX_CHUNK_SAMPLES - CUT_WINDOW
+                quietest = int(np.argmin(frame_energy(audio[window:end][:CUT_WINDOW])))
+                cut.append((start, window + quietest * FRAME + FRAME // 2))
+                start = cut[-1][1]
+            cut.append((start, end))
+        return cut
+
+    def _merge(self, regions: list[tuple[int, int]], length: int) -> list:
+        """Pad the regions and merge the ones separated by a short pause."""
+        merged: list[tuple[int, int]] = []
+        for start, end in regions:
+            start = max(0, start - self.padding)
+            end = min(length, end + self.padding)
+            if merged and start - merged[-1][1] < self.min_silence:
+                merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+            else:
+                merged.append((start, end))
+        return merged
+
+
+class EnergyVAD(VAD):
+    """Voice activity detection on the energy of 30 ms frames.
+
+    A frame is speech when it is louder than ``threshold_db`` (dBFS) and
+    ``margin_db`` above the noise floor of the recording, estimated as the
+    10th percentile of the frame energies. That floor is only trusted when
+    the quiet frames look like background noise: no louder than
+    ``max_noise_db`` and at least twice ``margin_db`` below the loudest
+    frame. Otherwise the recording has no pauses (e.g. louder and quieter
+    speakers) and only ``threshold_db`` applies.
+
+    Args:
+        threshold_db (float, optional): Absolute threshold, in dBFS.
+        margin_db (float, optional): Threshold above the noise floor.
+        max_noise_db (float, optional): Louder floors are taken for quiet
+        speech rather than noise, in dBFS.
+        min_speech_ms (int, optional): Shorter bursts (clicks) are ignored.
+        min_silence_ms (int, optional): See ``VAD``.
+        padding_ms (int, optional): See ``VAD``.
+    """
+
+    def __init__(
+        self,
+        threshold_db: float = -45.0,
+        margin_db: float = 10.0,
+        max_noise_db: float = -35.0,
+        min_speech_ms: int = 100,
+        min_silence_ms: int = 700,
+        padding_ms: int = 200,
+    ):
+        super().__init__(min_silence_ms, padding_ms)
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.max_noise_db = max_noise_db
+        self.min_speech = min_speech_ms * SAMPLE_RATE // 1000
+
+    def regions(self, audio: np.ndarray) -> list[tuple[int, int]]:
+        decibels = frame_energy(audio)
+        if not len(decibels):
+            return []
+
+        threshold = self.threshold_db
+        noise_floor = np.percentile(decibels, 10)
+        if (
+            noise_floor <= self.max_noise_db
+            and decibels.max() - noise_floor >= 2 * self.margin_db
+        ):
+            threshold = max(threshold, noise_floor + self.margin_db)
+        speech = np.concatenate(([False], decibels > threshold, [False]))
+        # Starts and ends (exclusive) of the runs of speech frames
+        edges = np.flatnonzero(np.diff(speech.astype(np.int8)))
+        regions = [
+            (start * FRAME, end * FRAME)
+            for start, end in zip(edges[::2], edges[1::2])
+            if (end - start) * FRAME >= self.min_speech
+        ]
+        return self._merge(regions, len(audio))
+
+
+class SileroVAD(VAD):
+    """Voice activity detection with the Silero neural model (optional
+    ``silero-vad`` package, model bundled): more robust than ``EnergyVAD``
+    to background noise, for about a millisecond per second of audio. The
+    model (and torch) is loaded on first use. It keeps a state across the
+    frames of an audio, so the audios are processed one at a time.
+
+    Args:
+        threshold (float, optional): Speech probability threshold.
+        min_silence_ms (int, optional): See ``VAD``.
+        padding_ms (int, optional): See ``VAD``.
+    """
+
+    def __init__(
+        self, threshold: float = 0.5, min_silence_ms: int = 700, padding_ms: int = 200
+    ):
+        if importlib.util.find_spec("silero_vad") is None:
+            raise RuntimeError("STT_VAD=silero requires the silero-vad package")
+
+        super().__init__(min_silence_ms, padding_ms)
+        self.threshold = threshold
+        self.model = None
+        self._lock = threading.Lock()
+
+    def regions(self, audio: np.ndarray) -> list[tuple[int, int]]:
+        import torch
+        from silero_vad import get_speech_timestamps
+        from silero_vad import load_silero_vad
+
+        # Called from worker threads: the model is loaded once and its state
+        # reset and carried by a single audio at a time
+        with self._lock:
+            if self.model is None:
+                self.model = load_silero_vad()
+            timestamps = get_speech_timestamps(
+                torch.from_numpy(audio),
+                self.model,
+                threshold=self.threshold,
+                sampling_rate=SAMPLE_RATE,
+            )
+        regions = [(stamp["start"], stamp["end"]) for stamp in timestamps]
+        return self._merge(regions, len(audio))
+
+
+def build_vad(kind: str, **options) -> Optional[VAD]:
+    """Build a voice activity detector.
+
+    Args:
+        kind (str): "energy", "silero", or "none" to disable it.
+        **options: min_silence_ms, padding_ms, and for "energy" threshold_db.
+
+    Raises:
+        ValueError: Unknown kind.
+
+    Returns:
+        Optional[VAD]: Detector, None if disabled.
+    """
+    if kind in ("", "none"):
+        return None
+    if kind == "silero":
+        options.pop("threshold_db", None)
+        logger.info("Using Silero voice activity detection")
+        return SileroVAD(**options)
+    if kind == "energy":
+        logger.info("Using energy-based voice activity detection")
+        return EnergyVAD(**options)
+    raise ValueError(f"Unknown VAD {kind}, expected energy, silero or none")
@@ -1,37 +1,421 @@
 import asyncio
+import hashlib
 import logging
+import os
+import threading
+from pathlib import Path
+from typing import NamedTuple
+from typing import Optional
+from typing import Union
 
-import whisper
+import numpy as np
+from core.utils.audio import decode_audio
+from core.utils.audio import SAMPLE_RATE
+from core.utils.batching import MicroBatcher
+from core.utils.cache import Cache
+from core.utils.stt_engines import create_engine
+from core.utils.stt_engines import STTEngine
+from core.utils.vad import EnergyVAD
+from core.utils.vad import VAD
+from core.utils.worker_pool import WorkerPool
 
 # Configuration du logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Short clip transcribed once the model is loaded, so that the first real
+# request does not pay for the lazy initialisations of torch
+WARM_UP_CLIP = np.zeros(SAMPLE_RATE, np.float32)
+
+
+def load_engine(
+    backend: str, model_name: str, threads: int = 0, compute_type: str = ""
+) -> STTEngine:
+    """Load a speech to text engine (see ``create_engine``) and run a warm-up
+    transcription on it."""
+    logger.info(f"Loading {backend} model {model_name}...")
+    engine = create_engine(backend, model_name, threads, compute_type)
+    engine.transcribe(WARM_UP_CLIP)
+    logger.info(f"{engine.describe()} model loaded.")
+    return engine
+
+
+class Transcription(NamedTuple):
+    text: str
+    language: str
+
+
+class TimedText(NamedTuple):
+    """Transcription of a segment of a long audio, times in seconds."""
+
+    start: float
+    end: float
+    text: str
+
+
+def stitch(segments: list[TimedText]) -> str:
+    """Transcript of the segments of a long audio, one line per segment
+    with its timestamps, e.g. "[01:02.5 --> 01:30.0] text"."""
+
+    def timestamp(seconds: float) -> str:
+        return f"{int(seconds // 60):02d}:{seconds % 60:04.1f}"
+
+    return "\n".join(
+        f"[{timestamp(segment.start)} --> {timestamp(segment.end)}] {segment.text}"
+        for segment in segments
+    )
+
+
+# Engine of the current worker process (see WhisperSTT workers mode)
+_worker_engine: Optional[STTEngine] = None
+
+
+def _load_worker_engine(*args) -> None:
+    global _worker_engine
+    _worker_engine = load_engine(*args)
+
+
+def _worker_transcribe(audio: Union[str, np.ndarray]) -> dict:
+    return _worker_engine.transcribe(audio)  # type: ignore[union-attr]
+
+
+def _worker_detect_languages(audio: np.ndarray, top_k: int) -> list:
+    return _worker_engine.detect_languages(audio, top_k)  # type: ignore
+
 
 class WhisperSTT:
-    def __init__(self, model_name: str = "base"):
-        logger.info("Loading Whisper model...")
-        self.model = whisper.load_model(model_name)
-        logger.info("Whisper model loaded.")
+    """Speech to text with a Whisper model, run by one of the engines of
+    ``core.utils.stt_engines``.
 
-    async def transcribe_audio(self, audio_path: str) -> str:
-        logger.info(f"Audio file received for transcription : {audio_path}")
-        logger.info("Starting transcription...")
+    The model is loaded in the background by ``start``, or on the first
+    transcription; ``ready`` tells when it can transcribe without waiting.
+
+    Args:
+        model_name (str, optional): Whisper model. Defaults to "base".
+        backend (str, optional): Engine, "whisper" or "faster-whisper".
+        Defaults to "whisper".
+        threads (int, optional): CPU threads of the engine in the API
+        process. Defaults to 0, the backend default.
+        compute_type (str, optional): Precision of the weights, e.g. "int8".
+        Defaults to the backend default.
+        batching (bool, optional): Group concurrent transcriptions in
+        batched passes (see ``STTEngine.transcribe_batch``) instead of
+        running each one in its own thread. Defaults to False.
+        max_batch_size (int, optional): Maximum transcriptions of a batch.
+        max_wait (float, optional): Maximum time to wait for a batch to
+        fill, in seconds.
+        workers (int, optional): Run the transcriptions in this many worker
+        processes, each one with its own model, instead of the API process.
+        Takes precedence over batching. Defaults to 0 (no worker process).
+        worker_threads (int, optional): CPU threads of each worker, pinned
+        so that the workers do not oversubscribe the cores.
+        max_queue (int, optional): Maximum transcriptions waiting for a
+        worker, beyond which ``PoolOverloaded`` is raised.
+        cache (Optional[Cache], optional): Cache of the transcriptions, keyed
+        by a hash of the samples (see ``cache_key``), e.g. a ``TieredCache``.
+        Defaults to no cache.
+        vad (Optional[VAD], optional): Voice activity detector removing the
+        silence before transcription (see ``core.utils.vad``). Defaults to
+        none.
+        long_audio_seconds (float, optional): Longer audios are split at
+        their pauses and the segments transcribed concurrently with workers
+        or batching, one after the other otherwise (see
+        ``transcribe_segments``). Defaults to 0, never split.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "base",
+        batching: bool = False,
+        max_batch_size: int = 8,
+        max_wait: float = 0.02,
+        workers: int = 0,
+        worker_threads: int = 1,
+        max_queue: int = 8,
+        cache: Optional[Cache] = None,
+        backend: str = "whisper",
+        threads: int = 0,
+        compute_type: str = "",
+        vad: Optional[VAD] = None,
+        long_audio_seconds: float = 0,
+    ):
+        self.model_name = model_name
+        self.backend = backend
+        self.threads = threads
+        self.compute_type = compute_type
+        self.engine: Optional[STTEngine] = None
+        self.pool: Optional[WorkerPool] = None
+        if workers:
+            self.pool = WorkerPool(
+                workers,
+                max_queue=max_queue,
+                initializer=_load_worker_engine,
+                initargs=(backend, model_name, worker_threads, compute_type),
+            )
+            batching = False
+
+        self.ready = False
+        self.load_error: Optional[str] = None
+        self._loading: Optional[asyncio.Task] = None
+
+        self.vad = vad
+        self.long_audio_samples = int(long_audio_seconds * SAMPLE_RATE)
+        if self.long_audio_samples and self.pool is None and not batching:
+            logger.warning(
+                "Long audios will be transcribed one segment at a time: "
+                "set workers or batching to transcribe them concurrently"
+            )
+        # Long audios are split at their pauses even without VAD
+        self._segmenter = vad or EnergyVAD()
+        self.cache = cache
+        self.coalesced = 0
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+        # Whisper installs its kv-cache hooks on the shared model modules:
+        # two decodings must never run on the same engine at the same time
+        self._model_lock = threading.Lock()
+
+        self.scheduler: Optional[MicroBatcher[np.ndarray, str]] = None
+        if batching:
+            self.scheduler = MicroBatcher(
+                self._transcribe_batch,
+                max_batch_size=max_batch_size,
+                max_wait=max_wait,
+            )
+
+    def start(self) -> None:
+        """Start loading the model (or the worker processes) in the
+        background, on the running event loop."""
+        if self._loading is None:
+            self._loading = asyncio.create_task(self._load())
 
-        def _transcribe():
-            return self.model.transcribe(audio_path)
+    async def _load(self) -> None:
+        try:
+            if self.pool is not None:
+                self.pool.start()
+                # Each worker loads and warms up its model before running
+                # its first task
+                await asyncio.gather(
+                    *(self.pool.submit(os.getpid) for _ in range(self.pool.workers))
+                )
+            else:
+                self.engine = await asyncio.to_thread(
+                    load_engine,
+                    self.backend,
+                    self.model_name,
+                    self.threads,
+                    self.compute_type,
+                )
+            self.ready = True
+        except Exception as e:
+            logger.error(f"Failed to load Whisper model: {str(e)}")
+            self.load_error = str(e)
 
-        result = await asyncio.to_thread(_transcribe)
+    @property
+    def status(self) -> str:
+        if self.ready:
+            return "ready"
+        if self.load_error is not None:
+            return "failed"
+        return "loading" if self._loading is not None else "not started"
+
+    async def wait_ready(self) -> None:
+        """Wait for the model to be loaded, starting to load it if needed.
+
+        Raises:
+            RuntimeError: The model failed to load.
+        """
+        self.start()
+        await asyncio.shield(self._loading)  # type: ignore[arg-type]
+        if not self.ready:
+            raise RuntimeError(f"Whisper model unavailable: {self.load_error}")
+
+    async def stop(self) -> None:
+        """Stop the batching scheduler and the worker processes."""
+        if self._loading is not None and not self._loading.done():
+            self._loading.cancel()
+        if self.scheduler is not None:
+            await self.scheduler.stop()
+        if self.pool is not None:
+            await asyncio.to_thread(self.pool.shutdown)
+
+    def _transcribe_batch(self, audios: list[np.ndarray]) -> list[str]:
+        with self._model_lock:
+            return self.engine.transcribe_batch(audios)  # type: ignore[union-attr]
+
+    @staticmethod
+    def _describe(audio: Union[str, np.ndarray]) -> str:
+        if isinstance(audio, np.ndarray):
+            return f"{len(audio) / SAMPLE_RATE:.1f}s of audio"
+        return audio
+
+    async def _transcribe(self, audio: Union[str, np.ndarray]) -> dict:
+        await self.wait_ready()
+        if self.pool is not None:
+            return await self.pool.submit(_worker_transcribe, audio)
+
+        def _run():
+            with self._model_lock:
+                return self.engine.transcribe(audio)  # type: ignore[union-attr]
+
+        return await asyncio.to_thread(_run)
+
+    async def _transcribe_all(self, chunks: list) -> list[dict]:
+        """Transcribe the chunks of a single request: admitted once by the
+        worker pool and fed to it one chunk per worker at a time, so that a
+        long audio never overflows its queue. Without workers, the engine
+        runs one transcription at a time anyway: the chunks are transcribed
+        one after the other."""
+        if self.pool is not None and chunks:
+            await self.wait_ready()
+            return await self.pool.map(
+                _worker_transcribe, [(chunk,) for chunk in chunks]
+            )
+        return [await self._transcribe(chunk) for chunk in chunks]
+
+    async def _transcribe_texts(self, chunks: list) -> list[str]:
+        if self.scheduler is not None and chunks:
+            await self.wait_ready()
+            audios = [await self._load_audio(chunk) for chunk in chunks]
+            return await asyncio.gather(*map(self.scheduler.submit, audios))
+        return [result["text"] for result in await self._transcribe_all(chunks)]
+
+    async def _speech_chunks(self, audio: Union[str, np.ndarray]) -> list:
+        """Chunks of speech of an audio, without its silence when a VAD is
+        set, or else the whole audio."""
+        if self.vad is None:
+            return [audio]
+        chunks = await asyncio.to_thread(self.vad.split, await self._load_audio(audio))
+        if not chunks:
+            logger.info("No speech detected.")
+        return chunks
+
+    async def _transcribe_speech(self, audio: Union[str, np.ndarray]) -> str:
+        if self.long_audio_samples:
+            audio = await self._load_audio(audio)
+            if len(audio) > self.long_audio_samples:
+                segments = await self.transcribe_segments(audio)
+                logger.info(f"Transcription of a long audio :\n{stitch(segments)}")
+                return " ".join(segment.text for segment in segments)
+
+        texts = await self._transcribe_texts(await self._speech_chunks(audio))
+        return " ".join(text.strip() for text in texts if text.strip())
+
+    @staticmethod
+    async def _load_audio(audio: Union[str, np.ndarray]) -> np.ndarray:
+        if isinstance(audio, str):
+            data = await asyncio.to_thread(Path(audio).read_bytes)
+            return await asyncio.to_thread(decode_audio, data)
+        return audio
+
+    def cache_key(self, audio: np.ndarray) -> str:
+        """Key of the transcription of an audio: hash of its samples, of the
+        engine, model, precision, decoding mode and voice activity detector.
+        CPU bound for long audios, meant to run in a thread."""
+        mode = "batch" if self.scheduler is not None else "transcribe"
+        vad = type(self.vad).__name__ if self.vad is not None else "none"
+        options = [self.backend, self.model_name, self.compute_type, mode, vad]
+        digest = hashlib.sha256(f"{':'.join(options)}:".encode())
+        # Hashed in place: decoded samples are already contiguous float32
+        digest.update(memoryview(np.ascontiguousarray(audio, dtype=np.float32)))
+        return digest.hexdigest()
+
+    async def _cached_transcription(self, audio: np.ndarray) -> str:
+        key = await asyncio.to_thread(self.cache_key, audio)
+        cached = await self.cache.get(key)  # type: ignore[union-attr]
+        if cached is not None:
+            logger.info("Transcription found in cache.")
+            return cached.decode()
+
+        # Identical uploads (e.g. retries) wait for the running transcription
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._transcribe_and_cache(key, audio))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _transcribe_and_cache(self, key: str, audio: np.ndarray) -> str:
+        text = await self._transcribe_speech(audio)
+        await self.cache.set(key, text.encode())  # type: ignore[union-attr]
+        return text
+
+    def cache_stats(self) -> dict:
+        """Hit ratio of the transcription cache."""
+        if self.cache is None:
+            return {}
+        return {**self.cache.as_dict(), "coalesced": self.coalesced}
+
+    async def transcribe_audio(self, audio: Union[str, np.ndarray]) -> str:
+        """Transcribe an audio file path, or 16 kHz mono float32 samples
+        already decoded in memory (see core.utils.audio.decode_audio)."""
+        logger.info(f"Audio received for transcription : {self._describe(audio)}")
+        logger.info("Starting transcription...")
+
+        if self.cache is not None:
+            text = await self._cached_transcription(await self._load_audio(audio))
+        else:
+            text = await self._transcribe_speech(audio)
         logger.info("Transcription completed.")
-        logger.info(f"Transcription : {result['text']}")
-        return result["text"]
+        logger.info(f"Transcription : {text}")
+        return text
+
+    async def transcribe_segments(
+        self, audio: Union[str, np.ndarray]
+    ) -> list[TimedText]:
+        """Transcribe a long audio by segments of at most 30 seconds, split
+        at the pauses so that no word is cut, and transcribed concurrently:
+        in parallel with worker processes (at most one segment per worker at
+        a time), in a batch with batching, else one after the other.
+
+        Returns:
+            list[TimedText]: Transcription of each segment with speech, in
+            order, with its span in the audio (see ``stitch``).
+        """
+        audio = await self._load_audio(audio)
+        segments = await asyncio.to_thread(self._segmenter.segments, audio)
+        logger.info(f"Transcribing {len(segments)} segments")
+        texts = await self._transcribe_texts([segment.audio for segment in segments])
+        return [
+            TimedText(segment.start / SAMPLE_RATE, segment.end / SAMPLE_RATE, text)
+            for segment, text in zip(segments, map(str.strip, texts))
+            if text
+        ]
+
+    async def transcribe_with_language(
+        self, audio: Union[str, np.ndarray]
+    ) -> Transcription:
+        """Transcribe an audio and detect its language in the same pass. The
+        language is the one of the first chunk of speech, "" without speech."""
+        logger.info(f"Audio received for transcription : {self._describe(audio)}")
+
+        results = await self._transcribe_all(await self._speech_chunks(audio))
+        text = " ".join(r["text"].strip() for r in results if r["text"].strip())
+        language = results[0]["language"] if results else ""
+        logger.info(f"Transcription ({language}) : {text}")
+        return Transcription(text, language)
+
+    async def detect_languages(
+        self, audio: Union[str, np.ndarray], top_k: int = 3
+    ) -> list[tuple[str, float]]:
+        """Most probable languages of an audio, without transcribing it (see
+        ``detect_languages``)."""
+        await self.wait_ready()
+        audio = await self._load_audio(audio)
+        if self.pool is not None:
+            return await self.pool.submit(_worker_detect_languages, audio, top_k)
+
+        def _run():
+            with self._model_lock:
+                return self.engine.detect_languages(audio, top_k)  # type: ignore
 
-    async def detect_language(self, audio_path: str) -> str:
-        logger.info(f"Language detection for : {audio_path}")
+        return await asyncio.to_thread(_run)
 
-        def _detect():
-            return self.model.transcribe(audio_path)
+    async def detect_language(self, audio: Union[str, np.ndarray]) -> str:
+        logger.info(f"Language detection for : {self._describe(audio)}")
 
-        result = await asyncio.to_thread(_detect)
-        logger.info(f"Language detected : {result['language']}")
-        return result["language"]
+        languages = await self.detect_languages(audio, top_k=1)
+        logger.info(f"Language detected : {languages[0][0]}")
+        return languages[0][0]
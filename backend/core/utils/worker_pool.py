@@ -0,0 +1,183 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+from typing import Optional
+
+from core.config import logger
+
+
+class PoolOverloaded(Exception):
+    """Raised when the queue of a worker pool is full.
+
+    Args:
+        retry_after (int): Estimated time before a slot frees up, in seconds.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Worker pool overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _timed_call(function: Callable, *args) -> tuple[int, float, Any]:
+    """Run a task in a worker process, returning the worker pid and the time
+    it was busy along with the result."""
+    started = time.perf_counter()
+    result = function(*args)
+    return os.getpid(), time.perf_counter() - started, result
+
+
+class WorkerPool:
+    """Pool of worker processes fed by a bounded queue.
+
+    Each worker runs ``initializer`` once (e.g. to load a model) and then
+    executes tasks one at a time, outside of the GIL of the API process.
+    At most ``workers + max_queue`` tasks are accepted at once: beyond
+    that, ``submit`` fails fast with ``PoolOverloaded`` instead of letting
+    the requests pile up. A request made of several tasks is admitted once
+    with ``map``, which feeds them to the workers a few at a time.
+
+    Args:
+        workers (int): Number of worker processes.
+        max_queue (int): Maximum number of tasks waiting for a worker.
+        initializer (Optional[Callable], optional): Called once in each
+        worker process. Must be importable (module-level function).
+        initargs (tuple, optional): Arguments of ``initializer``.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.initializer = initializer
+        self.initargs = initargs
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._busy_time: dict[int, float] = defaultdict(float)
+        self._service_time = 0.0
+        self._started_at = 0.0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        """Spawn the worker processes."""
+        if self._executor is None:
+            # "spawn": forking a process that already holds torch threads
+            # and an event loop is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+                initargs=self.initargs,
+            )
+            self._started_at = time.monotonic()
+            logger.info(f"Started {self.workers} worker processes")
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, cancelling the queued tasks."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of accepted tasks waiting for a free worker."""
+        return max(0, self.in_flight - self.workers)
+
+    def retry_after(self) -> int:
+        """Estimate when a slot frees up, from the average task duration."""
+        average = self._service_time / self.completed if self.completed else 1.0
+        return max(1, math.ceil(average * (self.queue_depth + 1) / self.workers))
+
+    async def submit(self, function: Callable, *args) -> Any:
+        """Run ``function(*args)`` in a worker process.
+
+        Args:
+            function (Callable): Importable (module-level) function.
+
+        Raises:
+            PoolOverloaded: All the workers are busy and the queue is full.
+
+        Returns:
+            Any: Result of the function.
+        """
+        self._admit()
+        return await self._run(function, *args)
+
+    async def map(
+        self, function: Callable, arguments: list[tuple], concurrency: int = 0
+    ) -> list:
+        """Run ``function(*args)`` in worker processes for each tuple of
+        ``arguments``, as a single request: it is admitted (or rejected)
+        once, then at most ``concurrency`` of its tasks run or wait for a
+        worker at a time, however many there are.
+
+        Args:
+            function (Callable): Importable (module-level) function.
+            arguments (list[tuple]): Arguments of each task.
+            concurrency (int, optional): Maximum tasks in flight. Defaults
+            to 0, the number of workers.
+
+        Raises:
+            PoolOverloaded: All the workers are busy and the queue is full.
+
+        Returns:
+            list: Result of each task, in order.
+        """
+        self._admit()
+        semaphore = asyncio.Semaphore(concurrency or self.workers)
+
+        async def run(args: tuple) -> Any:
+            async with semaphore:
+                return await self._run(function, *args)
+
+        return list(await asyncio.gather(*(run(args) for args in arguments)))
+
+    def _admit(self) -> None:
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PoolOverloaded(self.retry_after())
+
+    async def _run(self, function: Callable, *args) -> Any:
+        self.start()
+        self.in_flight += 1
+        try:
+            pid, busy, result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _timed_call, function, *args
+            )
+        finally:
+            self.in_flight -= 1
+
+        self.completed += 1
+        self._busy_time[pid] += busy
+        self._service_time += busy
+        return result
+
+    def as_dict(self) -> dict:
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_task_ms": 1000 * self._service_time / self.completed
+            if self.completed
+            else 0.0,
+            # Share of its lifetime each worker (by pid) spent running tasks
+            "utilization": {
+                pid: busy / uptime if uptime else 0.0
+                for pid, busy in self._busy_time.items()
+            },
+        }
@@ -1,34 +1,72 @@
-import hashlib
-import io
+import asyncio
 import os
-import tempfile
+from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from datetime import datetime
-from pathlib import Path
+from typing import Optional
 
-import openai
 from core.config import logger
 from core.config import settings
-from core.models.MedicalHistory import MedicalHistory
 from core.models.user import Authentification
 from core.models.user import ChangePasswordRequest
 from core.models.user import CreateUser
 from core.models.user import HealthInfoRequest
 from core.models.user import HealthInfoResponse
 from core.models.user import UpdateUser
-from core.models.user import User
+from core.models.user import UserListResponse
+from core.repositories import ensure_indexes
+from core.repositories import invalidate_cache
+from core.repositories import MedicalHistoryRepository
+from core.repositories import UserRepository
+from core.repositories.base import decode_cursor
+from core.repositories.base import duplicate_key_field
+from core.repositories.base import encode_cursor
+from core.repositories.bulk import export_users
+from core.repositories.bulk import import_users
+from core.repositories.bulk import iter_lines
+from core.utils.audio import AudioDecodeError
+from core.utils.cache import build_tiered_cache
+from core.utils.cache import cache
 from core.utils.chatgpt import chat
+from core.utils.chatgpt import chat_stream
+from core.utils.chatgpt import close_openai_client
+from core.utils.connection import close_database_connection
 from core.utils.connection import database_connection
-from core.utils.eleven_labs import text_to_speech
+from core.utils.connection import ping_database
+from core.utils.eleven_labs import stream_text_to_speech
+from core.utils.eleven_labs import tts_stats
+from core.utils.http_client import close_http_client
+from core.utils.http_client import open_http_client
+from core.utils.password import password_hasher
+from core.utils.session import create_token
+from core.utils.session import optional_session
+from core.utils.session import require_admin
+from core.utils.session import require_clinician
+from core.utils.session import session_user_id
+from core.utils.session import SessionUser
+from core.utils.speech_cache import iter_file
+from core.utils.speech_cache import read_phrases
+from core.utils.speech_cache import speech_cache
+from core.utils.speech_pipeline import pipelined_speech
+from core.utils.speech_pipeline import sentence_chunks
+from core.utils.upload import BodySizeLimitMiddleware
+from core.utils.upload import decode_upload
+from core.utils.user import Sex
+from core.utils.vad import build_vad
 from core.utils.whisper_stt import WhisperSTT
+from core.utils.worker_pool import PoolOverloaded
+from fastapi import Depends
 from fastapi import FastAPI
 from fastapi import File
 from fastapi import HTTPException
+from fastapi import Query
+from fastapi import Request
 from fastapi import status
 from fastapi import UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.responses import StreamingResponse
-from mongoengine.connection import disconnect_all
+from pymongo.errors import DuplicateKeyError
 
 
 SUPPORTED_FORMATS = {
@@ -47,12 +85,65 @@ SUPPORTED_FORMATS = {
     "audio/opus",
 }
 
-whisper_stt = WhisperSTT()
+whisper_stt = WhisperSTT(
+    settings.STT_MODEL,
+    backend=settings.STT_BACKEND,
+    threads=settings.STT_THREADS,
+    compute_type=settings.STT_COMPUTE_TYPE,
+    vad=build_vad(
+        settings.STT_VAD,
+        threshold_db=settings.STT_VAD_THRESHOLD_DB,
+        min_silence_ms=settings.STT_VAD_MIN_SILENCE_MS,
+        padding_ms=settings.STT_VAD_PADDING_MS,
+    ),
+    long_audio_seconds=settings.STT_LONG_AUDIO_SECONDS,
+    batching=settings.STT_BATCHING,
+    max_batch_size=settings.STT_MAX_BATCH_SIZE,
+    max_wait=settings.STT_MAX_WAIT_MS / 1000,
+    workers=settings.STT_WORKERS,
+    worker_threads=settings.STT_WORKER_THREADS,
+    max_queue=settings.STT_MAX_QUEUE,
+    cache=build_tiered_cache(
+        max_size=settings.STT_CACHE_SIZE,
+        ttl=settings.STT_CACHE_TTL,
+        directory=settings.STT_CACHE_DIR,
+        max_bytes=settings.STT_CACHE_MAX_BYTES,
+    )
+    if settings.STT_CACHE_SIZE
+    else None,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the pooled database and HTTP connections once for the whole app
+    lifetime, and start loading the Whisper model and pre-warming the TTS
+    cache in the background."""
+    database_connection()
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.error(f"Failed to create database indexes: {str(e)}")
+    password_hasher.start()
+    open_http_client()
+    whisper_stt.start()
+    prewarm = None
+    if speech_cache is not None and settings.TTS_PREWARM_FILE:
+        prewarm = asyncio.create_task(
+            speech_cache.prewarm(read_phrases(settings.TTS_PREWARM_FILE))
+        )
+    yield
+    if prewarm is not None:
+        prewarm.cancel()
+    await whisper_stt.stop()
+    await close_http_client()
+    await close_openai_client()
+    password_hasher.shutdown()
+    close_database_connection()
 
-client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
 
 logger.info("Starting the API...")
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Configuration CORS
 app.add_middleware(
@@ -67,6 +158,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Abort too large uploads while they are received, before parsing them
+# (the limit leaves room for the multipart boundaries and headers)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={"/conversation/": settings.MAX_UPLOAD_SIZE + settings.UPLOAD_CHUNK_SIZE},
+)
+
 logger.info("API started.")
 
 
@@ -76,6 +174,44 @@ async def read_root():
     return {"message": "Hello World"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Counters used to size the caches and pools."""
+    metrics = {"cache": cache.stats.as_dict(), "tts": tts_stats.as_dict()}
+    if whisper_stt.scheduler is not None:
+        metrics["stt_batching"] = whisper_stt.scheduler.stats.as_dict()
+    if whisper_stt.pool is not None:
+        metrics["stt_workers"] = whisper_stt.pool.as_dict()
+    if whisper_stt.vad is not None:
+        metrics["stt_vad"] = whisper_stt.vad.stats.as_dict()
+    if whisper_stt.cache is not None:
+        metrics["stt_cache"] = whisper_stt.cache_stats()
+    if speech_cache is not None:
+        metrics["tts_cache"] = speech_cache.as_dict()
+    return metrics
+
+
+@app.get("/health/db")
+async def health_db():
+    """Readiness probe: check that the pooled database connection answers."""
+    if not await ping_database():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database unavailable",
+        )
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: false (503) until the Whisper model, loaded in the
+    background at startup, has run its warm-up transcription."""
+    body = {"ready": whisper_stt.ready, "stt": whisper_stt.status}
+    if not whisper_stt.ready:
+        return JSONResponse(body, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return body
+
+
 @app.post("/create_user/")
 async def create_user(input: CreateUser) -> dict:
     """Create user
@@ -88,27 +224,18 @@ async def create_user(input: CreateUser) -> dict:
     """
     try:
         logger.info("Hashing password...")
-        hasher = hashlib.blake2b(
-            input.password.encode("utf-8"),
-            digest_size=15,
-            salt=settings.SALT.encode("utf-8"),
-        ).hexdigest()
-
-        logger.info("Connecting to database...")
-        database_connection()
+        hasher = await password_hasher.hash(input.password)
 
         logger.info("Creating user...")
-        user = User(
-            username=input.username,
-            password=hasher,
-            email=input.email,
-            sex=input.sex,
-            date_of_birth=input.date_of_birth,
+        user = await UserRepository.create(
+            {
+                "username": input.username,
+                "password": hasher,
+                "email": input.email,
+                "sex": input.sex,
+                "date_of_birth": input.date_of_birth,
+            }
         )
-        user.save()
-
-        logger.info("Closing database connection...")
-        disconnect_all()
 
         return {
             "success": True,
@@ -118,7 +245,6 @@ async def create_user(input: CreateUser) -> dict:
 
     except Exception as e:
         logger.error(f"Error creating user: {str(e)}")
-        disconnect_all()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create user: {str(e)}",
@@ -133,36 +259,37 @@ async def authentificate(input: Authentification) -> dict:
         input (Authentification): Input
 
     Returns:
-        dict: Authentication result
+        dict: Authentication result, with the session token to send as
+        "Authorization: Bearer <token>" to the user routes
     """
     try:
-        logger.info("Hashing password...")
-        hasher = hashlib.blake2b(
-            input.password.encode("utf-8"),
-            digest_size=15,
-            salt=settings.SALT.encode("utf-8"),
-        ).hexdigest()
-
-        logger.info("Connecting to database...")
-        database_connection()
-
         logger.info("Authenticating...")
-        user = User.objects(  # type: ignore[attr-defined]
-            username=input.username, password=hasher
-        ).first()
+        user = await UserRepository.find_one(username=input.username)
+        valid, rehash = (
+            await password_hasher.verify(input.password, user.password)
+            if user
+            else await password_hasher.verify_unknown(input.password)
+        )
 
-        if not user:
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password.",
             )
 
-        logger.info("Closing database connection...")
-        disconnect_all()
+        if rehash:
+            # Upgrade legacy hashes and outdated costs on successful login
+            logger.info("Rehashing password...")
+            await UserRepository.update(
+                user.id, {"password": await password_hasher.hash(input.password)}
+            )
+            await invalidate_cache(user.username)
 
         return {
             "success": True,
             "message": "Authentication successful",
+            "token": create_token(user.id, user.username, user.role),
+            "token_type": "bearer",
             "user": {
                 "username": user.username,
                 "email": user.email,
@@ -178,7 +305,6 @@ async def authentificate(input: Authentification) -> dict:
         raise
     except Exception as e:
         logger.error(f"Error during authentication: {str(e)}")
-        disconnect_all()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Authentication failed: {str(e)}",
@@ -197,125 +323,219 @@ async def authentificate(input: Authentification) -> dict:
 
 
 @app.put("/update_profile/{username}")
-async def update_profile(username: str, update_data: UpdateUser) -> dict:
+async def update_profile(
+    username: str,
+    update_data: UpdateUser,
+    session: Optional[SessionUser] = Depends(optional_session),
+) -> dict:
     """Update user profile
 
     Args:
         username (str): Username to update
         update_data (UpdateUser): Update data
+        session (Optional[SessionUser]): User of the session token, if sent
 
     Returns:
-        dict: Profile update result
+        dict: Profile update result, with a new session token if the username
+        of an authenticated user changed
     """
+    user_id = session_user_id(username, session)
     try:
         logger.info(f"Updating profile for user: {username}")
 
-        # Connect to database
-        database_connection()
-
-        # Find user
-        user = User.objects(username=username).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-            )
-
         # Update fields if provided
-        update_fields = {}
-        if update_data.username is not None:
-            # Check if new username is already taken
-            existing_user = User.objects(username=update_data.username).first()
-            if existing_user and existing_user.id != user.id:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Username already taken",
-                )
-            update_fields["username"] = update_data.username
+        update_fields = update_data.model_dump(exclude_none=True)
 
-        if update_data.email is not None:
-            # Check if new email is already taken
-            existing_user = User.objects(email=update_data.email).first()
-            if existing_user and existing_user.id != user.id:
+        # Update user: uniqueness of username and email is enforced by the
+        # unique indexes, no need to look them up first
+        if update_fields:
+            try:
+                found = (
+                    await UserRepository.update(user_id, update_fields, username)
+                    if user_id
+                    else await UserRepository.update_by_username(
+                        username, update_fields
+                    )
+                )
+            except DuplicateKeyError as e:
+                field = duplicate_key_field(e)
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Email already taken",
+                    detail=f"{(field or 'Value').capitalize()} already taken",
                 )
-            update_fields["email"] = update_data.email
-
-        if update_data.sex is not None:
-            update_fields["sex"] = update_data.sex
+            await invalidate_cache(username, update_fields.get("username", username))
+        else:
+            found_id = await UserRepository.find_id_by_username(username)
+            found = found_id is not None and user_id in (None, found_id)
 
-        if update_data.date_of_birth is not None:
-            update_fields["date_of_birth"] = update_data.date_of_birth
-
-        if update_data.phone_number is not None:
-            update_fields["phone_number"] = update_data.phone_number
-
-        if update_data.bio is not None:
-            update_fields["bio"] = update_data.bio
-
-        if update_data.profile_image is not None:
-            update_fields["profile_image"] = update_data.profile_image
-
-        # Update user
-        if update_fields:
-            User.objects(id=user.id).update_one(**update_fields)
-            logger.info(f"Profile updated successfully for user: {username}")
-
-        # Close database connection
-        disconnect_all()
+        if not found:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+            )
+        logger.info(f"Profile updated successfully for user: {username}")
 
-        return {
+        result = {
             "success": True,
             "message": "Profile updated successfully",
             "updated_fields": list(update_fields.keys()),
         }
+        # The token carries the username, issue a new one when it changes
+        if user_id and update_fields.get("username", username) != username:
+            result["token"] = create_token(
+                user_id, update_fields["username"], session and session.role
+            )
+        return result
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error updating profile: {str(e)}")
-        disconnect_all()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update profile: {str(e)}",
         )
 
 
+@app.get("/users")
+async def list_users(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    sex: Optional[Sex] = None,
+    min_age: Optional[int] = Query(None, ge=0),
+    max_age: Optional[int] = Query(None, ge=0),
+    has_allergies: Optional[bool] = None,
+    session: SessionUser = Depends(require_clinician),
+) -> UserListResponse:
+    """List users for the clinician dashboard, newest first. Reserved to
+    clinicians and administrators.
+
+    Args:
+        limit (int, optional): Users per page. Defaults to 50.
+        cursor (Optional[str], optional): next_cursor of the previous page.
+        sex (Optional[Sex], optional): Only users of this sex.
+        min_age (Optional[int], optional): Only users at least this old.
+        max_age (Optional[int], optional): Only users at most this old.
+        has_allergies (Optional[bool], optional): Only users with (or without)
+        known allergies.
+        session (SessionUser): Clinician of the session token.
+
+    Returns:
+        UserListResponse: Page of users and the cursor of the next page.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    documents = await UserRepository.list_page(
+        limit=limit,
+        after=after,
+        sex=sex.value if sex else None,
+        min_age=min_age,
+        max_age=max_age,
+        has_allergies=has_allergies,
+    )
+
+    next_cursor = None
+    if len(documents) == limit:
+        last = documents[-1]
+        next_cursor = encode_cursor(last["created_at"], last["_id"])
+
+    return UserListResponse(
+        success=True,
+        users=[UserRepository.serialize_summary(document) for document in documents],
+        next_cursor=next_cursor,
+    )
+
+
+@app.post("/import/users")
+async def import_users_ndjson(
+    request: Request,
+    batch_size: int = Query(1000, ge=1, le=1000),
+    session: SessionUser = Depends(require_admin),
+) -> dict:
+    """Import users and their medical histories from an NDJSON body.
+    Reserved to administrators.
+
+    Each line holds the fields of CreateUser and an optional "health_info"
+    object with the fields of HealthInfoRequest. The body is read as a stream
+    and written in batches.
+
+    Args:
+        request (Request): Request with the NDJSON body.
+        batch_size (int, optional): Rows per write. Defaults to 1000.
+        session (SessionUser): Administrator of the session token.
+
+    Returns:
+        dict: Import summary, with the error of each rejected line.
+    """
+    logger.info(f"Bulk import requested by {session.username}")
+    errors = []
+    summary = {}
+    async for result in import_users(iter_lines(request.stream()), batch_size):
+        if "error" in result:
+            errors.append(result)
+        else:
+            summary = result
+
+    return {"success": True, **summary, "errors": errors}
+
+
+@app.get("/export/users")
+async def export_users_ndjson(
+    batch_size: int = Query(1000, ge=1, le=10_000),
+    session: SessionUser = Depends(require_admin),
+) -> StreamingResponse:
+    """Export users and their medical histories as NDJSON, streamed from a
+    database cursor. Reserved to administrators.
+
+    Args:
+        batch_size (int, optional): Documents per cursor batch.
+        Defaults to 1000.
+        session (SessionUser): Administrator of the session token.
+
+    Returns:
+        StreamingResponse: NDJSON stream, one user per line.
+    """
+    logger.info(f"Bulk export requested by {session.username}")
+    return StreamingResponse(
+        export_users(batch_size), media_type="application/x-ndjson"
+    )
+
+
 @app.post("/health_info/{username}/update")
 async def update_health_info(
-    username: str, health_data: HealthInfoRequest
+    username: str,
+    health_data: HealthInfoRequest,
+    session: Optional[SessionUser] = Depends(optional_session),
 ) -> HealthInfoResponse:
     """Mettre à jour les informations de santé d'un utilisateur"""
+    user_id = session_user_id(username, session)
     try:
-        # Connect to database
-        database_connection()
-
-        # Vérifier que l'utilisateur existe
-        user = User.objects(username=username).first()
-        if not user:
+        # Sans jeton, vérifier que l'utilisateur existe
+        if user_id is None:
+            user_id = await UserRepository.find_id_by_username(username)
+        if user_id is None:
             return HealthInfoResponse(
                 success=False, message=f"Utilisateur {username} non trouvé"
             )
 
-        # Créer ou mettre à jour l'historique médical
-        medical_history = MedicalHistory.objects(user=user).first()
-        if not medical_history:
-            medical_history = MedicalHistory(user=user)
-
         # Mettre à jour les champs fournis
-        update_fields = health_data.model_dump(exclude_unset=True)
-        for field, value in update_fields.items():
-            if value is not None:
-                setattr(medical_history, field, value)
+        update_fields = {
+            field: value
+            for field, value in health_data.model_dump(exclude_unset=True).items()
+            if value is not None
+        }
+        update_fields["last_updated"] = datetime.utcnow()
 
-        medical_history.last_updated = datetime.utcnow()
-        medical_history.save()
+        # Créer ou mettre à jour l'historique médical en un seul aller-retour
+        medical_history = await MedicalHistoryRepository.upsert(user_id, update_fields)
+        await invalidate_cache(username, user_id=user_id)
 
         return HealthInfoResponse(
             success=True,
             message="Informations de santé mises à jour avec succès",
-            health_data=medical_history.to_dict(),
+            health_data=medical_history,
         )
 
     except Exception as e:
@@ -328,25 +548,24 @@ async def update_health_info(
 
 
 @app.get("/health_info_v2/{username}")
-async def get_health_info_v2(username: str) -> HealthInfoResponse:
+async def get_health_info_v2(
+    username: str, session: Optional[SessionUser] = Depends(optional_session)
+) -> HealthInfoResponse:
     """Récupérer les informations de santé d'un utilisateur - VERSION CORRIGEE"""
+    user_id = session_user_id(username, session)
     try:
-        # Connect to database
-        logger.info("DEBUG: About to call database_connection()")
-        database_connection()
-        logger.info("DEBUG: database_connection() called successfully")
+        # Historique médical sur l'id du jeton, ou avec l'utilisateur en une
+        # seule requête
+        medical_history = await MedicalHistoryRepository.find_by_username(
+            username, user_id
+        )
 
-        # Vérifier que l'utilisateur existe
-        user = User.objects(username=username).first()
-        if not user:
+        if medical_history is None:
             logger.info(f"DEBUG: User {username} not found")
             return HealthInfoResponse(
                 success=False, message=f"Utilisateur {username} non trouvé"
             )
 
-        # Récupérer l'historique médical
-        medical_history = MedicalHistory.objects(user=user).first()
-
         if not medical_history:
             logger.info(f"DEBUG: No medical history found for user {username}")
             return HealthInfoResponse(
@@ -359,7 +578,7 @@ async def get_health_info_v2(username: str) -> HealthInfoResponse:
         return HealthInfoResponse(
             success=True,
             message="Informations de santé récupérées avec succès",
-            health_data=medical_history.to_dict(),
+            health_data=medical_history,
         )
 
     except Exception as e:
@@ -370,16 +589,22 @@ async def get_health_info_v2(username: str) -> HealthInfoResponse:
 
 
 @app.post("/change_password/{username}")
-async def change_password(username: str, password_data: ChangePasswordRequest) -> dict:
+async def change_password(
+    username: str,
+    password_data: ChangePasswordRequest,
+    session: Optional[SessionUser] = Depends(optional_session),
+) -> dict:
     """Changer le mot de passe d'un utilisateur"""
+    user_id = session_user_id(username, session)
     try:
         logger.info(f"Changing password for user: {username}")
 
-        # Connect to database
-        database_connection()
-
-        # Find user
-        user = User.objects(username=username).first()
+        # Find user, on its id when authenticated
+        user = await (
+            UserRepository.find_one(_id=user_id)
+            if user_id
+            else UserRepository.find_one(username=username)
+        )
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -393,97 +618,58 @@ async def change_password(username: str, password_data: ChangePasswordRequest) -
             )
 
         # Verify current password
-        if (
-            user.password
-            != hashlib.blake2b(
-                password_data.current_password.encode("utf-8"),
-                digest_size=15,
-                salt=settings.SALT.encode("utf-8"),
-            ).hexdigest()
-        ):
+        valid, _ = await password_hasher.verify(
+            password_data.current_password, user.password
+        )
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Current password is incorrect",
             )
 
         # Hash new password
-        new_hasher = hashlib.blake2b(
-            password_data.new_password.encode("utf-8"),
-            digest_size=15,
-            salt=settings.SALT.encode("utf-8"),
-        ).hexdigest()
+        new_hasher = await password_hasher.hash(password_data.new_password)
 
         # Update password
-        User.objects(id=user.id).update_one(password=new_hasher)
+        await UserRepository.update(user.id, {"password": new_hasher})
+        await invalidate_cache(username)
         logger.info(f"Password changed successfully for user: {username}")
 
-        # Close database connection
-        disconnect_all()
-
         return {"success": True, "message": "Password changed successfully"}
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error changing password: {str(e)}")
-        disconnect_all()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to change password: {str(e)}",
         )
 
 
-@asynccontextmanager
-async def temp_file_from_upload(upload_file: UploadFile):
-    """Context manager for temporary file creation and cleanup"""
+async def prefetched(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Start a stream and return it with its first chunk already fetched.
 
-    file_extension = Path(upload_file.filename).suffix
-    temp_file_path = None
+    Args:
+        chunks (AsyncIterator[bytes]): Stream to start.
 
+    Returns:
+        AsyncIterator[bytes]: The same stream, first chunk included.
+    """
     try:
-        # Créer un fichier temporaire avec l'extension appropriée
-        with tempfile.NamedTemporaryFile(
-            delete=False, suffix=file_extension, mode="wb"
-        ) as temp_file:
-            # Remettre le curseur au début du fichier uploadé
-            await upload_file.seek(0)
-            # Lire le contenu
-            content = await upload_file.read()
-            # Écrire le contenu dans le fichier temporaire
-            temp_file.write(content)
-            # Forcer l'écriture sur le disque
-            temp_file.flush()
-            # Récupérer le chemin du fichier temporaire
-            temp_file_path = temp_file.name
-
-        # Le fichier est maintenant fermé mais existe sur le disque
-        # Vérifier que le fichier existe et a une taille > 0
-        if not os.path.exists(temp_file_path) or os.path.getsize(temp_file_path) == 0:
-            raise ValueError("Le fichier temporaire n'a pas été créé correctement")
-
-        logger.info(
-            f"Fichier temporaire créé: {temp_file_path} "
-            f"(taille: {os.path.getsize(temp_file_path)} bytes)"
-        )
+        first = await anext(chunks)
+    except StopAsyncIteration:
+        first = b""
 
-        yield temp_file_path
+    async def stream() -> AsyncIterator[bytes]:
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()  # type: ignore[attr-defined]
 
-    except Exception as e:
-        logger.error(f"Erreur lors de la création du fichier temporaire: {str(e)}")
-        raise
-    finally:
-        # Nettoyer le fichier temporaire
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-                logger.info(f"Fichier temporaire supprimé: {temp_file_path}")
-            except FileNotFoundError:
-                pass
-            except Exception as e:
-                logger.warning(
-                    f"Impossible de supprimer le fichier temporaire "
-                    f"{temp_file_path}: {str(e)}"
-                )
+    return stream()
 
 
 @app.post("/conversation/")
@@ -512,46 +698,88 @@ async def conversation(file: UploadFile = File(...)) -> StreamingResponse:
             f"Formats supportés: {', '.join(SUPPORTED_FORMATS)}",
         )
 
-    # Vérifier la taille du fichier (max 50MB)
-    if file.size and file.size > 50 * 1024 * 1024:
-        raise HTTPException(
-            status_code=400, detail="Fichier trop volumineux (max 50MB)"
-        )
-
     logger.info(
         f"Conversation request received - File: {file.filename}, "
         f"Type: {file.content_type}, Size: {file.size}"
     )
 
     try:
-        async with temp_file_from_upload(file) as temp_path:
-            logger.info(f"Starting transcription of file: {temp_path}")
-
-            # Vérifier que le fichier existe toujours avant la transcription
-            if not os.path.exists(temp_path):
-                raise ValueError(f"Le fichier temporaire {temp_path} n'existe plus")
-
-            transcription = await whisper_stt.transcribe_audio(temp_path)
-            logger.info(f"Transcription completed: {transcription}")
+        # Décoder l'audio par morceaux (Starlette garde sur disque les
+        # fichiers de plus de 1 Mo) ; la taille maximale (MAX_UPLOAD_SIZE)
+        # est vérifiée au fil de la lecture
+        samples = await decode_upload(file)
+
+        logger.info(f"Starting transcription of file: {file.filename}")
+        transcription = await whisper_stt.transcribe_audio(samples)
+        logger.info(f"Transcription completed: {transcription}")
+        if not transcription.strip():
+            raise HTTPException(
+                status_code=400, detail="Aucune parole détectée dans l'audio"
+            )
 
-            reply = chat(
-                client=client,
+        if settings.CONVERSATION_PIPELINE:
+            # Synthesize each sentence of the reply while the next ones
+            # are still being generated
+            tokens = chat_stream(
+                session_id=file.filename,
+                user_message=transcription,
+            )
+            audio = pipelined_speech(
+                sentence_chunks(tokens),
+                synthesize=(
+                    speech_cache.stream if speech_cache else stream_text_to_speech
+                ),
+            )
+        else:
+            reply = await chat(
                 session_id=file.filename,
                 user_message=transcription,
             )
             logger.info(f"ChatGPT reply: {reply}")
+            cached_file = speech_cache.open(reply) if speech_cache and reply else None
+            if cached_file is not None:
+                # Already synthesized: sent zero-copy from the file, mapped in
+                # memory, opened before responding so that an eviction cannot
+                # remove it meanwhile
+                return StreamingResponse(
+                    iter_file(cached_file),
+                    media_type="audio/mpeg",
+                    headers={
+                        "Content-Disposition": "attachment; "
+                        f"filename={file.filename}.mp3",
+                        "Content-Length": str(os.fstat(cached_file.fileno()).st_size),
+                    },
+                )
+            audio = (
+                speech_cache.stream(reply)
+                if speech_cache
+                else stream_text_to_speech(text=reply)
+            )
 
-            audio_reply = await text_to_speech(text=reply)
-            logger.info(f"Audio reply generated, size: {len(audio_reply)} bytes")
+        # Wait for the first chunk so that LLM and TTS errors are still
+        # reported with a 500, before the response headers are sent
+        audio_reply = await prefetched(audio)
+        logger.info("Streaming audio reply")
 
-            return StreamingResponse(
-                io.BytesIO(audio_reply),
-                media_type="audio/mpeg",
-                headers={
-                    "Content-Disposition": f"attachment; filename={file.filename}.mp3"
-                },
-            )
+        return StreamingResponse(
+            audio_reply,
+            media_type="audio/mpeg",
+            headers={
+                "Content-Disposition": f"attachment; filename={file.filename}.mp3"
+            },
+        )
 
+    except HTTPException:
+        raise
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PoolOverloaded as e:
+        logger.warning(f"Transcription rejected: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service surchargé, veuillez réessayer plus tard",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         logger.error(f"Transcription error: {str(e)}")
         logger.error(f"Error type: {type(e).__name__}")
@@ -0,0 +1,129 @@
+"""Event-loop latency benchmark of the data access layer.
+
+Runs a mixed read/write load against a local mongod while a probe task
+measures how late the event loop wakes it up. Compares the blocking
+mongoengine calls the handlers used to make with the Motor repositories.
+
+Usage (from backend/):
+    python -m scripts.benchmark_db --mode both --concurrency 50 --duration 10
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import date
+
+from core.config import settings
+from core.models.user import User
+from core.repositories import UserRepository
+from core.utils.connection import close_database_connection
+from core.utils.connection import database_connection
+from core.utils.connection import get_database
+from mongoengine import connect
+from mongoengine.connection import disconnect_all
+
+PROBE_INTERVAL = 0.005
+USER_PREFIX = "bench_"
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def probe(lags: list[float], stop: asyncio.Event):
+    """Measure the event-loop wake-up delay."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def sync_operation(username: str, write: bool):
+    user = User.objects(username=username).first()
+    if write:
+        User.objects(id=user.id).update_one(bio=str(random.random()))
+
+
+async def async_operation(username: str, write: bool):
+    # Uncached, so that every operation is a Motor round trip
+    user = await UserRepository.find_one(username=username)
+    if write:
+        await UserRepository.update(user.id, {"bio": str(random.random())})
+
+
+async def worker(operation, usernames, write_ratio, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await operation(random.choice(usernames), random.random() < write_ratio)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(mode: str, args) -> None:
+    operation = sync_operation if mode == "sync" else async_operation
+    usernames = [f"{USER_PREFIX}{i}" for i in range(args.users)]
+
+    stop = asyncio.Event()
+    lags: list[float] = []
+    latencies: list[float] = []
+
+    tasks = [asyncio.create_task(probe(lags, stop))]
+    tasks += [
+        asyncio.create_task(
+            worker(operation, usernames, args.write_ratio, stop, latencies)
+        )
+        for _ in range(args.concurrency)
+    ]
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    print(
+        f"[{mode:5}] ops/s={len(latencies) / args.duration:8.1f} "
+        f"op p50={percentile(latencies, 0.5) * 1000:7.2f}ms "
+        f"op p99={percentile(latencies, 0.99) * 1000:7.2f}ms | "
+        f"loop lag p50={percentile(lags, 0.5) * 1000:7.2f}ms "
+        f"p99={percentile(lags, 0.99) * 1000:7.2f}ms "
+        f"max={max(lags, default=0) * 1000:7.2f}ms "
+        f"mean={statistics.fmean(lags) * 1000 if lags else 0:7.2f}ms"
+    )
+
+
+async def main(args) -> None:
+    database_connection()
+    collection = get_database()[User._get_collection_name()]
+    connect(db=settings.MONGO_DB, host=settings.MONGO_HOST)
+
+    await collection.delete_many({"username": {"$regex": f"^{USER_PREFIX}"}})
+    for i in range(args.users):
+        await UserRepository.create(
+            {
+                "username": f"{USER_PREFIX}{i}",
+                "password": "benchmark",
+                "email": f"{USER_PREFIX}{i}@example.com",
+                "sex": "FEMALE",
+                "date_of_birth": date(1990, 1, 1),
+            }
+        )
+
+    try:
+        modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+        for mode in modes:
+            await run(mode, args)
+    finally:
+        await collection.delete_many({"username": {"$regex": f"^{USER_PREFIX}"}})
+        disconnect_all()
+        close_database_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    asyncio.run(main(parser.parse_args()))
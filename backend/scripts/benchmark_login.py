@@ -0,0 +1,112 @@
+"""Login storm benchmark of the password hashing service.
+
+Hashes passwords from many concurrent "logins" while a client keeps calling
+an unrelated endpoint, and reports the latency of that endpoint. Compares
+hashing inline on the event loop with the process pool of PasswordHasher.
+
+Usage (from backend/):
+    python -m scripts.benchmark_login --mode both --logins 32 --duration 10
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from core.config import settings
+from core.utils.password import _configured_params
+from core.utils.password import hash_password
+from core.utils.password import PasswordHasher
+from fastapi import FastAPI
+
+PROBE_INTERVAL = 0.01
+
+app = FastAPI()
+
+
+@app.get("/")
+async def read_root():
+    return {"message": "Hello World"}
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def login_storm(hash_once, stop: asyncio.Event, hashes: list[float]):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await hash_once()
+        hashes.append(time.perf_counter() - start)
+        # Let the other requests run between two logins
+        await asyncio.sleep(0)
+
+
+async def probe(stop: asyncio.Event, latencies: list[float]):
+    """Call GET / every PROBE_INTERVAL. Latencies are measured from the time
+    each request was due, so a stalled event loop is not hidden."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        due = time.perf_counter()
+        while not stop.is_set():
+            await c.get("/")
+            now = time.perf_counter()
+            while due <= now:
+                latencies.append(now - due)
+                due += PROBE_INTERVAL
+            await asyncio.sleep(due - now)
+
+
+async def run(mode: str, args) -> None:
+    algorithm = settings.PASSWORD_HASH_ALGORITHM
+    params = _configured_params()
+    hasher = PasswordHasher(algorithm, params, workers=args.workers)
+
+    async def hash_inline():
+        hash_password("correct horse battery staple", algorithm, params)
+
+    async def hash_pool():
+        await hasher.hash("correct horse battery staple")
+
+    hash_once = hash_inline if mode == "inline" else hash_pool
+    if mode == "pool":
+        hasher.start()
+        await hash_pool()  # warm up the worker processes
+
+    stop = asyncio.Event()
+    hashes: list[float] = []
+    latencies: list[float] = []
+    tasks = [asyncio.create_task(probe(stop, latencies))]
+    tasks += [
+        asyncio.create_task(login_storm(hash_once, stop, hashes))
+        for _ in range(args.logins)
+    ]
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    hasher.shutdown()
+
+    print(
+        f"[{mode:6}] hashes/s={len(hashes) / args.duration:7.1f} | "
+        f"GET / p50={percentile(latencies, 0.5) * 1000:8.2f}ms "
+        f"p99={percentile(latencies, 0.99) * 1000:8.2f}ms "
+        f"max={max(latencies, default=0) * 1000:8.2f}ms "
+        f"({len(latencies)} requests)"
+    )
+
+
+async def main(args) -> None:
+    modes = ["inline", "pool"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        await run(mode, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["inline", "pool", "both"], default="both")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--duration", type=float, default=10.0)
+    asyncio.run(main(parser.parse_args()))
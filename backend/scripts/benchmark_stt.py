@@ -0,0 +1,106 @@
+"""Throughput and latency benchmark of concurrent Whisper transcriptions.
+
+Transcribes the bundled patient recording from 1, 4 and 16 concurrent
+clients, each one in its own thread (current behaviour), through the
+micro-batching scheduler or in worker processes, and reports requests per
+second and latency percentiles.
+
+Usage (from backend/):
+    python -m scripts.benchmark_stt --mode all --model base --requests 32
+    python -m scripts.benchmark_stt --mode process --workers 4 --worker-threads 1
+"""
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+from core.config import settings
+from core.utils.audio import decode_audio
+from core.utils.whisper_stt import WhisperSTT
+
+AUDIO_PATH = Path(__file__).parents[1] / "audio" / "patient.mp3"
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def client(stt: WhisperSTT, audio, remaining: list[int], latencies):
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        start = time.perf_counter()
+        await stt.transcribe_audio(audio)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(stt: WhisperSTT, audio, mode: str, concurrency: int, requests: int):
+    latencies: list[float] = []
+    remaining = [max(requests, concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(client(stt, audio, remaining, latencies) for _ in range(concurrency))
+    )
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"[{mode:7}] concurrency={concurrency:2} | "
+        f"{len(latencies) / elapsed:6.2f} req/s | "
+        f"p50={percentile(latencies, 0.5):6.2f}s "
+        f"p95={percentile(latencies, 0.95):6.2f}s "
+        f"max={max(latencies):6.2f}s ({len(latencies)} requests)"
+    )
+
+
+async def main(args) -> None:
+    audio = decode_audio(AUDIO_PATH.read_bytes())
+    print(f"{AUDIO_PATH.name}: {len(audio) / 16_000:.1f}s of audio")
+
+    modes = ["thread", "batch", "process"] if args.mode == "all" else [args.mode]
+    for mode in modes:
+        stt = WhisperSTT(
+            args.model,
+            backend=args.backend,
+            threads=args.threads,
+            compute_type=args.compute_type,
+            batching=mode == "batch",
+            max_batch_size=args.max_batch_size,
+            max_wait=args.max_wait_ms / 1000,
+            workers=args.workers if mode == "process" else 0,
+            worker_threads=args.worker_threads,
+            # Let every client queue: the benchmark measures throughput
+            max_queue=max(args.concurrency),
+        )
+        stt.start()
+        await stt.transcribe_audio(audio)  # warm up
+        for concurrency in args.concurrency:
+            await run(stt, audio, mode, concurrency, args.requests)
+        if stt.scheduler is not None:
+            print(f"[{mode:7}] {stt.scheduler.stats.as_dict()}")
+        if stt.pool is not None:
+            print(f"[{mode:7}] {stt.pool.as_dict()}")
+        await stt.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--mode", choices=["thread", "batch", "process", "all"], default="all"
+    )
+    parser.add_argument("--model", default=settings.STT_MODEL)
+    parser.add_argument("--backend", default=settings.STT_BACKEND)
+    parser.add_argument("--threads", type=int, default=settings.STT_THREADS)
+    parser.add_argument("--compute-type", default=settings.STT_COMPUTE_TYPE)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument(
+        "--max-batch-size", type=int, default=settings.STT_MAX_BATCH_SIZE
+    )
+    parser.add_argument("--max-wait-ms", type=float, default=settings.STT_MAX_WAIT_MS)
+    parser.add_argument("--workers", type=int, default=settings.STT_WORKERS or 2)
+    parser.add_argument(
+        "--worker-threads", type=int, default=settings.STT_WORKER_THREADS
+    )
+    asyncio.run(main(parser.parse_args()))
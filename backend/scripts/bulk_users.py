@@ -0,0 +1,58 @@
+"""Import or export users and their medical histories as NDJSON.
+
+Each line holds the fields of CreateUser and an optional "health_info"
+object with the fields of HealthInfoRequest.
+
+Usage (from backend/):
+    python -m scripts.bulk_users import patients.ndjson --batch-size 1000
+    python -m scripts.bulk_users export patients.ndjson
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from core.repositories.bulk import export_users
+from core.repositories.bulk import import_users
+from core.utils.connection import close_database_connection
+from core.utils.connection import database_connection
+from core.utils.password import password_hasher
+
+
+async def read_lines(path: str):
+    with open(path, "rb") as file:
+        for line in file:
+            yield line
+
+
+async def main(args) -> int:
+    database_connection()
+    # No logins to keep room for here: hash the imports on every worker
+    password_hasher.bulk_pending = password_hasher.workers
+    try:
+        if args.command == "import":
+            failed = 0
+            async for result in import_users(read_lines(args.file), args.batch_size):
+                print(json.dumps(result, ensure_ascii=False))
+                failed = result.get("failed", failed)
+            return 1 if failed else 0
+
+        output = open(args.file, "w", encoding="utf-8") if args.file != "-" else None
+        try:
+            async for row in export_users(args.batch_size):
+                (output or sys.stdout).write(row)
+        finally:
+            if output:
+                output.close()
+        return 0
+    finally:
+        password_hasher.shutdown()
+        close_database_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("file", help="NDJSON file, '-' to export to stdout")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,94 @@
+"""Accuracy and throughput comparison of the speech to text engines.
+
+Transcribes the bundled patient recording with each engine configuration
+(backend:model:compute type) and reports the load time, the latency, the
+real-time factor (RTF, processing time / audio duration) and the word error
+rate (WER) against a reference transcript: the one given with --reference,
+or else the transcript of the first configuration.
+
+Usage (from backend/):
+    python -m scripts.compare_stt --threads 4
+    python -m scripts.compare_stt --configs whisper:small faster-whisper:small:int8
+"""
+import argparse
+import re
+import time
+import unicodedata
+from pathlib import Path
+
+from core.utils.audio import decode_audio
+from core.utils.audio import SAMPLE_RATE
+from core.utils.stt_engines import create_engine
+
+AUDIO_PATH = Path(__file__).parents[1] / "audio" / "patient.mp3"
+DEFAULT_CONFIGS = [
+    "whisper:base:float32",
+    "faster-whisper:base:int8",
+    "faster-whisper:small:int8",
+]
+
+
+def words(text: str) -> list[str]:
+    text = unicodedata.normalize("NFC", text).lower()
+    return re.findall(r"\w+(?:'\w+)?", text)
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level edit distance divided by the length of the reference."""
+    expected = words(reference)
+    actual = words(hypothesis)
+    distances = list(range(len(actual) + 1))
+    for i, expected_word in enumerate(expected, 1):
+        previous, distances[0] = distances[0], i
+        for j, actual_word in enumerate(actual, 1):
+            previous, distances[j] = distances[j], min(
+                distances[j] + 1,
+                distances[j - 1] + 1,
+                previous + (expected_word != actual_word),
+            )
+    return distances[-1] / max(len(expected), 1)
+
+
+def main(args) -> None:
+    audio = decode_audio(AUDIO_PATH.read_bytes())
+    duration = len(audio) / SAMPLE_RATE
+    print(f"{AUDIO_PATH.name}: {duration:.1f}s of audio, {args.threads} threads")
+
+    reference = Path(args.reference).read_text() if args.reference else None
+    for config in args.configs:
+        backend, model_name, compute_type = (config.split(":") + ["", ""])[:3]
+        started = time.perf_counter()
+        try:
+            engine = create_engine(backend, model_name, args.threads, compute_type)
+        except (RuntimeError, ValueError) as e:
+            print(f"[{config}] skipped: {e}")
+            continue
+        load_time = time.perf_counter() - started
+
+        engine.transcribe(audio)  # warm up
+        latencies = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            text = engine.transcribe(audio)["text"]
+            latencies.append(time.perf_counter() - started)
+        latency = sum(latencies) / len(latencies)
+
+        if reference is None:
+            reference = text
+        print(
+            f"[{engine.describe():28}] load={load_time:5.1f}s | "
+            f"latency={latency:6.2f}s | RTF={latency / duration:5.3f} | "
+            f"WER={word_error_rate(reference, text):6.1%}"
+        )
+        if args.verbose:
+            print(f"    {text.strip()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--reference", help="file with the expected transcript")
+    parser.add_argument("--verbose", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,153 @@
+import io
+import shutil
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from backend.core.utils import audio
+from backend.core.utils.audio import AudioDecodeError
+from backend.core.utils.audio import decode_audio
+from backend.core.utils.audio import decode_ffmpeg_stream
+from backend.core.utils.audio import SAMPLE_RATE
+
+
+def wav_bytes(samples: np.ndarray, rate: int, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((samples * 32767).astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def tone(rate: int, seconds: float = 1.0, frequency: float = 440) -> np.ndarray:
+    return 0.5 * np.sin(2 * np.pi * frequency * np.arange(int(rate * seconds)) / rate)
+
+
+def test_decode_audio_should_decode_wav_natively():
+    #  When
+    samples = decode_audio(wav_bytes(tone(SAMPLE_RATE), SAMPLE_RATE))
+
+    #  Then
+    assert samples.dtype == np.float32
+    assert len(samples) == SAMPLE_RATE
+    assert np.allclose(samples, tone(SAMPLE_RATE), atol=1e-3)
+
+
+def test_decode_audio_should_resample_and_downmix_wav():
+    #  Given
+    stereo = np.repeat(tone(44_100), 2)
+
+    #  When
+    samples = decode_audio(wav_bytes(stereo, 44_100, channels=2))
+
+    #  Then
+    assert len(samples) == SAMPLE_RATE
+    assert np.abs(samples).max() == pytest.approx(0.5, abs=0.01)
+
+
+@pytest.mark.parametrize("rate", [8_000, 22_050, 44_100, 48_000])
+def test_resampling_should_keep_speech_band_and_filter_aliases(rate):
+    #  When: a 440 Hz tone, and a 12 kHz one above the 8 kHz Nyquist limit
+    speech = decode_audio(wav_bytes(tone(rate), rate))
+    alias = decode_audio(wav_bytes(tone(rate, frequency=12_000), rate))
+
+    #  Then
+    assert len(speech) == SAMPLE_RATE
+    assert np.allclose(speech[100:-100], tone(SAMPLE_RATE)[100:-100], atol=2e-3)
+    if rate > SAMPLE_RATE:
+        assert np.abs(alias[100:-100]).max() < 0.01
+
+
+def test_decode_wav_should_resample_by_blocks(monkeypatch):
+    #  Given
+    data = wav_bytes(tone(44_100, seconds=2), 44_100)
+    whole = audio.decode_wav(data)
+    monkeypatch.setattr(audio, "WAV_BLOCK_FRAMES", 1000)
+
+    #  When
+    samples = audio.decode_wav(io.BytesIO(data))
+
+    #  Then
+    assert samples.dtype == np.float32
+    assert len(samples) == 2 * SAMPLE_RATE
+    assert np.allclose(samples, whole, atol=1e-6)
+
+
+@pytest.mark.parametrize("data_size", [0xFFFFFFFF, 0])
+def test_decode_audio_should_use_ffmpeg_for_bogus_wav_frame_count(
+    monkeypatch, data_size
+):
+    #  Given: streamed WAV header, data size unknown when it was written
+    data = bytearray(wav_bytes(tone(44_100), 44_100, channels=1))
+    assert data[36:40] == b"data"
+    data[40:44] = data_size.to_bytes(4, "little")
+    monkeypatch.setattr(audio, "decode_ffmpeg", lambda data: "ffmpeg")
+
+    #  When
+    with pytest.raises(AudioDecodeError):
+        audio.decode_wav(io.BytesIO(data))
+    samples = decode_audio(bytes(data))
+
+    #  Then
+    assert samples == "ffmpeg"
+
+
+def test_decode_audio_should_reject_empty_file():
+    with pytest.raises(AudioDecodeError):
+        decode_audio(b"")
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="requires ffmpeg")
+def test_decode_audio_should_decode_mp3_through_ffmpeg_pipe():
+    #  Given
+    data = (Path(__file__).parents[1] / "audio" / "patient.mp3").read_bytes()
+
+    #  When
+    samples = decode_audio(data)
+
+    #  Then
+    assert samples.dtype == np.float32
+    assert len(samples) > SAMPLE_RATE
+
+
+async def stream(data: bytes, chunk_size: int = 1000):
+    for start in range(0, len(data), chunk_size):
+        yield data[start : start + chunk_size]
+
+
+@pytest.fixture
+def passthrough_ffmpeg(tmp_path, monkeypatch):
+    """Stand-in ffmpeg copying stdin to stdout, input already in s16le."""
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text("#!/bin/sh\nexec cat\n")
+    ffmpeg.chmod(0o755)
+    monkeypatch.setenv("PATH", str(tmp_path), prepend=":")
+
+
+@pytest.mark.asyncio
+async def test_decode_ffmpeg_stream_should_pipe_chunks(passthrough_ffmpeg):
+    #  Given
+    pcm = (tone(SAMPLE_RATE) * 32767).astype(np.int16).tobytes()
+
+    #  When
+    samples = await decode_ffmpeg_stream(stream(pcm))
+
+    #  Then
+    assert len(samples) == SAMPLE_RATE
+    assert np.allclose(samples, tone(SAMPLE_RATE), atol=1e-3)
+
+
+@pytest.mark.asyncio
+async def test_decode_ffmpeg_stream_should_stop_ffmpeg_on_error(passthrough_ffmpeg):
+    #  Given
+    async def failing_upload():
+        yield b"\0" * 1000
+        raise RuntimeError("Upload too large")
+
+    #  Then
+    with pytest.raises(RuntimeError, match="too large"):
+        await decode_ffmpeg_stream(failing_upload())
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+import whisper
+from whisper.model import ModelDimensions
+
+from backend.core.utils.batching import MicroBatcher
+from backend.core.utils.stt_engines import transcribe_batch
+
+
+@pytest.mark.asyncio
+async def test_micro_batcher_should_group_concurrent_requests():
+    #  Given
+    batches = []
+
+    def run_batch(items):
+        batches.append(list(items))
+        time.sleep(0.01)
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait=0.05)
+
+    try:
+        #  When
+        results = await asyncio.gather(*(batcher.submit(n) for n in range(10)))
+    finally:
+        await batcher.stop()
+
+    #  Then
+    assert results == [n * 2 for n in range(10)]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert batcher.stats.as_dict()["avg_batch_size"] == 10 / 3
+
+
+@pytest.mark.asyncio
+async def test_micro_batcher_should_not_wait_more_than_max_wait():
+    #  Given
+    batcher = MicroBatcher(lambda items: items, max_batch_size=8, max_wait=0.01)
+
+    try:
+        #  When
+        start = time.perf_counter()
+        result = await batcher.submit("alone")
+        elapsed = time.perf_counter() - start
+    finally:
+        await batcher.stop()
+
+    #  Then
+    assert result == "alone"
+    assert elapsed < 0.5
+
+
+@pytest.mark.asyncio
+async def test_micro_batcher_should_fail_whole_batch():
+    #  Given
+    def run_batch(items):
+        raise RuntimeError("Out of memory")
+
+    batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait=0.05)
+
+    try:
+        #  When
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+    finally:
+        await batcher.stop()
+
+    #  Then
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_transcribe_batch_should_decode_one_text_per_audio():
+    #  Given: untrained model with the dimensions of "tiny", no download
+    dims = ModelDimensions(
+        n_mels=80,
+        n_audio_ctx=1500,
+        n_audio_state=384,
+        n_audio_head=6,
+        n_audio_layer=4,
+        n_vocab=51865,
+        n_text_ctx=448,
+        n_text_state=384,
+        n_text_head=6,
+        n_text_layer=4,
+    )
+    model = whisper.model.Whisper(dims)
+    audios = [
+        np.zeros(16_000, np.float32),
+        np.zeros(40 * 16_000, np.float32),  # two 30-second segments
+    ]
+    options = whisper.DecodingOptions(
+        language="fr", fp16=False, without_timestamps=True, sample_len=2
+    )
+
+    #  When
+    texts = transcribe_batch(model, audios, options)
+
+    #  Then
+    assert len(texts) == 2
+    assert all(isinstance(text, str) for text in texts)
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+from mongoengine import ValidationError
+
+from backend.core.repositories.bulk import _parse_row
+from backend.core.repositories.bulk import import_users
+from backend.core.repositories.bulk import iter_lines
+
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_should_split_across_chunks():
+    #  Given
+    chunks = _chunks(b'{"a": 1}\n{"b"', b": 2}\n", b'{"c": 3}')
+
+    #  When
+    lines = [line async for line in iter_lines(chunks)]
+
+    #  Then
+    assert lines == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+
+@pytest.mark.asyncio
+async def test_import_should_report_long_and_undecodable_lines():
+    #  Given: a line longer than the limit and one that is not UTF-8
+    chunks = _chunks(b"[" + b"0," * 40_000, b"0]\n\xff\xfe\n")
+
+    #  When
+    results = [result async for result in import_users(iter_lines(chunks))]
+
+    #  Then
+    assert [result.get("line") for result in results[:2]] == [1, 2]
+    assert "longer than" in results[0]["error"]
+    assert "utf-8" in results[1]["error"]
+    assert results[2] == {"imported": 0, "failed": 2}
+
+
+def test_parse_row_should_build_user_and_medical_history():
+    #  Given
+    line = json.dumps(
+        {
+            "username": "john_doe",
+            "password": "secure_password123",
+            "email": "john@example.com",
+            "sex": "MALE",
+            "date_of_birth": "1990-01-01",
+            "health_info": {"height": 180, "blood_type": "O+"},
+        }
+    ).encode()
+
+    #  When
+    user, health_fields = _parse_row(line)
+
+    #  Then
+    assert user["username"] == "john_doe"
+    assert "_id" in user
+    assert health_fields["height"] == 180
+    assert health_fields["blood_type"] == "O+"
+
+
+def test_parse_row_should_reject_invalid_blood_type():
+    line = json.dumps(
+        {
+            "username": "john_doe",
+            "password": "secure_password123",
+            "email": "john@example.com",
+            "sex": "MALE",
+            "date_of_birth": "1990-01-01",
+            "health_info": {"blood_type": "Z+"},
+        }
+    ).encode()
+
+    with pytest.raises(ValidationError):
+        _parse_row(line)
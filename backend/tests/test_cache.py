@@ -0,0 +1,155 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from backend.core.utils.cache import DiskCache
+from backend.core.utils.cache import LocalSharedStore
+from backend.core.utils.cache import LRUCache
+from backend.core.utils.cache import SharedCache
+from backend.core.utils.cache import TieredCache
+
+
+@pytest.mark.asyncio
+async def test_lru_cache_should_evict_least_recently_used():
+    #  Given
+    cache = LRUCache(max_size=2, ttl=60)
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    await cache.get("a")
+
+    #  When
+    await cache.set("c", 3)
+
+    #  Then
+    assert await cache.get("b") is None
+    assert await cache.get("a") == 1
+    assert await cache.get("c") == 3
+    assert cache.stats.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_cache_should_evict_beyond_max_bytes():
+    #  Given
+    cache = LRUCache(max_size=10, ttl=60, max_bytes=10)
+    await cache.set("a", b"aaaa")
+    await cache.set("b", b"bbbb")
+    await cache.set("a", b"aaa")
+
+    #  When
+    await cache.set("c", b"cccc")
+
+    #  Then
+    assert await cache.get("b") is None
+    assert await cache.get("a") == b"aaa"
+    assert cache.size == 7
+    assert cache.stats.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_cache_should_expire_entries():
+    #  Given
+    cache = LRUCache(max_size=10, ttl=-1)
+    await cache.set("a", 1)
+
+    #  When
+    value = await cache.get("a")
+
+    #  Then
+    assert value is None
+    assert cache.stats.expirations == 1
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_lru_cache_should_count_hits_misses_and_invalidations():
+    #  Given
+    cache = LRUCache(max_size=10, ttl=60)
+    await cache.set("a", 1)
+
+    #  When
+    await cache.get("a")
+    await cache.get("b")
+    await cache.delete("a", "b")
+
+    #  Then
+    stats = cache.stats.as_dict()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+    assert stats["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_shared_cache_should_round_trip_documents():
+    #  Given
+    cache = SharedCache(LocalSharedStore(), ttl=60)
+    document = {"_id": ObjectId(), "created_at": datetime(2024, 1, 1, 12, 30)}
+
+    #  When
+    await cache.set("user:john_doe", document)
+    cached = await cache.get("user:john_doe")
+    await cache.delete("user:john_doe")
+
+    #  Then
+    assert cached == document
+    assert await cache.get("user:john_doe") is None
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_should_evict_least_recently_used_beyond_max_bytes(
+    tmp_path,
+):
+    #  Given
+    cache = DiskCache(str(tmp_path), max_bytes=10)
+    await cache.set("a", b"aaaa")
+    await cache.set("b", b"bbbb")
+    await cache.get("a")
+
+    #  When
+    await cache.set("c", b"cccc")
+
+    #  Then
+    assert await cache.get("b") is None
+    assert await cache.get("a") == b"aaaa"
+    assert cache.path("c").read_bytes() == b"cccc"
+    assert cache.size == 8
+    assert cache.stats.evictions == 1
+    assert sorted(file.name for file in tmp_path.iterdir()) == ["a", "c"]
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_should_reuse_existing_files(tmp_path):
+    #  Given
+    await DiskCache(str(tmp_path), max_bytes=100).set("a", b"aaaa")
+
+    #  When
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+
+    #  Then
+    assert len(cache) == 1
+    assert await cache.get("a") == b"aaaa"
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_should_promote_disk_entries_to_memory(tmp_path):
+    #  Given: entry on disk only, e.g. after a restart
+    disk = DiskCache(str(tmp_path), max_bytes=100)
+    await disk.set("a", b"aaaa")
+    cache = TieredCache(LRUCache(max_size=10, ttl=60), disk)
+
+    #  When
+    first = await cache.get("a")
+    second = await cache.get("a")
+    missing = await cache.get("b")
+
+    #  Then
+    assert first == second == b"aaaa"
+    assert missing is None
+    assert disk.stats.hits == 1
+    stats = cache.as_dict()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["memory"]["hits"] == 1
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from openai import AsyncOpenAI
+
+from backend.core.utils import chatgpt
+from backend.core.utils.chatgpt import chat
+from backend.core.utils.chatgpt import chat_stream
+from backend.core.utils.chatgpt import MAX_MESSAGES
+
+LATENCY = 0.2
+
+fake_openai = FastAPI()
+
+
+@fake_openai.post("/v1/chat/completions")
+async def completions(request: Request):
+    """Fake OpenAI completion, taking LATENCY seconds like a remote model."""
+    body = await request.json()
+    await asyncio.sleep(LATENCY)
+    if body.get("stream"):
+        return StreamingResponse(
+            completion_events(body), media_type="text/event-stream"
+        )
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body["model"],
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {
+                    "role": "assistant",
+                    "content": f"{len(body['messages'])} messages",
+                },
+            }
+        ],
+    }
+
+
+async def completion_events(body: dict):
+    for token in ["Bonjour", ", ", f"{len(body['messages'])} messages"]:
+        chunk = {
+            "id": "chatcmpl-test",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "delta": {"content": token}}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@pytest.fixture
+def client():
+    return AsyncOpenAI(
+        api_key="test",
+        base_url="http://fake-openai/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_openai)),
+    )
+
+
+@pytest.mark.asyncio
+async def test_chat_should_keep_session_until_final_response(client):
+    #  Given
+    chatgpt.sessions.clear()
+
+    #  When
+    replies = [
+        await chat("session", f"message {turn}", client=client)
+        for turn in range(MAX_MESSAGES)
+    ]
+
+    #  Then
+    assert replies[0] == "3 messages"
+    # Final response: 2 system prompts, the final one and the whole session
+    assert replies[-1] == f"{3 + 2 * MAX_MESSAGES - 1} messages"
+    assert "session" not in chatgpt.sessions
+
+
+@pytest.mark.asyncio
+async def test_concurrent_chats_should_not_block_each_other(client):
+    #  Given
+    conversations = 10
+
+    #  When
+    start = time.perf_counter()
+    replies = await asyncio.gather(
+        *(chat(f"session-{n}", "Hello", client=client) for n in range(conversations))
+    )
+    elapsed = time.perf_counter() - start
+
+    #  Then
+    assert replies == ["3 messages"] * conversations
+    assert elapsed < 3 * LATENCY
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_should_yield_tokens_and_update_session(client):
+    #  Given
+    chatgpt.sessions.clear()
+
+    #  When
+    tokens = [token async for token in chat_stream("session", "Hello", client=client)]
+
+    #  Then
+    assert tokens == ["Bonjour", ", ", "3 messages"]
+    assert chatgpt.sessions["session"][-1] == {
+        "role": "assistant",
+        "content": "Bonjour, 3 messages",
+    }
@@ -0,0 +1,42 @@
+import httpx
+import pytest
+
+from backend.core.utils.eleven_labs import stream_text_to_speech
+
+AUDIO = bytes(range(256)) * 40
+
+
+@pytest.mark.asyncio
+async def test_stream_text_to_speech_should_yield_bounded_chunks():
+    #  Given
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, content=AUDIO)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        #  When
+        chunks = [
+            chunk
+            async for chunk in stream_text_to_speech(
+                "Bonjour", client=client, chunk_size=1024
+            )
+        ]
+
+    #  Then
+    assert requests[0].url.path.endswith("/stream")
+    assert b"".join(chunks) == AUDIO
+    assert max(len(chunk) for chunk in chunks) == 1024
+
+
+@pytest.mark.asyncio
+async def test_stream_text_to_speech_should_raise_on_error():
+    #  Given
+    transport = httpx.MockTransport(lambda request: httpx.Response(401))
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        #  Then
+        with pytest.raises(httpx.HTTPStatusError):
+            async for _ in stream_text_to_speech("Bonjour", client=client):
+                pass
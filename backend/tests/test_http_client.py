@@ -0,0 +1,55 @@
+import httpx
+import pytest
+
+from backend.core.utils.http_client import HTTPClientStats
+from backend.core.utils.http_client import RequestTrace
+
+NEW_CONNECTION_EVENTS = [
+    "connection.connect_tcp.started",
+    "connection.connect_tcp.complete",
+    "connection.start_tls.started",
+    "connection.start_tls.complete",
+]
+REQUEST_EVENTS = [
+    "http2.send_request_headers.started",
+    "http2.send_request_headers.complete",
+    "http2.receive_response_headers.started",
+    "http2.receive_response_headers.complete",
+]
+
+
+async def traced(events: list[str]) -> RequestTrace:
+    trace = RequestTrace()
+    for event in events:
+        await trace(event, {})
+    return trace
+
+
+@pytest.mark.asyncio
+async def test_request_trace_should_time_new_connection():
+    #  Given
+    trace = await traced(NEW_CONNECTION_EVENTS + REQUEST_EVENTS)
+
+    #  Then
+    assert not trace.reused_connection
+    assert trace.tls_time is not None
+    assert trace.time_to_first_byte is not None
+
+
+@pytest.mark.asyncio
+async def test_stats_should_count_connection_reuse():
+    #  Given
+    stats = HTTPClientStats()
+    response = httpx.Response(200, extensions={"http_version": b"HTTP/2"})
+
+    #  When
+    stats.record(await traced(NEW_CONNECTION_EVENTS + REQUEST_EVENTS), response)
+    stats.record(await traced(REQUEST_EVENTS), response)
+    stats.record(await traced(REQUEST_EVENTS), response)
+
+    #  Then
+    metrics = stats.as_dict()
+    assert metrics["requests"] == 3
+    assert metrics["new_connections"] == 1
+    assert metrics["connection_reuse_ratio"] == pytest.approx(2 / 3)
+    assert metrics["http_versions"] == {"HTTP/2": 3}
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from backend.core.utils.password import hash_password
+from backend.core.utils.password import legacy_hash
+from backend.core.utils.password import needs_rehash
+from backend.core.utils.password import PasswordHasher
+from backend.core.utils.password import verify_password
+
+PARAMS = {"n": 2**4, "r": 8, "p": 1}
+
+
+def test_scrypt_hash_should_verify_password():
+    #  Given
+    hashed = hash_password("secure_password123", "scrypt", PARAMS)
+
+    #  Then
+    assert hashed.startswith("$scrypt$n=16,r=8,p=1$")
+    assert verify_password("secure_password123", hashed)
+    assert not verify_password("wrong_password", hashed)
+
+
+def test_scrypt_hash_should_be_salted():
+    assert hash_password("password", "scrypt", PARAMS) != hash_password(
+        "password", "scrypt", PARAMS
+    )
+
+
+def test_legacy_hash_should_verify_and_need_rehash():
+    #  Given
+    hashed = legacy_hash("secure_password123", "salt")
+
+    #  Then
+    assert verify_password("secure_password123", hashed, legacy_salt="salt")
+    assert not verify_password("wrong_password", hashed, legacy_salt="salt")
+    assert needs_rehash(hashed, "scrypt", PARAMS)
+
+
+def test_needs_rehash_should_detect_outdated_costs():
+    #  Given
+    hashed = hash_password("password", "scrypt", PARAMS)
+
+    #  Then
+    assert not needs_rehash(hashed, "scrypt", PARAMS)
+    assert needs_rehash(hashed, "scrypt", {**PARAMS, "n": 2**5})
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_should_hash_in_process_pool():
+    #  Given
+    hasher = PasswordHasher("scrypt", PARAMS, workers=1)
+
+    try:
+        #  When
+        hashed = await hasher.hash("secure_password123")
+        valid, rehash = await hasher.verify("secure_password123", hashed)
+        invalid, _ = await hasher.verify("wrong_password", hashed)
+    finally:
+        hasher.shutdown()
+
+    #  Then
+    assert valid and not rehash
+    assert not invalid
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_should_reject_unknown_users_after_a_hash():
+    #  Given
+    hasher = PasswordHasher("scrypt", PARAMS, workers=2)
+
+    try:
+        #  When
+        bulk_hashes = await asyncio.gather(
+            *(hasher.hash(f"password_{i}", bulk=True) for i in range(3))
+        )
+        result = await hasher.verify_unknown("secure_password123")
+    finally:
+        hasher.shutdown()
+
+    #  Then
+    assert hasher.bulk_pending == 1
+    assert all(verify_password(f"password_{i}", h) for i, h in enumerate(bulk_hashes))
+    assert result == (False, False)
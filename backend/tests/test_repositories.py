@@ -0,0 +1,218 @@
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+from bson import ObjectId
+from mongoengine import ValidationError
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import DuplicateKeyError
+
+from backend.core.models.MedicalHistory import MedicalHistory
+from backend.core.models.user import User
+from backend.core.repositories import medical_history as medical_history_repository
+from backend.core.repositories import user as user_repository
+from backend.core.repositories.base import decode_cursor
+from backend.core.repositories.base import duplicate_key_field
+from backend.core.repositories.base import encode_cursor
+from backend.core.repositories.base import validated_fields
+from backend.core.repositories.medical_history import MedicalHistoryRepository
+from backend.core.repositories.user import UserRepository
+from backend.core.utils.cache import LRUCache
+
+
+def test_validated_fields_should_only_return_given_fields():
+    #  Given
+    fields = {"sex": "MALE", "date_of_birth": date(1990, 1, 1)}
+
+    #  When
+    result = validated_fields(User, fields)
+
+    #  Then
+    assert result == {"sex": "MALE", "date_of_birth": datetime(1990, 1, 1)}
+
+
+def test_validated_fields_should_reject_short_username():
+    with pytest.raises(ValidationError) as error:
+        validated_fields(User, {"username": "ab"})
+
+    assert list(error.value.errors) == ["username"]
+
+
+def test_validated_fields_should_reject_unknown_blood_type():
+    with pytest.raises(ValidationError):
+        validated_fields(MedicalHistory, {"blood_type": "Z+"})
+
+
+def test_medical_history_serialize_should_not_dereference_user():
+    #  Given
+    user_id = ObjectId()
+    document = {"_id": ObjectId(), "user": user_id, "allergies": ["pollen"]}
+
+    #  When
+    result = MedicalHistory.serialize(document)
+
+    #  Then
+    assert result["user_id"] == str(user_id)
+    assert result["allergies"] == ["pollen"]
+    assert result["medications"] == []
+    assert result["last_updated"] is None
+
+
+def test_duplicate_key_field_should_read_key_pattern():
+    error = DuplicateKeyError(
+        "E11000 duplicate key error", 11000, {"keyPattern": {"email": 1}}
+    )
+
+    assert duplicate_key_field(error) == "email"
+
+
+def test_duplicate_key_field_should_fallback_on_index_name():
+    error = DuplicateKeyError(
+        "E11000 duplicate key error collection: sana.User index: username_1 "
+        'dup key: { username: "john_doe" }',
+        11000,
+    )
+
+    assert duplicate_key_field(error) == "username"
+
+
+def test_cursor_should_round_trip():
+    #  Given
+    created_at = datetime(2024, 5, 1, 10, 30, 0, 123000)
+    id = ObjectId()
+
+    #  When
+    cursor = encode_cursor(created_at, id)
+
+    #  Then
+    assert decode_cursor(cursor) == (created_at, id)
+
+
+def test_decode_cursor_should_reject_malformed_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = AsyncMongoMockClient()["sana_test"]
+    monkeypatch.setattr(user_repository, "get_database", lambda: database)
+    cache = LRUCache(100, 60)
+    monkeypatch.setattr(user_repository, "cache", cache)
+    monkeypatch.setattr(medical_history_repository, "get_database", lambda: database)
+    monkeypatch.setattr(medical_history_repository, "cache", cache)
+    # Imported as core.repositories.user by the repository module
+    monkeypatch.setattr(medical_history_repository, "UserRepository", UserRepository)
+    return database
+
+
+@pytest.mark.asyncio
+async def test_list_page_should_walk_filtered_pages_newest_first(database):
+    #  Given: 10 users created a minute apart, aged 10 * i + 4 or 5 years,
+    #  every third one allergic
+    now = datetime(2024, 1, 1)
+    users = [
+        {
+            "_id": ObjectId(),
+            "username": f"user_{i}",
+            "email": f"user_{i}@example.com",
+            "sex": "FEMALE" if i % 2 else "MALE",
+            "date_of_birth": datetime(date.today().year - 10 * i - 5, 1, 1),
+            "created_at": now + timedelta(minutes=i),
+            "has_allergies": i % 3 == 0,
+        }
+        for i in range(10)
+    ]
+    await database["User"].insert_many(users)
+    await database["medical_history"].insert_one(
+        {"user": users[9]["_id"], "allergies": ["pollen"]}
+    )
+
+    #  When
+    pages = []
+    after = None
+    while True:
+        page = await UserRepository.list_page(limit=2, after=after, has_allergies=True)
+        pages.append([user["username"] for user in page])
+        if len(page) < 2:
+            break
+        after = (page[-1]["created_at"], page[-1]["_id"])
+    women = await UserRepository.list_page(limit=10, sex="FEMALE", max_age=50)
+
+    #  Then
+    assert pages == [["user_9", "user_6"], ["user_3", "user_0"], []]
+    first = await UserRepository.list_page(limit=1, has_allergies=True)
+    assert first[0]["medical_history"][0]["allergies"] == ["pollen"]
+    assert [user["username"] for user in women] == ["user_3", "user_1"]
+
+
+@pytest.mark.asyncio
+async def test_backfill_has_allergies_should_flag_users_from_medical_history(
+    database,
+):
+    #  Given: users stored before the flag existed
+    allergic, healthy = ObjectId(), ObjectId()
+    await database["User"].insert_many([{"_id": allergic}, {"_id": healthy}])
+    await database["medical_history"].insert_many(
+        [
+            {"user": allergic, "allergies": ["pollen"]},
+            {"user": healthy, "allergies": []},
+        ]
+    )
+
+    #  When
+    await UserRepository.backfill_has_allergies()
+
+    #  Then
+    flags = {
+        user["_id"]: user["has_allergies"] async for user in database["User"].find()
+    }
+    assert flags == {allergic: True, healthy: False}
+
+
+@pytest.mark.asyncio
+async def test_medical_history_should_be_cached_by_user_id(database):
+    #  Given: alice renamed to alice2, then another user registered as alice
+    renamed, other = ObjectId(), ObjectId()
+    await database["User"].insert_many(
+        [
+            {"_id": renamed, "username": "alice2", "password": "hash"},
+            {"_id": other, "username": "alice"},
+        ]
+    )
+    await database["medical_history"].insert_many(
+        [
+            {"user": renamed, "blood_type": "A+"},
+            {"user": other, "blood_type": "O-"},
+        ]
+    )
+
+    #  When: the old token of alice is used, and alice is read without one
+    by_token = await MedicalHistoryRepository.find_by_username("alice", renamed)
+    by_username = await MedicalHistoryRepository.find_by_username("alice")
+    await database["medical_history"].delete_many({})
+    cached_by_token = await MedicalHistoryRepository.find_by_username("alice", renamed)
+    cached_by_username = await MedicalHistoryRepository.find_by_username("alice")
+
+    #  Then
+    assert by_token["blood_type"] == cached_by_token["blood_type"] == "A+"
+    assert by_username["blood_type"] == cached_by_username["blood_type"] == "O-"
+    assert "password" not in await user_repository.cache.get("user:alice")
+    assert await MedicalHistoryRepository.find_by_username("bob") is None
+
+
+@pytest.mark.asyncio
+async def test_find_by_username_should_not_cache_password_hash(database):
+    #  Given
+    await database["User"].insert_one({"username": "alice", "password": "hash"})
+
+    #  When
+    user = await UserRepository.find_by_username("alice")
+    cached = await user_repository.cache.get(UserRepository.cache_key("alice"))
+    credentials = await UserRepository.find_one(username="alice")
+
+    #  Then
+    assert user.password is None
+    assert "password" not in cached
+    assert credentials.password == "hash"
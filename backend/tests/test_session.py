@@ -0,0 +1,88 @@
+import time
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from backend.core.utils import session
+from backend.core.utils.session import create_token
+from backend.core.utils.session import InvalidToken
+from backend.core.utils.session import require_clinician
+from backend.core.utils.session import Role
+from backend.core.utils.session import session_user_id
+from backend.core.utils.session import SessionUser
+from backend.core.utils.session import verify_token
+
+
+def test_token_should_carry_user_id_and_username():
+    #  Given
+    user_id = ObjectId()
+
+    #  When
+    user = verify_token(create_token(user_id, "john_doe"))
+
+    #  Then
+    assert user == SessionUser(user_id, "john_doe")
+
+
+def test_forged_token_should_be_rejected():
+    #  Given
+    header, payload, signature = create_token(ObjectId(), "john_doe").split(".")
+    other_payload = create_token(ObjectId(), "jane_doe").split(".")[1]
+
+    #  Then
+    with pytest.raises(InvalidToken):
+        verify_token(f"{header}.{other_payload}.{signature}")
+    with pytest.raises(InvalidToken):
+        verify_token("not-a-token")
+    with pytest.raises(InvalidToken):
+        verify_token(f"{header}.{payload}.é")
+
+
+def test_expired_token_should_be_rejected(monkeypatch):
+    #  Given
+    token = create_token(ObjectId(), "john_doe")
+    expired_at = time.time() + session.settings.TOKEN_TTL + 1
+    monkeypatch.setattr(session.time, "time", lambda: expired_at)
+
+    #  Then
+    with pytest.raises(InvalidToken, match="expired"):
+        verify_token(token)
+
+
+def test_session_user_id_should_match_route_username():
+    #  Given
+    user = SessionUser(ObjectId(), "john_doe")
+
+    #  Then
+    assert session_user_id("john_doe", user) == user.user_id
+    assert session_user_id("john_doe", None) is None
+    with pytest.raises(HTTPException) as e:
+        session_user_id("jane_doe", user)
+    assert e.value.status_code == 403
+
+
+def test_token_should_carry_role():
+    #  Given
+    user_id = ObjectId()
+
+    #  When
+    user = verify_token(create_token(user_id, "dr_house", Role.CLINICIAN))
+
+    #  Then
+    assert user == SessionUser(user_id, "dr_house", Role.CLINICIAN)
+
+
+@pytest.mark.asyncio
+async def test_require_role_should_reject_anonymous_and_patients():
+    #  Given
+    clinician = SessionUser(ObjectId(), "dr_house", Role.CLINICIAN)
+
+    #  Then
+    assert await require_clinician(clinician) == clinician
+    with pytest.raises(HTTPException) as e:
+        await require_clinician(None)
+    assert e.value.status_code == 401
+    with pytest.raises(HTTPException) as e:
+        await require_clinician(SessionUser(ObjectId(), "john_doe"))
+    assert e.value.status_code == 403
@@ -0,0 +1,90 @@
+import pytest
+
+from backend.core.utils.cache import build_tiered_cache
+from backend.core.utils.speech_cache import iter_file
+from backend.core.utils.speech_cache import SpeechCache
+
+
+class FakeTTS:
+    def __init__(self):
+        self.texts = []
+
+    async def __call__(self, text):
+        self.texts.append(text)
+        yield b"ID3"
+        yield text.encode()
+
+
+@pytest.fixture
+def tts():
+    return FakeTTS()
+
+
+@pytest.fixture
+def speech_cache(tmp_path, tts):
+    cache = build_tiered_cache(
+        max_size=10, ttl=60, directory=str(tmp_path), max_bytes=1024
+    )
+    return SpeechCache(cache, synthesize=tts)
+
+
+def test_key_should_ignore_spacing_of_text():
+    assert SpeechCache.key(" Bonjour,\n  comment allez-vous ? ") == SpeechCache.key(
+        "Bonjour, comment allez-vous ?"
+    )
+    assert SpeechCache.key("Bonjour") != SpeechCache.key("Bonsoir")
+
+
+@pytest.mark.asyncio
+async def test_stream_should_synthesize_text_once(speech_cache, tts, tmp_path):
+    #  When
+    first = [chunk async for chunk in speech_cache.stream("Bonjour")]
+    second = [chunk async for chunk in speech_cache.stream("Bonjour ")]
+
+    #  Then
+    assert b"".join(first) == b"".join(second) == b"ID3Bonjour"
+    assert tts.texts == ["Bonjour"]
+    assert speech_cache.as_dict()["hit_ratio"] == 0.5
+    assert (tmp_path / SpeechCache.key("Bonjour")).read_bytes() == b"ID3Bonjour"
+
+
+@pytest.mark.asyncio
+async def test_stream_should_not_cache_interrupted_synthesis(speech_cache):
+    #  Given
+    stream = speech_cache.stream("Bonjour")
+
+    #  When: client gone after the first chunk
+    await stream.__anext__()
+    await stream.aclose()
+
+    #  Then
+    assert speech_cache.open("Bonjour") is None
+
+
+@pytest.mark.asyncio
+async def test_open_file_should_stay_readable_after_eviction(speech_cache, tmp_path):
+    #  Given
+    await speech_cache.prewarm(["Bonjour"])
+    file = speech_cache.open("Bonjour")
+
+    #  When: evicted by another worker process
+    (tmp_path / SpeechCache.key("Bonjour")).unlink()
+
+    #  Then
+    chunks = [bytes(chunk) async for chunk in iter_file(file, 4)]
+    assert chunks == [b"ID3B", b"onjo", b"ur"]
+    assert file.closed
+    assert speech_cache.open("Bonjour") is None
+
+
+@pytest.mark.asyncio
+async def test_prewarm_should_synthesize_missing_phrases(speech_cache, tts):
+    #  Given
+    await speech_cache.prewarm(["Bonjour"])
+
+    #  When
+    synthesized = await speech_cache.prewarm(["Bonjour", "", "Au revoir"])
+
+    #  Then
+    assert synthesized == 1
+    assert tts.texts == ["Bonjour", "Au revoir"]
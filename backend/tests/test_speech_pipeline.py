@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from backend.core.utils.speech_pipeline import pipelined_speech
+from backend.core.utils.speech_pipeline import sentence_chunks
+
+
+async def stream(items):
+    for item in items:
+        await asyncio.sleep(0)
+        yield item
+
+
+@pytest.mark.asyncio
+async def test_sentence_chunks_should_cut_at_sentence_ends():
+    #  Given
+    tokens = ["Bonjour", ". Depuis quand", " avez-vous mal ?", " Dr", ". House", "."]
+
+    #  When
+    chunks = [chunk async for chunk in sentence_chunks(stream(tokens), min_length=5)]
+
+    #  Then
+    assert chunks == ["Bonjour.", "Depuis quand avez-vous mal ?", "Dr. House."]
+
+
+@pytest.mark.asyncio
+async def test_sentence_chunks_should_merge_short_sentences():
+    #  Given
+    tokens = ["Ok. ", "Je vois. ", "Avez-vous de la fièvre ?"]
+
+    #  When
+    chunks = [chunk async for chunk in sentence_chunks(stream(tokens), min_length=12)]
+
+    #  Then
+    assert chunks == ["Ok. Je vois.", "Avez-vous de la fièvre ?"]
+
+
+@pytest.mark.asyncio
+async def test_pipelined_speech_should_keep_sentence_order():
+    #  Given
+    delays = {"first": 0.05, "second": 0.0}
+
+    async def synthesize(text):
+        await asyncio.sleep(delays[text])
+        yield f"{text}-1|".encode()
+        yield f"{text}-2|".encode()
+
+    #  When
+    audio = [
+        chunk
+        async for chunk in pipelined_speech(
+            stream(["first", "second"]), synthesize=synthesize, concurrency=2
+        )
+    ]
+
+    #  Then
+    assert b"".join(audio) == b"first-1|first-2|second-1|second-2|"
+
+
+@pytest.mark.asyncio
+async def test_pipelined_speech_should_raise_synthesis_errors():
+    #  Given
+    async def synthesize(text):
+        raise RuntimeError("TTS down")
+        yield b""
+
+    #  Then
+    with pytest.raises(RuntimeError, match="TTS down"):
+        async for _ in pipelined_speech(stream(["first"]), synthesize=synthesize):
+            pass
@@ -0,0 +1,41 @@
+import importlib.util
+
+import numpy as np
+import pytest
+
+from backend.core.utils.stt_engines import create_engine
+from backend.core.utils.stt_engines import STTEngine
+
+
+class EchoEngine(STTEngine):
+    name = "echo"
+    default_compute_type = "int8"
+
+    def transcribe(self, audio):
+        return {"text": f"{len(audio)} samples", "language": "fr"}
+
+
+def test_engine_should_default_compute_type_and_batch_one_by_one():
+    #  Given
+    engine = EchoEngine("base")
+
+    #  When
+    texts = engine.transcribe_batch([np.zeros(10), np.zeros(20)])
+
+    #  Then
+    assert texts == ["10 samples", "20 samples"]
+    assert engine.describe() == "echo:base:int8"
+
+
+def test_create_engine_should_reject_unknown_backend():
+    with pytest.raises(ValueError):
+        create_engine("vosk", "base")
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("faster_whisper") is not None,
+    reason="faster-whisper is installed",
+)
+def test_create_engine_should_require_faster_whisper():
+    with pytest.raises(RuntimeError):
+        create_engine("faster-whisper", "base")
@@ -0,0 +1,88 @@
+import io
+import tempfile
+import wave
+
+import pytest
+from fastapi import FastAPI
+from fastapi import File
+from fastapi import HTTPException
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+from backend.core.utils.upload import BodySizeLimitMiddleware
+from backend.core.utils.upload import decode_upload
+from backend.core.utils.upload import iter_upload
+
+LIMIT = 1024
+
+app = FastAPI()
+app.add_middleware(BodySizeLimitMiddleware, limits={"/upload": LIMIT})
+
+
+@app.post("/upload")
+async def upload(file: UploadFile = File(...)) -> dict:
+    return {"size": len(await file.read())}
+
+
+client = TestClient(app)
+
+
+def chunks(size: int, chunk_size: int = 256):
+    for start in range(0, size, chunk_size):
+        yield b"a" * min(chunk_size, size - start)
+
+
+def test_middleware_should_accept_body_under_limit():
+    response = client.post("/upload", files={"file": ("a.wav", b"a" * 100)})
+    assert response.status_code == 200
+    assert response.json() == {"size": 100}
+
+
+def test_middleware_should_reject_large_content_length():
+    response = client.post("/upload", files={"file": ("a.wav", b"a" * 2 * LIMIT)})
+    assert response.status_code == 413
+
+
+def test_middleware_should_abort_large_chunked_body():
+    #  Given: no Content-Length, the body is counted as it arrives
+    headers = {"content-type": "multipart/form-data; boundary=x"}
+
+    #  When
+    response = client.post("/upload", content=chunks(4 * LIMIT), headers=headers)
+
+    #  Then
+    assert response.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_iter_upload_should_read_by_chunks_up_to_limit():
+    #  Given
+    file = UploadFile(io.BytesIO(b"a" * 1000))
+
+    #  When
+    read = [chunk async for chunk in iter_upload(file, limit=1000, chunk_size=300)]
+
+    #  Then
+    assert [len(chunk) for chunk in read] == [300, 300, 300, 100]
+    with pytest.raises(HTTPException) as e:
+        async for _ in iter_upload(file, limit=999, chunk_size=300):
+            pass
+    assert e.value.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_decode_upload_should_decode_spooled_wav():
+    #  Given: a WAV upload as spooled by the multipart parser
+    spool = tempfile.SpooledTemporaryFile(max_size=1024)
+    with wave.open(spool, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16_000)
+        wav.writeframes(b"\0\0" * 16_000)
+    file = UploadFile(spool, size=spool.tell())
+
+    #  When
+    samples = await decode_upload(file)
+
+    #  Then
+    assert len(samples) == 16_000
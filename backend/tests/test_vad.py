@@ -0,0 +1,167 @@
+import importlib.machinery
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from backend.core.utils.vad import build_vad
+from backend.core.utils.vad import EnergyVAD
+from backend.core.utils.vad import SileroVAD
+
+RATE = 16_000
+
+
+def tone(seconds: float, amplitude: float = 0.3) -> np.ndarray:
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds: float) -> np.ndarray:
+    noise = np.random.default_rng(0).normal(0, 1e-4, int(seconds * RATE))
+    return noise.astype(np.float32)
+
+
+def test_energy_vad_should_find_padded_speech_regions():
+    #  Given
+    audio = np.concatenate([silence(1), tone(1), silence(2), tone(1), silence(1)])
+    vad = EnergyVAD(min_silence_ms=700, padding_ms=200)
+
+    #  When
+    regions = vad.regions(audio)
+
+    #  Then
+    assert len(regions) == 2
+    (start, end), (start2, end2) = regions
+    assert abs(start - 0.8 * RATE) < 0.05 * RATE
+    assert abs(end - 2.2 * RATE) < 0.05 * RATE
+    assert abs(start2 - 3.8 * RATE) < 0.05 * RATE
+
+
+def test_energy_vad_should_keep_short_pauses():
+    #  Given
+    audio = np.concatenate([silence(1), tone(1), silence(0.3), tone(1), silence(1)])
+
+    #  When
+    regions = EnergyVAD(min_silence_ms=700).regions(audio)
+
+    #  Then
+    assert len(regions) == 1
+
+
+def test_split_should_trim_silence_and_report_it():
+    #  Given
+    audio = np.concatenate([silence(1), tone(1), silence(2), tone(1), silence(1)])
+    vad = EnergyVAD(min_silence_ms=700, padding_ms=200)
+
+    #  When
+    chunks = vad.split(audio)
+
+    #  Then: both regions packed in one chunk, long pause shortened
+    assert len(chunks) == 1
+    assert abs(len(chunks[0]) / RATE - 2.8) < 0.1
+    stats = vad.stats.as_dict()
+    assert stats["requests"] == 1
+    assert abs(stats["removed_seconds"] - 3.2) < 0.1
+
+
+def test_split_should_return_nothing_for_silence_and_all_of_continuous_speech():
+    #  Given
+    vad = EnergyVAD()
+
+    #  When
+    silent = vad.split(silence(3))
+    speech = vad.split(tone(3))
+    quiet_speech = vad.split(tone(3, amplitude=0.01))
+
+    #  Then
+    assert silent == []
+    assert len(speech) == 1 and len(speech[0]) == 3 * RATE
+    assert len(quiet_speech) == 1 and len(quiet_speech[0]) == 3 * RATE
+    assert vad.stats.silent_requests == 1
+
+
+def test_energy_vad_should_keep_quieter_speaker_without_pauses():
+    #  Given: 10 s at -12 dBFS then 10 s at -27 dBFS (RMS)
+    loud = tone(10, amplitude=0.25 * np.sqrt(2))
+    quiet = tone(10, amplitude=0.045 * np.sqrt(2))
+
+    #  When
+    regions = EnergyVAD().regions(np.concatenate([loud, quiet]))
+
+    #  Then
+    assert regions == [(0, 20 * RATE)]
+
+
+def test_energy_vad_should_adapt_to_background_noise():
+    #  Given: speech over noise at -40 dBFS, above the absolute threshold
+    noise = np.random.default_rng(0).normal(0, 0.01, 6 * RATE).astype(np.float32)
+    noise[2 * RATE : 3 * RATE] += tone(1)
+
+    #  When
+    regions = EnergyVAD(padding_ms=0).regions(noise)
+
+    #  Then
+    assert len(regions) == 1
+    start, end = regions[0]
+    assert abs(start - 2 * RATE) < 0.05 * RATE
+    assert abs(end - 3 * RATE) < 0.05 * RATE
+
+
+def test_build_vad_should_reject_unknown_detector():
+    assert build_vad("none") is None
+    with pytest.raises(ValueError):
+        build_vad("webrtc")
+
+
+def test_segments_should_cut_long_speech_at_its_quietest_point():
+    #  Given: 70 seconds of speech with short dips (no pause) at 27 and 54s
+    audio = tone(70)
+    for dip in (27, 54):
+        audio[dip * RATE : dip * RATE + RATE // 10] *= 0.01
+
+    #  When
+    segments = EnergyVAD().segments(audio)
+
+    #  Then
+    assert [len(segment.audio) <= 30 * RATE for segment in segments] == [True] * 3
+    assert abs(segments[0].end - 27.05 * RATE) < 0.05 * RATE
+    assert abs(segments[1].end - 54.05 * RATE) < 0.05 * RATE
+    assert segments[0].end == segments[1].start
+    assert sum(len(segment.audio) for segment in segments) == len(audio)
+
+
+def test_silero_vad_should_load_model_once_and_run_one_audio_at_a_time(monkeypatch):
+    #  Given: a fake stateful model, corrupted by overlapping calls
+    loads, running, overlaps = [], [], []
+
+    def get_speech_timestamps(audio, model, threshold, sampling_rate):
+        running.append(model)
+        overlaps.append(len(running) > 1)
+        time.sleep(0.01)
+        running.pop()
+        return [{"start": 0, "end": len(audio)}]
+
+    module = types.ModuleType("silero_vad")
+    module.__spec__ = importlib.machinery.ModuleSpec("silero_vad", None)
+    module.load_silero_vad = lambda: loads.append(object()) or loads[-1]
+    module.get_speech_timestamps = get_speech_timestamps
+    monkeypatch.setitem(sys.modules, "silero_vad", module)
+    vad = SileroVAD(padding_ms=0)
+    barrier = threading.Barrier(4)
+
+    def regions(_):
+        barrier.wait()
+        return vad.regions(tone(1))
+
+    #  When
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(regions, range(4)))
+
+    #  Then
+    assert results == [[(0, RATE)]] * 4
+    assert len(loads) == 1
+    assert not any(overlaps)
@@ -1,7 +1,17 @@
+import asyncio
 import os
+import threading
 
+import numpy as np
 import pytest
+import whisper
+from whisper.model import ModelDimensions
 
+from backend.core.utils import whisper_stt
+from backend.core.utils.cache import LRUCache
+from backend.core.utils.stt_engines import detect_languages
+from backend.core.utils.vad import EnergyVAD
+from backend.core.utils.whisper_stt import Transcription
 from backend.core.utils.whisper_stt import WhisperSTT
 
 
@@ -23,3 +33,202 @@ async def test_detect_language_real():
     lang = await whisper.detect_language(audio_path)
     assert isinstance(lang, str)
     assert len(lang) > 0
+
+
+class FakeEngine:
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, audio):
+        self.calls += 1
+        return {"text": "bonjour", "language": "fr"}
+
+
+@pytest.mark.asyncio
+async def test_model_should_load_in_background(monkeypatch):
+    #  Given
+    loaded = threading.Event()
+
+    def load_engine(*args):
+        loaded.wait(5)
+        return FakeEngine()
+
+    monkeypatch.setattr(whisper_stt, "load_engine", load_engine)
+    stt = WhisperSTT()
+
+    #  When
+    stt.start()
+    await asyncio.sleep(0.05)
+    status_while_loading = stt.status
+    loaded.set()
+    result = await stt.transcribe_audio(np.zeros(16_000, np.float32))
+
+    #  Then
+    assert status_while_loading == "loading"
+    assert stt.ready
+    assert result == "bonjour"
+
+
+@pytest.mark.asyncio
+async def test_transcription_should_fail_when_model_cannot_load(monkeypatch):
+    #  Given
+    def load_engine(*args):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(whisper_stt, "load_engine", load_engine)
+    stt = WhisperSTT()
+
+    #  When
+    with pytest.raises(RuntimeError):
+        await stt.transcribe_audio(np.zeros(16_000, np.float32))
+
+    #  Then
+    assert stt.status == "failed"
+
+
+@pytest.mark.asyncio
+async def test_transcribe_with_language_should_use_a_single_pass(monkeypatch):
+    #  Given
+    model = FakeEngine()
+    monkeypatch.setattr(whisper_stt, "load_engine", lambda *args: model)
+    stt = WhisperSTT()
+
+    #  When
+    result = await stt.transcribe_with_language(np.zeros(16_000, np.float32))
+
+    #  Then
+    assert result == Transcription(text="bonjour", language="fr")
+    assert model.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_transcriptions_should_be_cached_and_coalesced(monkeypatch):
+    #  Given
+    model = FakeEngine()
+    monkeypatch.setattr(whisper_stt, "load_engine", lambda *args: model)
+    stt = WhisperSTT(cache=LRUCache(max_size=10, ttl=60))
+    audio = np.zeros(16_000, np.float32)
+
+    #  When: a retry while the first upload is transcribed, then a late one
+    texts = await asyncio.gather(
+        stt.transcribe_audio(audio), stt.transcribe_audio(audio.copy())
+    )
+    texts.append(await stt.transcribe_audio(audio))
+    await stt.transcribe_audio(np.ones(16_000, np.float32))
+
+    #  Then
+    assert texts == ["bonjour"] * 3
+    assert model.calls == 2
+    stats = stt.cache_stats()
+    assert stats["coalesced"] == 1
+    assert stats["hits"] == 1
+
+
+def test_detect_languages_should_rank_top_k_languages():
+    #  Given: untrained multilingual model with the dimensions of "tiny"
+    dims = ModelDimensions(
+        n_mels=80,
+        n_audio_ctx=1500,
+        n_audio_state=384,
+        n_audio_head=6,
+        n_audio_layer=4,
+        n_vocab=51865,
+        n_text_ctx=448,
+        n_text_state=384,
+        n_text_head=6,
+        n_text_layer=4,
+    )
+    model = whisper.model.Whisper(dims)
+
+    #  When: 40 seconds, only the first 30 are used
+    languages = detect_languages(model, np.zeros(40 * 16_000, np.float32), top_k=3)
+
+    #  Then
+    assert len(languages) == 3
+    probs = [prob for _, prob in languages]
+    assert probs == sorted(probs, reverse=True)
+    assert all(language in whisper.tokenizer.LANGUAGES for language, _ in languages)
+
+
+@pytest.mark.asyncio
+async def test_silence_should_not_be_transcribed(monkeypatch):
+    #  Given
+    engine = FakeEngine()
+    monkeypatch.setattr(whisper_stt, "load_engine", lambda *args: engine)
+    stt = WhisperSTT(vad=EnergyVAD())
+
+    #  When
+    text = await stt.transcribe_audio(np.zeros(5 * 16_000, np.float32))
+
+    #  Then
+    assert text == ""
+    assert engine.calls == 0
+    assert stt.vad.stats.removed_seconds == 5
+
+
+@pytest.mark.asyncio
+async def test_long_audio_should_be_transcribed_by_timed_segments(monkeypatch):
+    #  Given: 40s of speech with a dip at 28s, a pause, 20s of speech
+    class LengthEngine(FakeEngine):
+        def transcribe(self, audio):
+            super().transcribe(audio)
+            return {"text": f" {len(audio) // 16_000}s", "language": "fr"}
+
+    engine = LengthEngine()
+    monkeypatch.setattr(whisper_stt, "load_engine", lambda *args: engine)
+    stt = WhisperSTT(long_audio_seconds=60)
+    t = np.arange(40 * 16_000) / 16_000
+    speech = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    speech[28 * 16_000 : 28 * 16_000 + 1600] *= 0.01
+    audio = np.concatenate([speech, np.zeros(2 * 16_000, np.float32), speech[:320_000]])
+
+    #  When
+    segments = await stt.transcribe_segments(audio)
+    text = await stt.transcribe_audio(audio)
+
+    #  Then
+    assert [segment.text for segment in segments] == ["28s", "12s", "20s"]
+    assert segments[2].start == pytest.approx(41.8, abs=0.1)
+    assert text == "28s 12s 20s"
+    assert whisper_stt.stitch(segments[2:]) == "[00:41.8 --> 01:02.0] 20s"
+
+
+class SecondsEngine(FakeEngine):
+    def transcribe(self, audio):
+        return {"text": f" {len(audio) // 16_000}s", "language": "fr"}
+
+
+def _load_seconds_engine():
+    whisper_stt._worker_engine = SecondsEngine()
+
+
+@pytest.mark.asyncio
+async def test_long_audio_should_not_overflow_worker_queue():
+    #  Given: 6 minutes of speech, more segments than workers + max_queue
+    stt = WhisperSTT(workers=2, max_queue=2, long_audio_seconds=60)
+    stt.pool.initializer = _load_seconds_engine
+    stt.pool.initargs = ()
+    t = np.arange(6 * 60 * 16_000) / 16_000
+    audio = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+    try:
+        #  When
+        segments = await stt.transcribe_segments(audio)
+    finally:
+        await stt.stop()
+
+    #  Then
+    assert len(segments) > 4
+    assert sum(int(segment.text[:-1]) for segment in segments) >= 6 * 60 - len(segments)
+    assert stt.pool.as_dict()["rejected"] == 0
+
+
+def test_sequential_long_audio_mode_should_be_reported(caplog):
+    #  When
+    WhisperSTT(long_audio_seconds=60)
+    WhisperSTT(long_audio_seconds=60, batching=True)
+
+    #  Then
+    warnings = [r for r in caplog.records if r.levelname == "WARNING"]
+    assert len(warnings) == 1
+    assert "one segment at a time" in warnings[0].getMessage()
@@ -0,0 +1,84 @@
+import asyncio
+import math
+import os
+
+import pytest
+
+from backend.core.utils.worker_pool import PoolOverloaded
+from backend.core.utils.worker_pool import WorkerPool
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(workers=1, max_queue=1)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_should_run_tasks_in_other_processes(pool):
+    #  When
+    result = await pool.submit(math.factorial, 10)
+    stats = pool.as_dict()
+
+    #  Then
+    assert result == 3_628_800
+    assert stats["completed"] == 1
+    assert list(stats["utilization"]) != [os.getpid()]
+    assert all(0 <= share <= 1 for share in stats["utilization"].values())
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_should_reject_tasks_when_queue_is_full(pool):
+    #  Given: one task running, one queued
+    await pool.submit(math.factorial, 1)  # wait for the worker to spawn
+    running = [asyncio.create_task(pool.submit(os.times)) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert pool.queue_depth == 1
+
+    #  When
+    with pytest.raises(PoolOverloaded) as e:
+        await pool.submit(os.times)
+    await asyncio.gather(*running)
+
+    #  Then
+    assert e.value.retry_after >= 1
+    assert pool.as_dict()["rejected"] == 1
+    assert pool.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_should_admit_many_tasks_of_a_request_at_once(pool):
+    #  Given: a request of more tasks than the workers and queue can hold
+    await pool.submit(math.factorial, 1)
+    request = asyncio.create_task(pool.map(math.factorial, [(n,) for n in range(8)]))
+    while not pool.in_flight:
+        await asyncio.sleep(0)
+
+    #  When: its tasks are fed to the single worker one at a time
+    in_flight = pool.in_flight
+    queued = await pool.submit(math.factorial, 3)
+    results = await request
+
+    #  Then
+    assert in_flight == 1
+    assert queued == 6
+    assert results == [math.factorial(n) for n in range(8)]
+    assert pool.as_dict()["rejected"] == 0
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_should_reject_request_when_queue_is_full(pool):
+    #  Given
+    await pool.submit(math.factorial, 1)
+    running = [asyncio.create_task(pool.submit(os.times)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    #  When
+    with pytest.raises(PoolOverloaded):
+        await pool.map(math.factorial, [(1,), (2,)])
+    await asyncio.gather(*running)
+
+    #  Then
+    assert pool.as_dict()["rejected"] == 1